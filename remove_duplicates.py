@@ -1,60 +1,94 @@
 """
-移除 corpus.json 中的重複 doc_id，並從同資料集找取代文檔
+移除 corpus.json / corpus_raw.json 中的重複 doc_id
+
+單次掃描為兩個檔案各建立 doc_id 索引，依保留策略挑選每個 doc_id 要留下的版本：
+1. 優先保留 Gold 文檔 (is_gold=True)
+2. 其次保留已翻譯的版本 (含中文)
+3. 皆相同時保留第一次出現者
+輸出維持每個 doc_id 第一次出現的順序，corpus_raw 以 doc_id 對齊 corpus (不依賴兩個檔案的位置對應)。
 """
-import json
+import re
+import sys
 from pathlib import Path
-from collections import Counter
 
 BASE_DIR = Path(__file__).parent
 PROCESSED_DIR = BASE_DIR / "data" / "processed"
 
-def load_json(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+sys.path.insert(0, str(BASE_DIR / "src"))
+from dataset_store import load_json, save_json_atomic
+
+MAX_REPORTED_IDS = 10  # 最多列出幾個重複的 doc_id
+
+CHINESE_PATTERN = re.compile("[\\u4e00-\\u9fff]")
+
+
+def keep_priority(doc: dict) -> tuple[bool, bool]:
+    """保留優先順序：Gold > 已翻譯"""
+    return bool(doc.get("is_gold")), CHINESE_PATTERN.search(doc.get("content", "")) is not None
+
+
+def dedup_by_doc_id(docs: list[dict]) -> tuple[dict[str, dict], dict[str, int]]:
+    """
+    單次掃描建立 doc_id -> 保留版本 的索引
+
+    Returns:
+        (kept, counts): kept 依第一次出現的順序排列；counts 為每個 doc_id 的出現次數
+    """
+    kept: dict[str, dict] = {}
+    priority: dict[str, tuple[bool, bool]] = {}
+    counts: dict[str, int] = {}
+    for doc in docs:
+        did = doc["doc_id"]
+        score = keep_priority(doc)
+        counts[did] = counts.get(did, 0) + 1
+        # 覆寫既有的 key 不會改變 dict 的插入順序
+        if did not in kept or score > priority[did]:
+            kept[did] = doc
+            priority[did] = score
+    return kept, counts
 
-def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
 
 def main():
     corpus_path = PROCESSED_DIR / "corpus.json"
     corpus_raw_path = PROCESSED_DIR / "corpus_raw.json"
-    
+
     corpus = load_json(corpus_path)
     corpus_raw = load_json(corpus_raw_path)
-    
-    # 找出重複的 doc_id
-    doc_ids = [d['doc_id'] for d in corpus]
-    dup_ids = [k for k, v in Counter(doc_ids).items() if v > 1]
-    
-    print(f"發現 {len(dup_ids)} 個重複的 doc_id:")
-    for did in dup_ids:
-        # 找到所有重複項
-        matches = [(i, d) for i, d in enumerate(corpus) if d['doc_id'] == did]
-        print(f"  {did}:")
-        for idx, doc in matches:
-            print(f"    [idx={idx}] source={doc['original_source']}, original_id={doc['original_id']}")
-    
-    # 移除重複項 (保留第一個)
-    seen = set()
-    new_corpus = []
-    new_corpus_raw = []
-    removed_indices = []
-    
-    for i, doc in enumerate(corpus):
-        if doc['doc_id'] in seen:
-            removed_indices.append(i)
-            print(f"\n移除重複項 idx={i}: {doc['doc_id']}")
-        else:
-            seen.add(doc['doc_id'])
-            new_corpus.append(doc)
-            new_corpus_raw.append(corpus_raw[i])
-    
-    print(f"\n移除後: {len(new_corpus)} 文檔 (原有 {len(corpus)})")
-    
+
+    kept, counts = dedup_by_doc_id(corpus)
+    kept_raw, raw_counts = dedup_by_doc_id(corpus_raw)
+
+    dup_ids = [did for did, n in counts.items() if n > 1]
+    raw_dup_ids = [did for did, n in raw_counts.items() if n > 1]
+    print(f"corpus.json 發現 {len(dup_ids)} 個重複的 doc_id，corpus_raw.json 發現 {len(raw_dup_ids)} 個")
+    for did in dup_ids[:MAX_REPORTED_IDS]:
+        doc = kept[did]
+        print(f"  {did}: {counts[did]} 份，保留 source={doc['original_source']}, original_id={doc['original_id']}, is_gold={doc.get('is_gold')}")
+    if len(dup_ids) > MAX_REPORTED_IDS:
+        print(f"  ... 其餘 {len(dup_ids) - MAX_REPORTED_IDS} 個省略")
+
+    # corpus_raw 以 doc_id 對齊 corpus 的順序
+    new_corpus = list(kept.values())
+    new_corpus_raw = [kept_raw[did] for did in kept if did in kept_raw]
+
+    missing_raw = [did for did in kept if did not in kept_raw]
+    only_raw = [did for did in kept_raw if did not in kept]
+    if missing_raw:
+        print(f"\n⚠️ {len(missing_raw)} 篇文檔在 corpus_raw.json 中找不到原文: {missing_raw[:MAX_REPORTED_IDS]}")
+    if only_raw:
+        # 僅存在於原文檔者保留在最後，交由 verify_data.py 回報
+        print(f"⚠️ {len(only_raw)} 篇文檔只存在於 corpus_raw.json: {only_raw[:MAX_REPORTED_IDS]}")
+        new_corpus_raw.extend(kept_raw[did] for did in only_raw)
+
+    print(f"\n移除後: {len(new_corpus)} 文檔 (原有 {len(corpus)})，原文 {len(new_corpus_raw)} 文檔 (原有 {len(corpus_raw)})")
+
+    if not dup_ids and not raw_dup_ids:
+        print("沒有重複項，不需更新檔案")
+        return
+
     # 保存
-    save_json(corpus_path, new_corpus)
-    save_json(corpus_raw_path, new_corpus_raw)
+    save_json_atomic(new_corpus, corpus_path)
+    save_json_atomic(new_corpus_raw, corpus_raw_path)
     print("已保存更新後的 corpus.json 和 corpus_raw.json")
 
 if __name__ == "__main__":
@@ -0,0 +1,234 @@
+"""
+評測資料集載入 API (延遲載入)
+評測腳本不必再自行 json.load 兩個檔案並建立 {doc_id: content} 對照表：
+
+    from benchmark import Benchmark
+
+    bench = Benchmark()                            # 不讀取任何檔案
+    for q in bench.queries:                        # 第一次存取時才載入 queries.json
+        contexts = bench.gold_contents(q["question_id"])
+    content = bench.documents["<doc_id>"]          # doc_id -> content 的唯讀對照
+    drcd = bench.queries_for("drcd")
+    results = bench.evaluate(retrieved, ks=[5])
+
+- 每個欄位都在第一次存取時才載入，之後重複使用 (queries、corpus、doc_id 對照、黃金文檔、各來源子集、評測器)
+- corpus 自動選用最快的可用格式：compiled_corpus.py 編譯後的目錄若存在且與 corpus.json 一致，
+  以 memory map 開啟 (數毫秒、只讀取用到的文檔)；否則讀取 corpus.json
+- raw=True 時改為讀取未翻譯的 queries_raw.json / corpus_raw.json
+- tier="micro" 等時只取 process_data.py --tiers 產生的分級清單 (data/processed/tiers/<分級>.json) 中的題目；
+  文檔仍為共用的 corpus，tier_doc_ids 為該分級的文檔 (檢索時以此限制候選，各分級結果才可互相比較)
+
+使用方式:
+    uv run src/benchmark.py                        # 顯示載入格式、題數與各來源統計
+    uv run src/benchmark.py --raw
+    uv run src/benchmark.py --tier micro
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from collections.abc import Iterator, Mapping
+from functools import cached_property
+from pathlib import Path
+
+from compiled_corpus import FORMAT_VERSION, CompiledCorpus, file_signature
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+
+# 設定標準輸出編碼為 utf-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def load_json(filepath: Path):
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class DocumentMap(Mapping):
+    """編譯後 corpus 的 doc_id -> content 唯讀對照 (以雜湊索引查詢，內容在存取時才解碼)"""
+
+    def __init__(self, corpus: CompiledCorpus):
+        self.corpus = corpus
+
+    def __getitem__(self, doc_id: str) -> str:
+        row = self.corpus.row_of(doc_id)
+        if row < 0:
+            raise KeyError(doc_id)
+        return self.corpus.content(row)
+
+    def __contains__(self, doc_id) -> bool:
+        return isinstance(doc_id, str) and self.corpus.row_of(doc_id) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.corpus.doc_ids.tolist())
+
+    def __len__(self) -> int:
+        return len(self.corpus)
+
+
+class Benchmark:
+    """
+    延遲載入的評測資料集
+
+    Attributes:
+        processed_dir: 資料集目錄
+        raw: 是否讀取未翻譯版本
+    """
+
+    def __init__(self, processed_dir: Path = PROCESSED_DIR, raw: bool = False, tier: str | None = None):
+        self.processed_dir = Path(processed_dir)
+        self.raw = raw
+        self.tier = tier
+        suffix = "_raw" if raw else ""
+        self.queries_path = self.processed_dir / f"queries{suffix}.json"
+        self.corpus_path = self.processed_dir / f"corpus{suffix}.json"
+        self.compiled_dir = self.processed_dir / f"corpus{suffix}_compiled"
+        self._gold_cache: dict[str, list[str]] = {}
+
+    @cached_property
+    def format(self) -> str:
+        """corpus 的載入格式："compiled" (memory map) 或 "json" """
+        meta_path = self.compiled_dir / "meta.json"
+        if not meta_path.exists():
+            return "json"
+        meta = load_json(meta_path)
+        if meta.get("version") != FORMAT_VERSION:
+            return "json"
+        # 沒有 corpus.json 時直接使用編譯結果；兩者都有時只在編譯結果未過期時使用
+        if self.corpus_path.exists() and meta.get("source") != file_signature(self.corpus_path):
+            return "json"
+        return "compiled"
+
+    @cached_property
+    def manifest(self) -> dict | None:
+        """分級清單 (未指定 tier 時為 None)"""
+        if self.tier is None:
+            return None
+        return load_json(self.processed_dir / "tiers" / f"{self.tier}.json")
+
+    @cached_property
+    def queries(self) -> list[dict]:
+        queries = load_json(self.queries_path)
+        if self.manifest is None:
+            return queries
+        members = set(self.manifest["question_ids"])
+        tier_queries = [q for q in queries if q["question_id"] in members]
+        if len(tier_queries) < len(members):
+            # 共用檔案被編輯後清單未同步 (見 tier_manifests.py)
+            print(f"⚠️ 分級 {self.tier} 有 {len(members) - len(tier_queries)} 題不在 {self.queries_path.name} 中，"
+                  f"分級清單已過期，請重新執行 process_data.py --tiers")
+        return tier_queries
+
+    @cached_property
+    def tier_doc_ids(self) -> list[str] | None:
+        """分級的文檔 doc_id (未指定 tier 時為 None，表示整個 corpus)"""
+        return None if self.manifest is None else self.manifest["doc_ids"]
+
+    @cached_property
+    def corpus(self) -> CompiledCorpus | list[dict]:
+        """CompiledCorpus (可像 list[dict] 一樣索引與迭代) 或 list[dict]"""
+        if self.format == "compiled":
+            return CompiledCorpus.load(self.compiled_dir)
+        return load_json(self.corpus_path)
+
+    @cached_property
+    def documents(self) -> Mapping[str, str]:
+        """doc_id -> content"""
+        if isinstance(self.corpus, CompiledCorpus):
+            return DocumentMap(self.corpus)
+        return {doc["doc_id"]: doc["content"] for doc in self.corpus}
+
+    @cached_property
+    def _query_index(self) -> dict[str, dict]:
+        return {q["question_id"]: q for q in self.queries}
+
+    @cached_property
+    def _queries_by_source(self) -> dict[str, list[dict]]:
+        groups = defaultdict(list)
+        for q in self.queries:
+            groups[q["source_dataset"]].append(q)
+        return dict(groups)
+
+    @cached_property
+    def _doc_ids_by_source(self) -> dict[str, list[str]]:
+        if isinstance(self.corpus, CompiledCorpus):
+            doc_ids = self.corpus.doc_ids
+            return {
+                str(source): doc_ids[self.corpus.source_codes == code].tolist()
+                for code, source in enumerate(self.corpus.categories)
+            }
+        groups = defaultdict(list)
+        for doc in self.corpus:
+            groups[doc.get("original_source", "")].append(doc["doc_id"])
+        return dict(groups)
+
+    @property
+    def sources(self) -> list[str]:
+        return list(self._queries_by_source)
+
+    def query(self, question_id: str) -> dict:
+        return self._query_index[question_id]
+
+    def queries_for(self, source: str) -> list[dict]:
+        """某個資料來源的題目"""
+        return self._queries_by_source.get(source, [])
+
+    def doc_ids_for(self, source: str) -> list[str]:
+        """某個資料來源的文檔 doc_id (指定 tier 時只含該分級的文檔)"""
+        doc_ids = self._doc_ids_by_source.get(source, [])
+        if self.tier_doc_ids is None:
+            return doc_ids
+        members = set(self.tier_doc_ids)
+        return [doc_id for doc_id in doc_ids if doc_id in members]
+
+    def gold_contents(self, question_id: str) -> list[str]:
+        """題目黃金文檔的內容 (依 gold_doc_ids 順序，第一次查詢後快取)"""
+        if question_id not in self._gold_cache:
+            self._gold_cache[question_id] = [self.documents[d] for d in self.query(question_id)["gold_doc_ids"]]
+        return self._gold_cache[question_id]
+
+    @cached_property
+    def evaluator(self):
+        from retrieval_eval import RetrievalEvaluator
+
+        return RetrievalEvaluator(self.queries)
+
+    def evaluate(self, retrieved, ks: list[int] | None = None) -> dict[int, dict]:
+        """以 retrieval_eval 的指標評分 (retrieved 依 queries 順序，預設 k=5)"""
+        return self.evaluator.evaluate(retrieved, ks or [5])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="評測資料集載入")
+    parser.add_argument("--processed-dir", type=Path, default=PROCESSED_DIR)
+    parser.add_argument("--raw", action="store_true", help="讀取未翻譯版本")
+    parser.add_argument("--tier", default=None, help="分級名稱 (process_data.py --tiers 產生)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    bench = Benchmark(args.processed_dir, args.raw, args.tier)
+    print(f"corpus 格式: {bench.format}")
+    n_docs = len(bench.corpus) if bench.tier_doc_ids is None else len(bench.tier_doc_ids)
+    print(f"題目 {len(bench.queries)} 題，文檔 {n_docs} 篇 ({(time.perf_counter() - start) * 1000:.1f} ms)")
+    for source in bench.sources:
+        print(f"  【{source}】題目 {len(bench.queries_for(source))} 題，文檔 {len(bench.doc_ids_for(source))} 篇")
+    missing = [
+        doc_id for q in bench.queries for doc_id in q["gold_doc_ids"] if doc_id not in bench.documents
+    ]
+    if missing:
+        print(f"⚠️ {len(missing)} 個黃金文檔不在 corpus 中")
+    if bench.tier_doc_ids is not None:
+        tier_docs = set(bench.tier_doc_ids)
+        outside = [doc_id for q in bench.queries for doc_id in q["gold_doc_ids"] if doc_id not in tier_docs]
+        if outside:
+            print(f"⚠️ {len(outside)} 個黃金文檔不在分級 {args.tier} 中")
+
+
+if __name__ == "__main__":
+    main()
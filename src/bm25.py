@@ -0,0 +1,290 @@
+"""
+BM25 基準檢索器
+以字元 unigram + bigram 切分繁體中文、保留括號內原文名稱等拉丁字詞 (小寫英數字)，
+建立以陣列儲存的倒排索引 (CSR 格式)，供所有評測共用同一個快速的基準檢索器。
+
+索引結構 (data/processed/bm25/):
+- term_hashes.npy: 排序後的詞彙 64-bit 雜湊 (以二分搜尋查詢詞彙，不需載入詞典)
+- indptr.npy: 每個詞彙的 posting 範圍
+- postings_doc.npy / postings_weight.npy: 文檔位置與預先算好的 BM25 權重 (idf × 飽和 tf)
+- doc_ids.npy: 文檔位置 -> doc_id
+- meta.json: 參數與語料檔的大小 / 修改時間 (語料變動時自動重建)
+
+查詢時只需把查詢詞彙的 posting 權重累加到分數陣列，再以 argpartition 選出 top-k；
+所有陣列以 memory map 載入，開啟索引只需幾毫秒。
+
+使用方式:
+    uv run src/bm25.py build                          # 建立索引 (預設 corpus.json)
+    uv run src/bm25.py search "台北101的高度是多少" --k 5
+    uv run src/bm25.py eval --k 1 5 10                # 以 queries.json 評測並輸出 run
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from compiled_corpus import load_corpus
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+INDEX_DIR = PROCESSED_DIR / "bm25"
+RUN_PATH = PROCESSED_DIR / "bm25_run.json"
+
+# BM25 參數
+K1 = 1.2
+B = 0.75
+INDEX_VERSION = 1
+
+TOKEN_PATTERN = re.compile("[\\u3400-\\u4dbf\\u4e00-\\u9fff]+|[a-z0-9]+")
+CJK_PATTERN = re.compile("[\\u3400-\\u4dbf\\u4e00-\\u9fff]")
+
+# 設定標準輸出編碼為 utf-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def load_json(filepath: Path):
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(data, filepath: Path) -> None:
+    """儲存 JSON 檔案"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def tokenize(text: str) -> list[str]:
+    """中文連續字元切成 unigram + bigram；拉丁字母與數字保留為完整的小寫字詞"""
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        run = match.group()
+        if CJK_PATTERN.match(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def term_hash(term: str) -> int:
+    """詞彙的穩定 64-bit 雜湊 (跨程序一致，可寫入磁碟)"""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def corpus_signature(filepath: Path) -> dict:
+    """語料檔的大小與修改時間，用來判斷索引是否過期 (編譯後的 corpus 目錄以其 meta.json 為準)"""
+    stat = (filepath / "meta.json" if filepath.is_dir() else filepath).stat()
+    return {"path": str(filepath.resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class BM25Index:
+    """以 CSR 陣列儲存、權重預先計算的 BM25 倒排索引"""
+
+    def __init__(self, meta: dict, arrays: dict[str, np.ndarray]):
+        self.meta = meta
+        self.term_hashes = arrays["term_hashes"]
+        self.indptr = arrays["indptr"]
+        self.postings_doc = arrays["postings_doc"]
+        self.postings_weight = arrays["postings_weight"]
+        self.doc_ids = arrays["doc_ids"]
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, corpus: list[dict], k1: float = K1, b: float = B, meta: dict | None = None) -> "BM25Index":
+        """由 corpus 建立索引"""
+        vocabulary: dict[str, int] = {}
+        term_chunks, doc_chunks, tf_chunks = [], [], []
+        doc_lengths = np.zeros(len(corpus), dtype=np.float32)
+        for doc_index, doc in enumerate(corpus):
+            tokens = tokenize(doc.get("content", ""))
+            doc_lengths[doc_index] = len(tokens)
+            counts = Counter(tokens)
+            term_chunks.append(np.fromiter(
+                (vocabulary.setdefault(t, len(vocabulary)) for t in counts), dtype=np.int64, count=len(counts)
+            ))
+            tf_chunks.append(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+            doc_chunks.append(np.full(len(counts), doc_index, dtype=np.int32))
+
+        terms = np.concatenate(term_chunks) if term_chunks else np.zeros(0, dtype=np.int64)
+        docs = np.concatenate(doc_chunks) if doc_chunks else np.zeros(0, dtype=np.int32)
+        tfs = np.concatenate(tf_chunks) if tf_chunks else np.zeros(0, dtype=np.float32)
+
+        # 詞彙依雜湊排序，posting 依 (詞彙, 文檔) 排序
+        hashes = np.fromiter((term_hash(t) for t in vocabulary), dtype=np.uint64, count=len(vocabulary))
+        term_order = np.argsort(hashes, kind="stable")
+        rank_of_term = np.empty_like(term_order)
+        rank_of_term[term_order] = np.arange(len(term_order))
+        term_rank = rank_of_term[terms]
+        order = np.lexsort((docs, term_rank))
+        term_rank, docs, tfs = term_rank[order], docs[order], tfs[order]
+
+        df = np.bincount(term_rank, minlength=len(vocabulary))
+        indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(df, out=indptr[1:])
+
+        # 預先計算每個 posting 的 BM25 權重
+        n_docs = len(corpus)
+        avgdl = float(doc_lengths.mean()) if n_docs else 0.0
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = k1 * (1 - b + b * doc_lengths[docs] / max(avgdl, 1e-9))
+        weights = idf[term_rank] * tfs * (k1 + 1) / (tfs + norm)
+
+        meta = dict(meta or {}, version=INDEX_VERSION, k1=k1, b=b, n_docs=n_docs, avgdl=avgdl)
+        return cls(meta, {
+            "term_hashes": hashes[term_order],
+            "indptr": indptr,
+            "postings_doc": docs.astype(np.int32),
+            "postings_weight": weights.astype(np.float32),
+            "doc_ids": np.array([doc["doc_id"] for doc in corpus], dtype=str),
+        })
+
+    def save(self, index_dir: Path = INDEX_DIR) -> None:
+        index_dir.mkdir(parents=True, exist_ok=True)
+        for name in ("term_hashes", "indptr", "postings_doc", "postings_weight", "doc_ids"):
+            np.save(index_dir / f"{name}.npy", getattr(self, name))
+        save_json(self.meta, index_dir / "meta.json")
+
+    @classmethod
+    def load(cls, index_dir: Path = INDEX_DIR) -> "BM25Index":
+        """以 memory map 載入索引"""
+        arrays = {
+            name: np.load(index_dir / f"{name}.npy", mmap_mode="r")
+            for name in ("term_hashes", "indptr", "postings_doc", "postings_weight", "doc_ids")
+        }
+        return cls(load_json(index_dir / "meta.json"), arrays)
+
+    @classmethod
+    def open(
+        cls, corpus_path: Path = PROCESSED_DIR / "corpus.json", index_dir: Path = INDEX_DIR, k1: float = K1, b: float = B
+    ) -> "BM25Index":
+        """開啟索引，不存在、版本或參數不符、語料已變動時重建"""
+        meta_path = index_dir / "meta.json"
+        if corpus_path.is_dir():
+            load_corpus(corpus_path)  # 來源檔已改寫時先重新編譯，簽章才會反映最新內容
+        signature = corpus_signature(corpus_path)
+        if meta_path.exists():
+            meta = load_json(meta_path)
+            if (meta.get("version"), meta.get("corpus"), meta.get("k1"), meta.get("b")) == (INDEX_VERSION, signature, k1, b):
+                return cls.load(index_dir)
+        print(f"  建立 BM25 索引: {corpus_path.name} (k1={k1}, b={b})...")
+        index = cls.build(load_corpus(corpus_path), k1, b, meta={"corpus": signature})
+        index.save(index_dir)
+        return index
+
+    def score(self, query: str | Counter) -> np.ndarray:
+        """計算單一查詢 (文字，或已切好的詞頻 Counter) 對所有文檔的 BM25 分數"""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        counts = query if isinstance(query, Counter) else Counter(tokenize(query))
+        if not counts or len(self.term_hashes) == 0:
+            return scores
+        hashes = np.fromiter((term_hash(t) for t in counts), dtype=np.uint64, count=len(counts))
+        query_tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        positions = np.minimum(np.searchsorted(self.term_hashes, hashes), len(self.term_hashes) - 1)
+        found = self.term_hashes[positions] == hashes
+        for pos, weight in zip(positions[found], query_tf[found]):
+            start, end = self.indptr[pos], self.indptr[pos + 1]
+            # 同一詞彙的 posting 中文檔不重複，可直接以 fancy index 累加
+            scores[self.postings_doc[start:end]] += weight * self.postings_weight[start:end]
+        return scores
+
+    def search(self, query: str, k: int = 10) -> list[tuple[str, float]]:
+        """單一查詢的 top-k (doc_id, score)，分數為 0 的文檔不回傳"""
+        doc_ids, scores = self.search_batch([query], k)
+        return [(d, float(s)) for d, s in zip(doc_ids[0], scores[0]) if d]
+
+    def search_rows(self, queries: list[str | Counter], k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        """
+        批次查詢 top-k 的文檔位置 (查詢可為文字或已切好的詞頻 Counter)
+
+        Returns:
+            (rows, scores): (查詢數, k) 的文檔位置矩陣 (不足 k 篇以 -1 補位) 與分數矩陣
+        """
+        k = min(k, self.n_docs)
+        result_rows = np.full((len(queries), k), -1, dtype=np.int32)
+        result_scores = np.zeros((len(queries), k), dtype=np.float32)
+        for i, query in enumerate(queries):
+            scores = self.score(query)
+            # 以 argpartition 做 O(n) 選取，只排序選出的 k 篇
+            top = np.argpartition(-scores, k - 1)[:k] if k < self.n_docs else np.arange(self.n_docs)
+            top = top[np.argsort(-scores[top], kind="stable")]
+            top = top[scores[top] > 0]
+            result_rows[i, :len(top)] = top
+            result_scores[i, :len(top)] = scores[top]
+        return result_rows, result_scores
+
+    def search_batch(self, queries: list[str | Counter], k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        """
+        批次查詢 top-k
+
+        Returns:
+            (doc_ids, scores): (查詢數, k) 的 doc_id 矩陣 (不足 k 篇以空字串補位) 與分數矩陣
+        """
+        rows, scores = self.search_rows(queries, k)
+        doc_ids = np.where(rows >= 0, self.doc_ids[np.maximum(rows, 0)], "")
+        return doc_ids, scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 基準檢索器")
+    parser.add_argument("command", choices=["build", "search", "eval"])
+    parser.add_argument("query", nargs="?", default="", help="search 的查詢文字")
+    parser.add_argument("--corpus", type=Path, default=PROCESSED_DIR / "corpus.json")
+    parser.add_argument("--queries", type=Path, default=PROCESSED_DIR / "queries.json")
+    parser.add_argument("--index-dir", type=Path, default=INDEX_DIR)
+    parser.add_argument("--k", type=int, nargs="+", default=[5])
+    parser.add_argument("--output", type=Path, default=RUN_PATH, help="eval 輸出的 run 檔")
+    parser.add_argument("--run-name", default="bm25", help="eval 存入 run store 的名稱")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        index = BM25Index.build(load_corpus(args.corpus), meta={"corpus": corpus_signature(args.corpus)})
+        index.save(args.index_dir)
+        print(f"已建立 BM25 索引: {index.n_docs} 篇文檔，{len(index.term_hashes)} 個詞彙，"
+              f"{len(index.postings_doc)} 筆 posting ({time.perf_counter() - start:.2f}s)")
+        return
+
+    start = time.perf_counter()
+    index = BM25Index.open(args.corpus, args.index_dir)
+    print(f"載入索引: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    if args.command == "search":
+        for rank, (doc_id, score) in enumerate(index.search(args.query, max(args.k)), start=1):
+            print(f"  {rank}. {doc_id} ({score:.3f})")
+        return
+
+    from retrieval_eval import RetrievalEvaluator, print_report
+    from run_store import CorpusTable, Run
+
+    queries = load_json(args.queries)
+    start = time.perf_counter()
+    doc_ids, scores = index.search_batch([q["question"] for q in queries], max(args.k))
+    print(f"查詢 {len(queries)} 題: {(time.perf_counter() - start) * 1000:.1f} ms")
+    save_json({q["question_id"]: [d for d in row if d] for q, row in zip(queries, doc_ids.tolist())}, args.output)
+    print_report(RetrievalEvaluator(queries).evaluate(doc_ids, args.k))
+    print(f"\n已儲存 run: {args.output}")
+
+    run = Run.from_doc_ids(
+        args.run_name, [q["question_id"] for q in queries], doc_ids.tolist(),
+        CorpusTable.from_corpus(load_corpus(args.corpus)), scores,
+        config={"retriever": "bm25", "k1": index.meta["k1"], "b": index.meta["b"]},
+    )
+    print(f"已儲存至 run store: {run.save()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""
+候選題索引
+replace_question.py 每次抽換都要掃描整份原始資料 (DRCD 逐篇文章逐題、HotpotQA / 2Wiki
+整份打亂並重新串接每個段落)。本模組為每個資料集預先建立並持久化候選題索引：
+
+- data/processed/candidate_index/<source>.jsonl: 每行一個候選題的完整紀錄 (query_raw + docs_raw)
+- data/processed/candidate_index/<source>.meta.json: 每個候選題的 question_id、段落指紋、
+  是否仍可選 (eligible)、在 jsonl 中的位元組位置，以及計算 eligible 時所依據的已使用集合
+
+開啟索引時只需比對「目前已使用的段落指紋 / question_id」與上次的差異，
+透過反向索引更新受影響的候選題；抽題為 O(1) 的隨機抽取 (swap-remove)，
+取出紀錄時只 seek 讀取 jsonl 的單一行，不需載入原始資料。
+原始資料檔的大小或修改時間變動時會自動重建。
+
+成本：開啟索引仍需解析整份 meta.json 並建立反向索引，為 O(候選題數) (DRCD 3.5k 題約 7 ms)，
+每個 process 只付一次；省下的是每次抽換重新掃描、打亂原始資料的成本。之後的 sync 只處理差異，
+每次抽題為 O(1) (加上受影響候選題的更新)。
+
+使用方式:
+    uv run src/candidate_index.py              # 建立 / 更新所有資料集的索引
+    uv run src/candidate_index.py drcd 2wiki   # 只處理指定資料集
+"""
+
+import hashlib
+import json
+import random
+import sys
+import uuid
+from pathlib import Path
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+RAW_DIR = BASE_DIR / "data" / "raw"
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+INDEX_DIR = PROCESSED_DIR / "candidate_index"
+
+RAW_FILES = {
+    "drcd": "drcd.json",
+    "squad": "squad.json",
+    "hotpotqa": "hotpotqa.json",
+    "2wiki": "2wiki.json",
+}
+
+INDEX_VERSION = 1
+
+
+def load_json(filepath: Path) -> list[dict]:
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(data, filepath: Path) -> None:
+    """儲存 JSON 檔案"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def generate_doc_id(source: str, original_id: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{source}:{original_id}"))
+
+
+def generate_question_id(source: str, original_id: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, f"q:{source}:{original_id}"))
+
+
+def fingerprint(content: str) -> str:
+    """段落指紋 (原文內容的短雜湊)"""
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+
+
+def raw_signature(filepath: Path) -> dict:
+    """原始資料檔的大小與修改時間，用來判斷索引是否過期"""
+    stat = filepath.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def iter_drcd_candidates(data: list[dict]):
+    """列舉 DRCD 的所有候選題 (單跳，每題一篇黃金文檔)"""
+    for article in data:
+        for para in article.get("paragraphs", []):
+            context = para.get("context", "")
+            if not context:
+                continue
+            for qa in para.get("qas", []):
+                original_id = qa.get("id")
+                if not original_id:
+                    continue
+                doc_id = generate_doc_id("drcd", original_id)
+                answers = qa.get("answers", [])
+                answer_text = answers[0].get("text", "") if answers else ""
+                yield {
+                    "query_raw": {
+                        "question_id": generate_question_id("drcd", original_id),
+                        "question": qa.get("question", ""),
+                        "gold_answer": answer_text,
+                        "gold_doc_ids": [doc_id],
+                        "source_dataset": "drcd",
+                        "question_type": "single-hop",
+                    },
+                    "docs_raw": [{
+                        "doc_id": doc_id,
+                        "content": context,
+                        "original_source": "drcd",
+                        "original_id": original_id,
+                        "is_gold": True,
+                    }],
+                }
+
+
+def iter_squad_candidates(data: list[dict]):
+    """列舉 SQuAD 的所有候選題"""
+    for item in data:
+        context = item.get("context", "")
+        original_id = item.get("id")
+        if not context or not original_id:
+            continue
+        doc_id = generate_doc_id("squad", original_id)
+        answer_texts = item.get("answers", {}).get("text", [])
+        yield {
+            "query_raw": {
+                "question_id": generate_question_id("squad", original_id),
+                "question": item.get("question", ""),
+                "gold_answer": answer_texts[0] if answer_texts else "",
+                "gold_doc_ids": [doc_id],
+                "source_dataset": "squad",
+                "question_type": "single-hop",
+            },
+            "docs_raw": [{
+                "doc_id": doc_id,
+                "content": context,
+                "original_source": "squad",
+                "original_id": original_id,
+                "is_gold": True,
+            }],
+        }
+
+
+def iter_multihop_candidates(source: str, data: list[dict]):
+    """列舉 HotpotQA / 2Wiki 的所有候選題 (含 hard negatives)"""
+    for item in data:
+        original_id = item.get("id")
+        if not original_id:
+            continue
+        context_data = item.get("context", {})
+        titles = context_data.get("title", [])
+        sentences_list = context_data.get("sentences", [])
+        gold_titles = set(item.get("supporting_facts", {}).get("title", []))
+
+        docs_raw = []
+        gold_doc_ids = []
+        for i, title in enumerate(titles):
+            if i >= len(sentences_list):
+                continue
+            sentences = sentences_list[i]
+            content = " ".join(sentences) if isinstance(sentences, list) else str(sentences)
+            if not content.strip():
+                continue
+            doc_original_id = f"{original_id}_{title}"
+            doc_id = generate_doc_id(source, doc_original_id)
+            is_gold = title in gold_titles
+            docs_raw.append({
+                "doc_id": doc_id,
+                "content": content,
+                "original_source": source,
+                "original_id": doc_original_id,
+                "is_gold": is_gold,
+            })
+            if is_gold:
+                gold_doc_ids.append(doc_id)
+
+        if not gold_doc_ids:
+            continue
+
+        yield {
+            "query_raw": {
+                "question_id": generate_question_id(source, original_id),
+                "question": item.get("question", ""),
+                "gold_answer": item.get("answer", ""),
+                "gold_doc_ids": gold_doc_ids,
+                "source_dataset": source,
+                "question_type": "multi-hop",
+            },
+            "docs_raw": docs_raw,
+        }
+
+
+CANDIDATE_ITERATORS = {
+    "drcd": iter_drcd_candidates,
+    "squad": iter_squad_candidates,
+    "hotpotqa": lambda data: iter_multihop_candidates("hotpotqa", data),
+    "2wiki": lambda data: iter_multihop_candidates("2wiki", data),
+}
+
+
+class CandidateIndex:
+    """
+    單一資料集的持久化候選題索引
+
+    eligible 的定義：question_id 尚未使用，且所有段落指紋都不在已使用集合中。
+    """
+
+    def __init__(self, source: str, meta: dict):
+        self.source = source
+        self.meta = meta
+        self.candidates: list[dict] = meta["candidates"]
+        self.payload_path = INDEX_DIR / f"{source}.jsonl"
+
+        # 反向索引：指紋 / question_id -> 候選題位置
+        self.by_fingerprint: dict[str, list[int]] = {}
+        self.by_question_id: dict[str, int] = {}
+        for i, cand in enumerate(self.candidates):
+            self.by_question_id[cand["question_id"]] = i
+            for fp in cand["fingerprints"]:
+                self.by_fingerprint.setdefault(fp, []).append(i)
+
+        self.used_fingerprints: set[str] = set(meta["used_fingerprints"])
+        self.used_question_ids: set[str] = set(meta["used_question_ids"])
+
+        # 可抽取池 (swap-remove 以達到 O(1) 抽取與移除)
+        self.pool: list[int] = [i for i, cand in enumerate(self.candidates) if cand["eligible"]]
+        self.pool_position: dict[int, int] = {i: pos for pos, i in enumerate(self.pool)}
+
+    @staticmethod
+    def meta_path(source: str) -> Path:
+        return INDEX_DIR / f"{source}.meta.json"
+
+    @classmethod
+    def build(cls, source: str) -> "CandidateIndex":
+        """掃描原始資料建立索引 (只在索引不存在或過期時執行)"""
+        raw_path = RAW_DIR / RAW_FILES[source]
+        data = load_json(raw_path)
+
+        INDEX_DIR.mkdir(parents=True, exist_ok=True)
+        candidates = []
+        seen_question_ids: set[str] = set()
+        with open(INDEX_DIR / f"{source}.jsonl", "wb") as f:
+            for record in CANDIDATE_ITERATORS[source](data):
+                question_id = record["query_raw"]["question_id"]
+                if question_id in seen_question_ids:
+                    continue
+                seen_question_ids.add(question_id)
+                candidates.append({
+                    "question_id": question_id,
+                    "fingerprints": [fingerprint(doc["content"]) for doc in record["docs_raw"]],
+                    "offset": f.tell(),
+                    "eligible": True,
+                })
+                f.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+
+        meta = {
+            "version": INDEX_VERSION,
+            "source": source,
+            "raw": raw_signature(raw_path),
+            "candidates": candidates,
+            "used_fingerprints": [],
+            "used_question_ids": [],
+        }
+        index = cls(source, meta)
+        index.save()
+        return index
+
+    @classmethod
+    def open(cls, source: str) -> "CandidateIndex":
+        """
+        開啟索引，不存在或原始資料已變動時重建
+
+        會解析整份 meta.json 並建立反向索引 (O(候選題數))，同一個 process 中請重複使用回傳的索引
+        """
+        meta_path = cls.meta_path(source)
+        raw_path = RAW_DIR / RAW_FILES[source]
+        if meta_path.exists() and (INDEX_DIR / f"{source}.jsonl").exists():
+            meta = load_json(meta_path)
+            if meta.get("version") == INDEX_VERSION and meta.get("raw") == raw_signature(raw_path):
+                return cls(source, meta)
+        print(f"  建立 {source} 候選題索引...")
+        return cls.build(source)
+
+    def save(self) -> None:
+        """持久化索引中繼資料"""
+        self.meta["used_fingerprints"] = sorted(self.used_fingerprints)
+        self.meta["used_question_ids"] = sorted(self.used_question_ids)
+        save_json(self.meta, self.meta_path(self.source))
+
+    def _refresh(self, i: int) -> None:
+        """重新判斷第 i 個候選題是否可選，並同步可抽取池"""
+        cand = self.candidates[i]
+        eligible = (
+            cand["question_id"] not in self.used_question_ids
+            and not any(fp in self.used_fingerprints for fp in cand["fingerprints"])
+        )
+        cand["eligible"] = eligible
+        in_pool = i in self.pool_position
+        if eligible and not in_pool:
+            self.pool_position[i] = len(self.pool)
+            self.pool.append(i)
+        elif not eligible and in_pool:
+            pos = self.pool_position.pop(i)
+            last = self.pool.pop()
+            if last != i:
+                self.pool[pos] = last
+                self.pool_position[last] = pos
+
+    def sync(self, used_fingerprints: set[str], used_question_ids: set[str]) -> int:
+        """
+        以目前資料集的使用狀態更新 eligible
+
+        只處理與上次差異的指紋與 question_id (透過反向索引定位受影響的候選題)。
+
+        Returns:
+            受影響的候選題數
+        """
+        affected: set[int] = set()
+        for fp in used_fingerprints ^ self.used_fingerprints:
+            affected.update(self.by_fingerprint.get(fp, []))
+        for qid in used_question_ids ^ self.used_question_ids:
+            if qid in self.by_question_id:
+                affected.add(self.by_question_id[qid])
+
+        self.used_fingerprints = set(used_fingerprints)
+        self.used_question_ids = set(used_question_ids)
+        for i in affected:
+            self._refresh(i)
+        return len(affected)
+
+    def read(self, i: int) -> dict:
+        """讀取第 i 個候選題的完整紀錄"""
+        with open(self.payload_path, "rb") as f:
+            f.seek(self.candidates[i]["offset"])
+            return json.loads(f.readline())
+
+    def draw(self, count: int = 1, rng: random.Random | None = None) -> list[dict]:
+        """
+        隨機抽取 count 個可選候選題，並將其段落與 question_id 標記為已使用
+
+        Returns:
+            候選題紀錄列表 (可能少於 count)
+        """
+        rng = rng or random
+        results = []
+        while self.pool and len(results) < count:
+            i = self.pool[rng.randrange(len(self.pool))]
+            cand = self.candidates[i]
+            self.used_question_ids.add(cand["question_id"])
+            affected = {i}
+            for fp in cand["fingerprints"]:
+                self.used_fingerprints.add(fp)
+                affected.update(self.by_fingerprint[fp])
+            for j in affected:
+                self._refresh(j)
+            results.append(self.read(i))
+        return results
+
+    def draw_documents(self, count: int, rng: random.Random | None = None) -> list[dict]:
+        """
+        隨機抽取 count 篇未使用的段落作為干擾文檔 (is_gold=False)，並將其指紋標記為已使用
+
+        段落取自可選候選題，因此必定不與資料集中既有段落重複。
+
+        Returns:
+            文檔原文列表 (可能少於 count)
+        """
+        rng = rng or random
+        results = []
+        while self.pool and len(results) < count:
+            i = self.pool[rng.randrange(len(self.pool))]
+            affected = {i}
+            for doc in self.read(i)["docs_raw"]:
+                fp = fingerprint(doc["content"])
+                if len(results) >= count or fp in self.used_fingerprints:
+                    continue
+                self.used_fingerprints.add(fp)
+                affected.update(self.by_fingerprint[fp])
+                results.append(dict(doc, is_gold=False))
+            for j in affected:
+                self._refresh(j)
+        return results
+
+    @property
+    def eligible_count(self) -> int:
+        return len(self.pool)
+
+
+def used_state(queries: list[dict], corpus_raw: list[dict]) -> tuple[set[str], set[str]]:
+    """由目前資料集計算已使用的段落指紋 (以原文比對) 與 question_id"""
+    return (
+        {fingerprint(doc["content"]) for doc in corpus_raw},
+        {q["question_id"] for q in queries},
+    )
+
+
+def main():
+    sources = sys.argv[1:] or [s for s in RAW_FILES if (RAW_DIR / RAW_FILES[s]).exists()]
+    queries = load_json(PROCESSED_DIR / "queries_raw.json")
+    corpus_raw = load_json(PROCESSED_DIR / "corpus_raw.json")
+    used_fingerprints, used_question_ids = used_state(queries, corpus_raw)
+
+    print("=" * 60)
+    print("候選題索引")
+    print("=" * 60)
+    for source in sources:
+        index = CandidateIndex.open(source)
+        affected = index.sync(used_fingerprints, used_question_ids)
+        index.save()
+        print(f"  - {source}: {len(index.candidates)} 題候選，{index.eligible_count} 題可選 (本次更新 {affected} 題)")
+
+
+if __name__ == "__main__":
+    main()
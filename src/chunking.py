@@ -0,0 +1,282 @@
+"""
+文檔切塊 (chunking) 與切塊檢索評測
+評測協議固定為 No Chunking，但正式系統會切塊。本模組將 corpus 切成 chunk，只保存位移不保存文字：
+
+- chunk 表為三個等長陣列：doc_index (文檔在 corpus 中的位置)、start、end (字元位移，左閉右開)，
+  存於 data/processed/chunks/<策略>.npz，並標記 corpus 版本；chunk 文字即 content[start:end]。
+  eval 會沿用 corpus 版本相同的已儲存位移表，build 一律重新切塊
+- 切塊策略 (皆以 NumPy 對所有文檔一次計算)：
+  - fixed: 每 size 個字元一塊
+  - window: 滑動視窗，每塊 size 個字元、每次前進 stride 個字元
+  - sentence: 在「。！？」與英文句點 (其後為空白或結尾) 處斷句，句首位於同一個 size 區間的句子合為一塊
+    (chunk 邊界必為句子邊界，長度約為 size，遇長句時會超過)
+- 評測時將檢索到的 chunk 對應回文檔，每題只保留每篇文檔第一次出現的名次 (向量化去重)，
+  結果即為一般的 run (run_store.Run)，可直接以 retrieval_eval 的指標評分
+
+使用方式:
+    uv run src/chunking.py build --strategy sentence --size 200
+    uv run src/chunking.py eval --strategy window --size 256 --stride 128 --depth 50 --k 5 10
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from compiled_corpus import contents_of, load_corpus
+from run_store import CorpusTable, Run, corpus_version
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+CHUNKS_DIR = PROCESSED_DIR / "chunks"
+
+DEFAULT_SIZE = 256
+DEFAULT_DEPTH = 50  # chunk 檢索深度 (對應回文檔前)
+STRATEGIES = ["fixed", "window", "sentence"]
+
+SENTENCE_BATCH = 20000  # 斷句時每批串接的文檔數
+# 句尾：中文全形標點 (連續者只算一次)，或其後為空白 / 結尾的英文句點
+CJK_SENTENCE_ENDS = "。！？"
+WHITESPACE = " \t\n\r\u3000"
+
+# 設定標準輸出編碼為 utf-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def load_json(filepath: Path):
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def window_offsets(lengths: np.ndarray, size: int, stride: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    所有文檔的滑動視窗位移 (stride == size 即固定長度切塊)
+
+    Returns:
+        (doc_index, start, end)；空文檔不產生 chunk
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    # 最後一塊涵蓋到文檔結尾即停止 (不產生完全落在前一塊內的尾塊)
+    counts = np.where(lengths > 0, np.maximum(1, -(-(lengths - size) // stride) + 1), 0)
+    doc_index = np.repeat(np.arange(len(lengths)), counts)
+    first = np.cumsum(counts) - counts
+    start = (np.arange(counts.sum()) - np.repeat(first, counts)) * stride
+    end = np.minimum(start + size, lengths[doc_index])
+    return doc_index.astype(np.int32), start.astype(np.int32), end.astype(np.int32)
+
+
+def matches_any(codes: np.ndarray, chars: str) -> np.ndarray:
+    """碼位陣列中屬於 chars 任一字元的位置"""
+    mask = np.zeros(len(codes), dtype=bool)
+    for c in chars:
+        mask |= codes == ord(c)
+    return mask
+
+
+def sentence_ends(contents: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    所有文檔的句尾位置 (句尾標點之後的位移；文檔結尾也視為句尾)
+
+    文檔分批以 \\0 串接並轉為 UTF-32 碼位陣列，句尾判斷全以 NumPy 比較完成 (連續的標點只算一次)。
+
+    Returns:
+        (sent_doc, sent_end): 依 (文檔, 位移) 排序
+    """
+    doc_parts, end_parts = [], []
+    for batch_start in range(0, len(contents), SENTENCE_BATCH):
+        batch = contents[batch_start:batch_start + SENTENCE_BATCH]
+        lengths = np.fromiter((len(c) for c in batch), dtype=np.int64, count=len(batch))
+        doc_starts = np.cumsum(lengths + 1) - (lengths + 1)
+        codes = np.frombuffer("\0".join(batch).encode("utf-32-le"), dtype=np.uint32)
+        full_stop = matches_any(codes, CJK_SENTENCE_ENDS)
+        whitespace_after = np.r_[matches_any(codes[1:], WHITESPACE) | (codes[1:] == 0), True]
+        boundary = (full_stop & ~np.r_[full_stop[1:], False]) | ((codes == ord(".")) & whitespace_after)
+        # 每篇文檔的最後一個字元之後也是句尾
+        boundary[(doc_starts + lengths - 1)[lengths > 0]] = True
+        ends = np.flatnonzero(boundary) + 1
+        sent_doc = np.searchsorted(doc_starts, ends, side="right") - 1
+        doc_parts.append(sent_doc + batch_start)
+        end_parts.append(ends - doc_starts[sent_doc])
+    if not doc_parts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(doc_parts), np.concatenate(end_parts)
+
+
+def sentence_offsets(contents: list[str], size: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """依句子邊界切塊：句首位置 // size 相同的句子合為一塊"""
+    sent_doc, sent_end = sentence_ends(contents)
+    # 句首 = 同一文檔前一句的句尾
+    sent_start = np.zeros_like(sent_end)
+    same_doc = np.r_[False, sent_doc[1:] == sent_doc[:-1]]
+    sent_start[same_doc] = sent_end[:-1][same_doc[1:]]
+
+    group = sent_start // size
+    new_chunk = np.r_[True, (sent_doc[1:] != sent_doc[:-1]) | (group[1:] != group[:-1])]
+    chunk_first = np.flatnonzero(new_chunk)
+    chunk_last = np.r_[chunk_first[1:], len(sent_doc)] - 1
+    return (
+        sent_doc[chunk_first].astype(np.int32),
+        sent_start[chunk_first].astype(np.int32),
+        sent_end[chunk_last].astype(np.int32),
+    )
+
+
+class ChunkTable:
+    """
+    corpus 的 chunk 位移表
+
+    Attributes:
+        doc_index / start / end: 每個 chunk 所屬文檔位置與字元位移
+        meta: {"strategy", "size", "stride", "corpus_version"}
+    """
+
+    def __init__(self, doc_index: np.ndarray, start: np.ndarray, end: np.ndarray, meta: dict):
+        self.doc_index = doc_index
+        self.start = start
+        self.end = end
+        self.meta = meta
+
+    def __len__(self) -> int:
+        return len(self.doc_index)
+
+    @staticmethod
+    def name_of(strategy: str, size: int, stride: int | None = None) -> str:
+        return f"{strategy}-{size}" + (f"-{stride}" if strategy == "window" else "")
+
+    @property
+    def name(self) -> str:
+        return self.name_of(self.meta["strategy"], self.meta["size"], self.meta["stride"])
+
+    @classmethod
+    def build(cls, corpus: list[dict], strategy: str, size: int = DEFAULT_SIZE, stride: int | None = None) -> "ChunkTable":
+        contents = contents_of(corpus)
+        if strategy == "sentence":
+            arrays = sentence_offsets(contents, size)
+        else:
+            stride = size if strategy == "fixed" else (stride or size // 2)
+            lengths = np.fromiter((len(c) for c in contents), dtype=np.int64, count=len(contents))
+            arrays = window_offsets(lengths, size, stride)
+        meta = {"strategy": strategy, "size": size, "stride": stride if strategy == "window" else None,
+                "corpus_version": corpus_version(corpus)}
+        return cls(*arrays, meta)
+
+    def save(self, chunks_dir: Path = CHUNKS_DIR) -> Path:
+        chunks_dir.mkdir(parents=True, exist_ok=True)
+        path = chunks_dir / f"{self.name}.npz"
+        np.savez(path, doc_index=self.doc_index, start=self.start, end=self.end, meta=np.array(json.dumps(self.meta)))
+        return path
+
+    @classmethod
+    def load(cls, name: str, chunks_dir: Path = CHUNKS_DIR) -> "ChunkTable":
+        data = np.load(chunks_dir / f"{name}.npz")
+        return cls(data["doc_index"], data["start"], data["end"], json.loads(str(data["meta"])))
+
+    @classmethod
+    def open(
+        cls, corpus: list[dict], strategy: str, size: int = DEFAULT_SIZE, stride: int | None = None,
+        chunks_dir: Path = CHUNKS_DIR,
+    ) -> tuple["ChunkTable", bool]:
+        """
+        載入已儲存的位移表，不存在或 corpus 版本不符時重新切塊並儲存
+
+        Returns:
+            (table, built): built 為 True 表示本次重新切塊
+        """
+        if strategy == "window":
+            stride = stride or size // 2
+        path = chunks_dir / f"{cls.name_of(strategy, size, stride)}.npz"
+        if path.exists():
+            table = cls.load(path.stem, chunks_dir)
+            if table.meta["corpus_version"] == corpus_version(corpus):
+                return table, False
+        table = cls.build(corpus, strategy, size, stride)
+        table.save(chunks_dir)
+        return table, True
+
+    def texts(self, contents: list[str]):
+        """依序產生每個 chunk 的文字 (由原文切片，不另外保存)"""
+        for d, s, e in zip(self.doc_index.tolist(), self.start.tolist(), self.end.tolist()):
+            yield contents[d][s:e]
+
+
+def chunks_to_documents(
+    doc_index: np.ndarray, chunk_rows: np.ndarray, chunk_scores: np.ndarray, n_docs: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    將 (題數, depth) 的 chunk 檢索結果對應回文檔位置，每題每篇文檔只保留第一次出現 (即分數最高的 chunk)
+
+    去重：以 (題目, 文檔) 組成一維鍵，np.unique 的 return_index 即每組第一次出現的位置 (依名次)；
+    保留者依原順序往前遞補，其餘以 -1 補位。
+
+    Returns:
+        (rows, scores): (題數, depth) 的文檔位置與分數
+    """
+    valid = chunk_rows >= 0
+    docs = np.where(valid, doc_index[np.maximum(chunk_rows, 0)], -1).astype(np.int64)
+    keys = np.arange(len(docs))[:, None] * (n_docs + 1) + (docs + 1)
+    keep = np.zeros(docs.size, dtype=bool)
+    keep[np.unique(keys.ravel(), return_index=True)[1]] = True
+    keep = keep.reshape(docs.shape) & valid
+    order = np.argsort(~keep, axis=1, kind="stable")
+    kept = np.take_along_axis(keep, order, axis=1)
+    rows = np.where(kept, np.take_along_axis(docs, order, axis=1), -1).astype(np.int32)
+    scores = np.where(kept, np.take_along_axis(chunk_scores, order, axis=1), 0).astype(np.float32)
+    return rows, scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文檔切塊與切塊檢索評測")
+    parser.add_argument("command", choices=["build", "eval"])
+    parser.add_argument("--strategy", choices=STRATEGIES, default="sentence")
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE, help="chunk 字元數")
+    parser.add_argument("--stride", type=int, default=None, help="window 每次前進的字元數 (預設 size / 2)")
+    parser.add_argument("--corpus", type=Path, default=PROCESSED_DIR / "corpus.json")
+    parser.add_argument("--queries", type=Path, default=PROCESSED_DIR / "queries.json")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="chunk 檢索深度")
+    parser.add_argument("--k", type=int, nargs="+", default=[5])
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    start = time.perf_counter()
+    if args.command == "build":
+        table = ChunkTable.build(corpus, args.strategy, args.size, args.stride)
+        saved = table.save()
+    else:
+        # eval 沿用 corpus 版本相同的已儲存位移表
+        table, built = ChunkTable.open(corpus, args.strategy, args.size, args.stride)
+        saved = CHUNKS_DIR / f"{table.name}.npz" if built else None
+    elapsed = time.perf_counter() - start
+    lengths = table.end - table.start
+    print(f"{table.name}: {len(corpus)} 篇文檔 -> {len(table)} 個 chunk ({elapsed * 1000:.1f} ms)，"
+          f"平均 {lengths.mean():.0f} 字元 (最短 {lengths.min()}，最長 {lengths.max()})")
+    print(f"已儲存: {saved}" if saved else f"沿用已儲存的位移表: {CHUNKS_DIR / f'{table.name}.npz'}")
+    if args.command == "build":
+        return
+
+    from bm25 import BM25Index
+    from retrieval_eval import print_report
+    from run_store import RunScorer
+
+    contents = contents_of(corpus)
+    index = BM25Index.build([{"doc_id": str(i), "content": text} for i, text in enumerate(table.texts(contents))])
+    queries = load_json(args.queries)
+    chunk_rows, chunk_scores = index.search_rows([q["question"] for q in queries], args.depth)
+    doc_rows, doc_scores = chunks_to_documents(table.doc_index, chunk_rows, chunk_scores, len(corpus))
+
+    corpus_table = CorpusTable.from_corpus(corpus)
+    run = Run(doc_rows, doc_scores,
+              np.array([q["question_id"] for q in queries], dtype=str),
+              {"name": f"chunk-{table.name}", "config": {"retriever": "bm25", "chunking": table.meta},
+               "corpus_version": corpus_table.version, "k": doc_rows.shape[1]})
+    print_report(RunScorer(queries, corpus_table).score(run, args.k))
+    print(f"\n已儲存至 run store: {run.save()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+編譯後的 corpus 格式 (memory-mapped)
+載入 corpus.json 需要解析整個 JSON 陣列並建立每篇文檔的 dict；文檔數增加到數十萬篇後，
+光是開啟語料就要數秒。本模組將 corpus 編譯為一個目錄 (預設 data/processed/corpus_compiled/)：
+
+- content.bin: 所有文檔內容串接而成的 UTF-8 位元組，content_offsets.npy 為每篇的起訖位元組位移
+- doc_ids.npy / original_ids.npy: 定寬字串陣列
+- source_codes.npy + meta.json 的 sources: original_source 的類別編碼；is_gold.npy: 布林陣列
+- id_hashes.npy / id_rows.npy: doc_id 雜湊 (blake2b 8 bytes) 排序後的雜湊索引，以 searchsorted 查詢
+
+所有陣列皆以 memory map 開啟，開啟語料只需數毫秒；依 doc_id 取內容只讀取該篇文檔的位元組。
+CompiledCorpus 可像 list[dict] 一樣索引與迭代，因此接受 --corpus 的工具都能直接傳入編譯後的目錄。
+
+使用方式:
+    uv run src/compiled_corpus.py compile                         # corpus.json -> corpus_compiled/
+    uv run src/compiled_corpus.py get <doc_id>
+    uv run src/bm25.py eval --corpus data/processed/corpus_compiled
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+CORPUS_PATH = PROCESSED_DIR / "corpus.json"
+COMPILED_DIR = PROCESSED_DIR / "corpus_compiled"
+
+FORMAT_VERSION = 1
+ARRAYS = ("content_offsets", "doc_ids", "original_ids", "source_codes", "is_gold", "id_hashes", "id_rows")
+
+# 設定標準輸出編碼為 utf-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def load_json(filepath: Path):
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(data, filepath: Path) -> None:
+    """儲存 JSON 檔案"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def id_hash(doc_id: str) -> int:
+    """doc_id 的 64 位元雜湊"""
+    return int.from_bytes(hashlib.blake2b(doc_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def file_signature(filepath: Path) -> dict:
+    """來源檔的絕對路徑、大小與修改時間，用來判斷編譯結果是否過期 (以相對或絕對路徑編譯皆相同)"""
+    stat = filepath.stat()
+    return {"path": str(filepath.resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class CompiledCorpus:
+    """
+    memory-mapped 的 corpus
+
+    Attributes:
+        doc_ids / original_ids: 定寬字串陣列
+        source_codes / sources: original_source 的類別編碼與類別名稱
+        is_gold: 布林陣列
+        version: corpus 版本 (與 run_store.corpus_version 相同，編譯時算好)
+    """
+
+    def __init__(self, meta: dict, blob: np.ndarray, arrays: dict[str, np.ndarray]):
+        self.meta = meta
+        self.blob = blob
+        self.content_offsets = arrays["content_offsets"]
+        self.doc_ids = arrays["doc_ids"]
+        self.original_ids = arrays["original_ids"]
+        self.source_codes = arrays["source_codes"]
+        self.is_gold = arrays["is_gold"]
+        self.id_hashes = arrays["id_hashes"]
+        self.id_rows = arrays["id_rows"]
+        self.categories = np.array(meta["sources"], dtype=str)
+
+    @property
+    def version(self) -> str:
+        return self.meta["corpus_version"]
+
+    @property
+    def sources(self) -> np.ndarray:
+        """每篇文檔的 original_source"""
+        return self.categories[self.source_codes]
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @staticmethod
+    def compile(corpus: list[dict], out_dir: Path = COMPILED_DIR, source: dict | None = None) -> "CompiledCorpus":
+        """將 list[dict] 格式的 corpus 編譯到 out_dir"""
+        from run_store import corpus_version
+
+        out_dir.mkdir(parents=True, exist_ok=True)
+        encoded = [doc["content"].encode("utf-8") for doc in corpus]
+        offsets = np.zeros(len(corpus) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        with open(out_dir / "content.bin", "wb") as f:
+            f.write(b"".join(encoded))
+
+        sources, source_codes = np.unique([doc.get("original_source", "") for doc in corpus], return_inverse=True)
+        doc_ids = np.array([doc["doc_id"] for doc in corpus], dtype=str)
+        hashes = np.fromiter((id_hash(d) for d in doc_ids.tolist()), dtype=np.uint64, count=len(corpus))
+        order = np.argsort(hashes, kind="stable")
+        arrays = {
+            "content_offsets": offsets,
+            "doc_ids": doc_ids,
+            "original_ids": np.array([str(doc.get("original_id", "")) for doc in corpus], dtype=str),
+            "source_codes": source_codes.astype(np.uint16),
+            "is_gold": np.array([bool(doc.get("is_gold", False)) for doc in corpus], dtype=bool),
+            "id_hashes": hashes[order],
+            "id_rows": order.astype(np.int32),
+        }
+        for name, array in arrays.items():
+            np.save(out_dir / f"{name}.npy", array)
+        save_json({
+            "version": FORMAT_VERSION,
+            "n_docs": len(corpus),
+            "corpus_version": corpus_version(corpus),
+            "sources": sources.tolist(),
+            "source": source,
+        }, out_dir / "meta.json")
+        return CompiledCorpus.load(out_dir)
+
+    @classmethod
+    def load(cls, out_dir: Path = COMPILED_DIR) -> "CompiledCorpus":
+        """以 memory map 開啟編譯後的 corpus"""
+        meta = load_json(out_dir / "meta.json")
+        blob_path = out_dir / "content.bin"
+        # 空檔案無法 memory map
+        blob = np.memmap(blob_path, dtype=np.uint8, mode="r") if blob_path.stat().st_size else np.zeros(0, dtype=np.uint8)
+        arrays = {name: np.load(out_dir / f"{name}.npy", mmap_mode="r") for name in ARRAYS}
+        return cls(meta, blob, arrays)
+
+    @classmethod
+    def open(cls, corpus_path: Path = CORPUS_PATH, out_dir: Path = COMPILED_DIR) -> "CompiledCorpus":
+        """開啟編譯結果，不存在、格式版本不符或 corpus.json 已變動時重新編譯"""
+        signature = file_signature(corpus_path)
+        meta_path = out_dir / "meta.json"
+        if meta_path.exists():
+            meta = load_json(meta_path)
+            if (meta.get("version"), meta.get("source")) == (FORMAT_VERSION, signature):
+                return cls.load(out_dir)
+        print(f"  編譯 corpus: {corpus_path.name} -> {out_dir.name}/")
+        return cls.compile(load_json(corpus_path), out_dir, signature)
+
+    def row_of(self, doc_id: str) -> int:
+        """doc_id 所在列 (不存在時為 -1)"""
+        h = np.uint64(id_hash(doc_id))
+        position = int(np.searchsorted(self.id_hashes, h))
+        # 雜湊碰撞時逐一比對相同雜湊的列
+        while position < len(self.id_hashes) and self.id_hashes[position] == h:
+            row = int(self.id_rows[position])
+            if self.doc_ids[row] == doc_id:
+                return row
+            position += 1
+        return -1
+
+    def content_bytes(self, row: int) -> memoryview:
+        """第 row 篇文檔內容的 UTF-8 位元組 (直接指向 memory map，不複製)"""
+        return memoryview(self.blob[self.content_offsets[row]:self.content_offsets[row + 1]])
+
+    def content(self, row: int) -> str:
+        return str(self.content_bytes(row), "utf-8")
+
+    def contents(self) -> list[str]:
+        """所有文檔內容 (整個 blob 只讀取一次)"""
+        data = bytes(self.blob)
+        bounds = self.content_offsets.tolist()
+        return [data[a:b].decode("utf-8") for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def __getitem__(self, row: int) -> dict:
+        """與 corpus.json 相同格式的文檔 dict"""
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return {
+            "doc_id": str(self.doc_ids[row]),
+            "content": self.content(row),
+            "original_source": str(self.categories[self.source_codes[row]]),
+            "original_id": str(self.original_ids[row]),
+            "is_gold": bool(self.is_gold[row]),
+        }
+
+    def __iter__(self) -> Iterator[dict]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def get(self, doc_id: str) -> dict | None:
+        row = self.row_of(doc_id)
+        return self[row] if row >= 0 else None
+
+
+def contents_of(corpus) -> list[str]:
+    """corpus (list[dict] 或 CompiledCorpus) 的所有文檔內容"""
+    if isinstance(corpus, CompiledCorpus):
+        return corpus.contents()
+    return [doc["content"] for doc in corpus]
+
+
+def doc_ids_of(corpus) -> list[str]:
+    """corpus (list[dict] 或 CompiledCorpus) 的所有 doc_id"""
+    if isinstance(corpus, CompiledCorpus):
+        return corpus.doc_ids.tolist()
+    return [doc["doc_id"] for doc in corpus]
+
+
+def load_corpus(path: Path):
+    """
+    載入 corpus：目錄視為編譯後的格式 (memory map)，其餘視為 corpus.json
+
+    編譯結果記錄的來源檔仍存在時經由 CompiledCorpus.open 開啟，來源檔被改寫
+    (例如 replace_question.py、topup_corpus.py) 後會先重新編譯，不會讀到過期的內容。
+    """
+    if path.is_dir():
+        source = load_json(path / "meta.json").get("source")
+        if source and Path(source["path"]).exists():
+            return CompiledCorpus.open(Path(source["path"]), path)
+        return CompiledCorpus.load(path)
+    return load_json(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="編譯後的 corpus 格式")
+    parser.add_argument("command", choices=["compile", "get"])
+    parser.add_argument("doc_id", nargs="?", default="", help="get 的 doc_id")
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH)
+    parser.add_argument("--output", type=Path, default=COMPILED_DIR)
+    args = parser.parse_args()
+
+    if args.command == "compile":
+        start = time.perf_counter()
+        corpus = CompiledCorpus.compile(load_json(args.corpus), args.output, file_signature(args.corpus))
+        print(f"已編譯 {len(corpus)} 篇文檔 -> {args.output} ({time.perf_counter() - start:.2f}s)，"
+              f"內容 {len(corpus.blob) / 1e6:.1f} MB，來源: {', '.join(corpus.categories)}")
+        return
+
+    start = time.perf_counter()
+    corpus = CompiledCorpus.open(args.corpus, args.output)
+    opened = time.perf_counter() - start
+    doc = corpus.get(args.doc_id)
+    print(f"開啟: {opened * 1000:.1f} ms，查詢: {(time.perf_counter() - start - opened) * 1000:.3f} ms")
+    if doc is None:
+        print(f"❌ 找不到 doc_id: {args.doc_id}")
+        sys.exit(1)
+    print(json.dumps(doc, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
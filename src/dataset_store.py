@@ -0,0 +1,453 @@
+"""
+資料集儲存層 (SQLite)
+replace_question.py、add_documents.py、translate_new.py 原本都對整份 JSON 陣列做
+讀取 → 修改 → 整份寫回，並以線性掃描尋找紀錄，且需依序重寫四個檔案，中途失敗會留下不一致的資料。
+
+本模組以單一 SQLite 檔案同時保存原文與譯文：
+- documents: doc_id 主鍵，content (譯文) 與 content_raw (原文) 並存，
+  並以 (original_source, original_id) 與原文指紋 content_hash 建立索引
+- queries: question_id 主鍵，question / gold_answer 的原文與譯文並存，source_dataset 建立索引
+- query_gold_docs: question_id 與 gold doc_id 的對應 (doc_id 建立索引)
+
+所有編輯在交易中完成且只動到變更的列，並在同一個交易中記下 export_pending 標記 (資料庫有尚未匯出的變更)；
+四個 JSON 檔改為匯出產物：先寫好四個暫存檔才逐一 rename，全部完成再記錄檔案簽章並清除標記。
+JSON 被其他腳本 (process_data.py、translate_data.py 等) 重新產生時，開啟儲存層會自動重新匯入；
+標記仍在時 (編輯後尚未匯出就中斷，或匯出途中中斷)，JSON 可能過期或新舊混雜，
+此時一律以資料庫為準重新匯出，不會匯入 (需要以 JSON 覆蓋資料庫時請明確執行 import)。
+
+使用方式:
+    uv run src/dataset_store.py import   # 由 JSON 重新匯入
+    uv run src/dataset_store.py export   # 匯出為 JSON
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+from candidate_index import fingerprint
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+DB_PATH = PROCESSED_DIR / "dataset.sqlite"
+
+JSON_FILES = {
+    "queries": "queries.json",
+    "corpus": "corpus.json",
+    "queries_raw": "queries_raw.json",
+    "corpus_raw": "corpus_raw.json",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    content_raw TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    original_source TEXT NOT NULL,
+    original_id TEXT NOT NULL,
+    is_gold INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_position ON documents(position);
+CREATE INDEX IF NOT EXISTS idx_documents_original ON documents(original_source, original_id);
+CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(content_hash);
+
+CREATE TABLE IF NOT EXISTS queries (
+    question_id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    question_raw TEXT NOT NULL,
+    gold_answer TEXT NOT NULL,
+    gold_answer_raw TEXT NOT NULL,
+    source_dataset TEXT NOT NULL,
+    question_type TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_queries_position ON queries(position);
+CREATE INDEX IF NOT EXISTS idx_queries_source ON queries(source_dataset);
+
+CREATE TABLE IF NOT EXISTS query_gold_docs (
+    question_id TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    doc_id TEXT NOT NULL,
+    PRIMARY KEY (question_id, rank)
+);
+CREATE INDEX IF NOT EXISTS idx_query_gold_docs_doc ON query_gold_docs(doc_id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def load_json(filepath: Path) -> list[dict]:
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json_tmp(data: list[dict], filepath: Path) -> Path:
+    """將 JSON 寫入 filepath 旁的暫存檔並回傳其路徑 (尚未取代 filepath)"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = filepath.with_suffix(filepath.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return tmp_path
+
+
+def save_json_atomic(data: list[dict], filepath: Path) -> None:
+    """以暫存檔 + rename 原子寫入 JSON，避免寫到一半中斷留下損毀的檔案"""
+    os.replace(write_json_tmp(data, filepath), filepath)
+
+
+def file_signature(filepath: Path) -> str:
+    """檔案的大小與修改時間 (判斷 JSON 是否被其他腳本改寫)"""
+    if not filepath.exists():
+        return ""
+    stat = filepath.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """前綴範圍查詢的上界：original_id >= prefix AND original_id < prefix_upper_bound(prefix)"""
+    return prefix + "\U0010ffff"
+
+
+class DatasetStore:
+    """以 SQLite 保存 queries / corpus 原文與譯文的儲存層"""
+
+    def __init__(self, db_path: Path = DB_PATH, processed_dir: Path = PROCESSED_DIR):
+        self.db_path = db_path
+        self.processed_dir = processed_dir
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    @classmethod
+    def open(cls, db_path: Path = DB_PATH, processed_dir: Path = PROCESSED_DIR) -> "DatasetStore":
+        """
+        開啟儲存層；資料庫為空或 JSON 已被其他腳本改寫時由 JSON 重新匯入
+
+        資料庫有尚未匯出的變更時 (export_pending)，JSON 可能過期或新舊混雜，改以資料庫為準重新匯出
+        """
+        store = cls(db_path, processed_dir)
+        if store.export_pending():
+            if store.json_changed():
+                print("  ⚠️ [store] JSON 在資料庫變更尚未匯出時被改寫，以資料庫為準覆蓋 "
+                      "(若要改以 JSON 為準，請執行 uv run src/dataset_store.py import)")
+            print("  [store] 資料庫有尚未匯出的變更，重新匯出 JSON...")
+            store.export_json()
+        elif store.json_changed():
+            print("  [store] JSON 已變更，重新匯入資料庫...")
+            store.import_json()
+        return store
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "DatasetStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        """交易區塊：全部成功才提交，任何例外皆回滾"""
+        try:
+            self.conn.execute("BEGIN")
+            yield self
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    # ---- JSON 同步 ----
+
+    def json_paths(self) -> dict[str, Path]:
+        return {name: self.processed_dir / filename for name, filename in JSON_FILES.items()}
+
+    def json_signatures(self) -> dict[str, str]:
+        return {name: file_signature(path) for name, path in self.json_paths().items()}
+
+    def json_changed(self) -> bool:
+        """上次匯入 / 匯出後 JSON 是否被改寫 (資料庫為空亦視為需要匯入)"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'json_signatures'").fetchone()
+        if row is None:
+            return any(self.json_signatures().values())
+        return json.loads(row["value"]) != self.json_signatures()
+
+    def _record_json_signatures(self) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta(key, value) VALUES ('json_signatures', ?)",
+            (json.dumps(self.json_signatures()),),
+        )
+
+    def export_pending(self) -> bool:
+        """資料庫是否有尚未匯出到 JSON 的變更 (編輯後尚未匯出，或匯出途中中斷)"""
+        return self.conn.execute("SELECT 1 FROM meta WHERE key = 'export_pending'").fetchone() is not None
+
+    def _mark_export_pending(self) -> None:
+        """在編輯的同一個交易中標記資料庫已變更 (需在 transaction() 內呼叫)"""
+        self.conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('export_pending', '1')")
+
+    def import_json(self) -> None:
+        """
+        由四個 JSON 檔重建資料庫 (以 doc_id / question_id 對齊原文與譯文)
+
+        Raises:
+            ValueError: 四個 JSON 中任一個有重複的 doc_id 或 question_id (請先執行 remove_duplicates.py)，
+                或譯文檔與原文檔的 ID 集合不一致 (只存在於其中一邊的紀錄無法對齊)
+        """
+        paths = self.json_paths()
+        data = {name: load_json(path) if path.exists() else [] for name, path in paths.items()}
+
+        for name, raw_name, key in (("corpus", "corpus_raw", "doc_id"), ("queries", "queries_raw", "question_id")):
+            id_sets = {}
+            for n in (name, raw_name):
+                ids = [r[key] for r in data[n]]
+                if len(ids) != len(set(ids)):
+                    raise ValueError(f"{JSON_FILES[n]} 有重複的 {key}，請先執行 remove_duplicates.py")
+                id_sets[n] = set(ids)
+            # 尚未翻譯 (譯文檔不存在) 時只有原文檔
+            if data[name] and id_sets[name] != id_sets[raw_name]:
+                only = sorted(id_sets[name] - id_sets[raw_name])
+                only_raw = sorted(id_sets[raw_name] - id_sets[name])
+                raise ValueError(
+                    f"{JSON_FILES[name]} 與 {JSON_FILES[raw_name]} 的 {key} 不一致: "
+                    f"只在 {JSON_FILES[name]} {len(only)} 筆 {only[:5]}，只在 {JSON_FILES[raw_name]} {len(only_raw)} 筆 {only_raw[:5]} "
+                    f"(原文檔重新產生後請重新執行 translate_data.py)"
+                )
+
+        translated_docs = {d["doc_id"]: d for d in data["corpus"]}
+        translated_queries = {q["question_id"]: q for q in data["queries"]}
+
+        with self.transaction():
+            self.conn.execute("DELETE FROM documents")
+            self.conn.execute("DELETE FROM queries")
+            self.conn.execute("DELETE FROM query_gold_docs")
+            # 譯文檔的順序為匯出順序；僅存在於原文檔者排在後面
+            order = {d["doc_id"]: i for i, d in enumerate(data["corpus"])}
+            raw_docs = sorted(data["corpus_raw"], key=lambda d: order.get(d["doc_id"], len(order)))
+            self._insert_documents(
+                [(translated_docs.get(d["doc_id"], d), d) for d in raw_docs],
+                start_position=0,
+            )
+            q_order = {q["question_id"]: i for i, q in enumerate(data["queries"])}
+            raw_queries = sorted(data["queries_raw"], key=lambda q: q_order.get(q["question_id"], len(q_order)))
+            for position, query_raw in enumerate(raw_queries):
+                self._insert_query(translated_queries.get(query_raw["question_id"], query_raw), query_raw, position)
+            self._record_json_signatures()
+            # 資料庫與 JSON 一致，沒有尚未匯出的變更
+            self.conn.execute("DELETE FROM meta WHERE key = 'export_pending'")
+
+    def export_json(self) -> None:
+        """匯出四個 JSON 檔 (依 position 排序)"""
+        queries, queries_raw, corpus, corpus_raw = [], [], [], []
+        gold = self._gold_doc_ids()
+        for row in self.conn.execute("SELECT * FROM queries ORDER BY position"):
+            base = {
+                "question_id": row["question_id"],
+                "gold_doc_ids": gold.get(row["question_id"], []),
+                "source_dataset": row["source_dataset"],
+                "question_type": row["question_type"],
+            }
+            queries.append(self._query_dict(base, row["question"], row["gold_answer"]))
+            queries_raw.append(self._query_dict(base, row["question_raw"], row["gold_answer_raw"]))
+        for row in self.conn.execute("SELECT * FROM documents ORDER BY position"):
+            corpus.append(self._doc_dict(row, row["content"]))
+            corpus_raw.append(self._doc_dict(row, row["content_raw"]))
+
+        # 先寫好四個暫存檔，確認標記已存在後才 rename；中途中斷時 open() 會以資料庫為準重新匯出
+        paths = self.json_paths()
+        data = {"queries": queries, "corpus": corpus, "queries_raw": queries_raw, "corpus_raw": corpus_raw}
+        tmp_paths = {name: write_json_tmp(data[name], paths[name]) for name in JSON_FILES}
+        with self.transaction():
+            self._mark_export_pending()
+        for name, tmp_path in tmp_paths.items():
+            os.replace(tmp_path, paths[name])
+        with self.transaction():
+            self._record_json_signatures()
+            self.conn.execute("DELETE FROM meta WHERE key = 'export_pending'")
+
+    # ---- 讀取 ----
+
+    @staticmethod
+    def _query_dict(base: dict, question: str, gold_answer: str) -> dict:
+        return {
+            "question_id": base["question_id"],
+            "question": question,
+            "gold_answer": gold_answer,
+            "gold_doc_ids": base["gold_doc_ids"],
+            "source_dataset": base["source_dataset"],
+            "question_type": base["question_type"],
+        }
+
+    @staticmethod
+    def _doc_dict(row: sqlite3.Row, content: str) -> dict:
+        return {
+            "doc_id": row["doc_id"],
+            "content": content,
+            "original_source": row["original_source"],
+            "original_id": row["original_id"],
+            "is_gold": bool(row["is_gold"]),
+        }
+
+    def _gold_doc_ids(self, question_ids: list[str] | None = None) -> dict[str, list[str]]:
+        sql = "SELECT question_id, doc_id FROM query_gold_docs"
+        params: list = []
+        if question_ids is not None:
+            sql += f" WHERE question_id IN ({','.join('?' * len(question_ids))})"
+            params = list(question_ids)
+        gold: dict[str, list[str]] = {}
+        for row in self.conn.execute(sql + " ORDER BY question_id, rank", params):
+            gold.setdefault(row["question_id"], []).append(row["doc_id"])
+        return gold
+
+    def get_query(self, question_id: str, raw: bool = False) -> dict | None:
+        """以 question_id 取得單題 (raw=True 取原文)"""
+        row = self.conn.execute("SELECT * FROM queries WHERE question_id = ?", (question_id,)).fetchone()
+        if row is None:
+            return None
+        base = {
+            "question_id": row["question_id"],
+            "gold_doc_ids": self._gold_doc_ids([question_id]).get(question_id, []),
+            "source_dataset": row["source_dataset"],
+            "question_type": row["question_type"],
+        }
+        if raw:
+            return self._query_dict(base, row["question_raw"], row["gold_answer_raw"])
+        return self._query_dict(base, row["question"], row["gold_answer"])
+
+    def get_documents(self, doc_ids: list[str], raw: bool = False) -> list[dict]:
+        """以 doc_id 取得文檔 (依傳入順序，找不到者略過)"""
+        if not doc_ids:
+            return []
+        rows = self.conn.execute(
+            f"SELECT * FROM documents WHERE doc_id IN ({','.join('?' * len(doc_ids))})", list(doc_ids)
+        ).fetchall()
+        by_id = {row["doc_id"]: row for row in rows}
+        column = "content_raw" if raw else "content"
+        return [self._doc_dict(by_id[did], by_id[did][column]) for did in doc_ids if did in by_id]
+
+    def doc_ids_with_prefix(self, source: str, prefix: str) -> list[str]:
+        """以 (original_source, original_id 前綴) 索引查詢 doc_id"""
+        rows = self.conn.execute(
+            "SELECT doc_id FROM documents WHERE original_source = ? AND original_id >= ? AND original_id < ?",
+            (source, prefix, prefix_upper_bound(prefix)),
+        )
+        return [row["doc_id"] for row in rows]
+
+    def has_doc_id(self, doc_id: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM documents WHERE doc_id = ?", (doc_id,)).fetchone() is not None
+
+    def has_original_id(self, source: str, original_id: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM documents WHERE original_source = ? AND original_id = ?", (source, original_id)
+        ).fetchone() is not None
+
+    def used_fingerprints(self) -> set[str]:
+        """已使用段落的原文指紋"""
+        return {row[0] for row in self.conn.execute("SELECT content_hash FROM documents")}
+
+    def used_question_ids(self) -> set[str]:
+        return {row[0] for row in self.conn.execute("SELECT question_id FROM queries")}
+
+    def count_documents(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def untranslated_documents(self, skip_sources: tuple[str, ...] = ("drcd",)) -> list[dict]:
+        """譯文仍與原文相同的文檔 (回傳原文)"""
+        rows = self.conn.execute(
+            f"SELECT * FROM documents WHERE content = content_raw AND original_source NOT IN ({','.join('?' * len(skip_sources))}) ORDER BY position",
+            skip_sources,
+        )
+        return [self._doc_dict(row, row["content_raw"]) for row in rows]
+
+    # ---- 寫入 (需在 transaction() 內呼叫) ----
+
+    def _next_position(self, table: str) -> int:
+        return self.conn.execute(f"SELECT COALESCE(MAX(position) + 1, 0) FROM {table}").fetchone()[0]
+
+    def _insert_documents(self, pairs: list[tuple[dict, dict]], start_position: int) -> None:
+        self.conn.executemany(
+            "INSERT INTO documents(doc_id, position, content, content_raw, content_hash, original_source, original_id, is_gold) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    raw["doc_id"], start_position + i, doc.get("content", raw["content"]), raw["content"],
+                    fingerprint(raw["content"]), raw["original_source"], raw.get("original_id", ""), int(bool(raw.get("is_gold"))),
+                )
+                for i, (doc, raw) in enumerate(pairs)
+            ],
+        )
+
+    def _insert_query(self, query: dict, query_raw: dict, position: int) -> None:
+        self.conn.execute(
+            "INSERT INTO queries(question_id, position, question, question_raw, gold_answer, gold_answer_raw, source_dataset, question_type) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                query_raw["question_id"], position, query.get("question", ""), query_raw.get("question", ""),
+                query.get("gold_answer", ""), query_raw.get("gold_answer", ""),
+                query_raw["source_dataset"], query_raw["question_type"],
+            ),
+        )
+        self.conn.executemany(
+            "INSERT INTO query_gold_docs(question_id, rank, doc_id) VALUES (?, ?, ?)",
+            [(query_raw["question_id"], rank, did) for rank, did in enumerate(query_raw.get("gold_doc_ids", []))],
+        )
+
+    def add_documents(self, docs: list[dict], docs_raw: list[dict]) -> None:
+        """新增文檔 (docs 為譯文，docs_raw 為原文，以 doc_id 對齊)"""
+        translated = {d["doc_id"]: d for d in docs}
+        self._mark_export_pending()
+        self._insert_documents(
+            [(translated.get(raw["doc_id"], raw), raw) for raw in docs_raw],
+            start_position=self._next_position("documents"),
+        )
+
+    def delete_documents(self, doc_ids: set[str] | list[str]) -> int:
+        """刪除文檔，回傳刪除數量"""
+        self._mark_export_pending()
+        cursor = self.conn.executemany("DELETE FROM documents WHERE doc_id = ?", [(did,) for did in doc_ids])
+        return cursor.rowcount
+
+    def replace_query(self, old_question_id: str, query: dict, query_raw: dict) -> None:
+        """以新題目取代舊題目 (保留原本的位置)"""
+        self._mark_export_pending()
+        row = self.conn.execute("SELECT position FROM queries WHERE question_id = ?", (old_question_id,)).fetchone()
+        position = row["position"] if row else self._next_position("queries")
+        self.conn.execute("DELETE FROM queries WHERE question_id = ?", (old_question_id,))
+        self.conn.execute("DELETE FROM query_gold_docs WHERE question_id = ?", (old_question_id,))
+        self._insert_query(query, query_raw, position)
+
+    def update_translation(self, doc_id: str, content: str) -> None:
+        """更新單篇文檔的譯文"""
+        self._mark_export_pending()
+        self.conn.execute("UPDATE documents SET content = ? WHERE doc_id = ?", (content, doc_id))
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "export"
+    store = DatasetStore(DB_PATH)
+    if command == "import":
+        store.import_json()
+        print(f"已由 JSON 匯入: {DB_PATH} ({store.count_documents()} 篇文檔)")
+    elif command == "export":
+        if not store.export_pending() and store.json_changed():
+            store.import_json()
+        store.export_json()
+        print(f"已匯出 JSON 至: {PROCESSED_DIR}")
+    else:
+        print("使用方式: uv run src/dataset_store.py [import|export]")
+        sys.exit(1)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+向量儲存 (memory-mapped，以內容雜湊為鍵)
+usage_guide.md 的評測流程每次都要重新 embedding 整個 corpus。本模組將向量持久化：
+
+- data/processed/embeddings/<name>-<dtype>/vectors.npy: (列數, 維度) 的 float32 / float16 矩陣 (memory map 載入)
+- data/processed/embeddings/<name>-<dtype>/index.json: 每列對應的內容雜湊，以及模型、維度、精度
+
+以內容雜湊為鍵：只有內容新增或變動的文字才需要 embedding (分批送出)，
+相同內容 (例如不同 doc_id 的重複段落) 只存一份；語料未變動時重新評測不會呼叫任何 embedding API。
+
+Embedding 來源：
+- openai: text-embedding-3-small (評測協定)
+- local: 以字元 n-gram 雜湊投影的決定性向量，離線測試用 (不需網路與 API Key)
+
+使用方式:
+    uv run src/embedding_store.py                       # 以 text-embedding-3-small 更新 corpus 向量
+    uv run src/embedding_store.py --embedder local      # 離線決定性向量
+    uv run src/embedding_store.py --prune               # 清除此 corpus 未使用的列
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from candidate_index import fingerprint
+from compiled_corpus import contents_of, doc_ids_of, load_corpus
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+EMBEDDINGS_DIR = PROCESSED_DIR / "embeddings"
+
+OPENAI_MODEL = "text-embedding-3-small"
+OPENAI_DIM = 1536
+LOCAL_DIM = 256
+BATCH_SIZE = 256   # 每次 embedding 請求的文字數
+MAX_RETRIES = 3    # 最大重試次數
+STORE_VERSION = 1
+
+# 設定標準輸出編碼為 utf-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def load_json(filepath: Path):
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(data, filepath: Path) -> None:
+    """儲存 JSON 檔案"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+class LocalEmbedder:
+    """
+    決定性的本地 embedding (離線測試用)
+
+    將字元 unigram / bigram 以雜湊投影到固定維度 (帶正負號)，再做 L2 正規化；
+    內容相近的文字會得到相近的向量，足以驗證檢索流程。
+    """
+
+    name = "local"
+
+    def __init__(self, dim: int = LOCAL_DIM):
+        self.dim = dim
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            text = "".join(text.lower().split())
+            grams = list(text) + [text[j:j + 2] for j in range(len(text) - 1)]
+            if not grams:
+                continue
+            hashes = np.array([int(fingerprint(g), 16) for g in grams], dtype=np.uint64)
+            buckets = (hashes % np.uint64(self.dim)).astype(np.int64)
+            signs = np.where((hashes >> np.uint64(32)) & np.uint64(1), 1.0, -1.0).astype(np.float32)
+            np.add.at(matrix[i], buckets, signs)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+
+class OpenAIEmbedder:
+    """OpenAI embedding (分批請求，失敗時以指數退避重試)"""
+
+    name = OPENAI_MODEL
+
+    def __init__(self, model: str = OPENAI_MODEL, dim: int = OPENAI_DIM):
+        from dotenv import load_dotenv
+        from openai import OpenAI
+
+        load_dotenv()
+        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.model = model
+        self.name = model
+        self.dim = dim
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        for attempt in range(MAX_RETRIES):
+            try:
+                response = self.client.embeddings.create(model=self.model, input=texts)
+                data = sorted(response.data, key=lambda item: item.index)
+                return np.array([item.embedding for item in data], dtype=np.float32)
+            except Exception:
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                time.sleep(2 ** attempt)  # 指數退避
+
+
+EMBEDDERS = {
+    "openai": OpenAIEmbedder,
+    "local": LocalEmbedder,
+}
+
+
+class RowView:
+    """
+    矩陣依 rows 順序的列子集，不複製整個矩陣
+
+    以切片或列號陣列索引時才讀取對應的列 (vector_search 的分塊檢索一次只讀取一塊)；
+    np.asarray(view) 會取出全部的列。
+    """
+
+    def __init__(self, matrix: np.ndarray, rows: np.ndarray):
+        self.matrix = matrix
+        self.rows = rows
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return (len(self.rows), self.matrix.shape[1])
+
+    @property
+    def dtype(self):
+        return self.matrix.dtype
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, key) -> np.ndarray:
+        return np.asarray(self.matrix[self.rows[key]])
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return np.asarray(self.matrix[self.rows], dtype=dtype)
+
+
+class EmbeddingStore:
+    """以內容雜湊為鍵的持久化向量矩陣"""
+
+    def __init__(self, store_dir: Path, meta: dict, vectors: np.ndarray | None):
+        self.store_dir = store_dir
+        self.meta = meta
+        self.hashes: list[str] = meta["hashes"]
+        self.row_of: dict[str, int] = {h: i for i, h in enumerate(self.hashes)}
+        self.vectors = vectors if vectors is not None else np.zeros((0, meta["dim"]), dtype=meta["dtype"])
+
+    @classmethod
+    def open(cls, name: str, dim: int, dtype: str = "float32", root: Path = EMBEDDINGS_DIR) -> "EmbeddingStore":
+        """開啟 (或建立) 向量儲存；每個模型與精度各自一個目錄，維度不同時重新開始"""
+        store_dir = root / f"{name.replace('/', '_')}-{dtype}"
+        index_path = store_dir / "index.json"
+        if index_path.exists():
+            meta = load_json(index_path)
+            if (meta.get("version"), meta.get("dim"), meta.get("dtype")) == (STORE_VERSION, dim, dtype):
+                vectors = np.load(store_dir / "vectors.npy", mmap_mode="r") if meta["hashes"] else None
+                return cls(store_dir, meta, vectors)
+        meta = {"version": STORE_VERSION, "name": name, "dim": dim, "dtype": dtype, "hashes": []}
+        return cls(store_dir, meta, None)
+
+    def missing(self, texts: list[str]) -> dict[str, str]:
+        """尚未 embedding 的文字 (內容雜湊 -> 文字，已去重)"""
+        pending = {}
+        for text in texts:
+            h = fingerprint(text)
+            if h not in self.row_of:
+                pending.setdefault(h, text)
+        return pending
+
+    def update(self, texts: list[str], embedder, batch_size: int = BATCH_SIZE, keep: set[str] | None = None) -> int:
+        """
+        為新內容分批 embedding 並寫入矩陣
+
+        Args:
+            keep: 若指定，只保留這些內容雜湊 (清除不再使用的列)
+
+        Returns:
+            實際 embedding 的文字數 (語料未變動時為 0)
+        """
+        pending = self.missing(texts)
+        stale = [h for h in self.hashes if keep is not None and h not in keep]
+        if not pending and not stale:
+            return 0
+
+        new_vectors = []
+        items = list(pending.items())
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            new_vectors.append(embedder.embed([text for _, text in batch]))
+            print(f"  embedding {min(start + batch_size, len(items))}/{len(items)}")
+
+        kept_rows = [i for i, h in enumerate(self.hashes) if keep is None or h in keep]
+        hashes = [self.hashes[i] for i in kept_rows] + [h for h, _ in items]
+
+        # 寫入新的矩陣檔後再替換，避免中斷時留下不完整的檔案
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.store_dir / "vectors.tmp.npy"
+        matrix = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=self.meta["dtype"], shape=(len(hashes), self.meta["dim"]))
+        matrix[:len(kept_rows)] = self.vectors[kept_rows]
+        offset = len(kept_rows)
+        for block in new_vectors:
+            matrix[offset:offset + len(block)] = block
+            offset += len(block)
+        matrix.flush()
+        del matrix
+        os.replace(tmp_path, self.store_dir / "vectors.npy")
+
+        self.meta["hashes"] = hashes
+        save_json(self.meta, self.store_dir / "index.json")
+        self.hashes = hashes
+        self.row_of = {h: i for i, h in enumerate(hashes)}
+        self.vectors = np.load(self.store_dir / "vectors.npy", mmap_mode="r")
+        return len(items)
+
+    def get(self, texts: list[str]) -> np.ndarray | RowView:
+        """
+        依文字取得向量；所有文字都必須已經 embedding
+
+        列順序與 texts 相同時直接回傳 memory-mapped 矩陣，否則回傳 RowView (讀取時才取出對應的列)，
+        兩者皆不會把整個矩陣載入記憶體；需要 float32 陣列時以 np.asarray(..., dtype=np.float32) 轉換。
+        """
+        rows = np.fromiter((self.row_of[fingerprint(t)] for t in texts), dtype=np.int64, count=len(texts))
+        if len(rows) == len(self.vectors) and np.array_equal(rows, np.arange(len(rows))):
+            return self.vectors
+        return RowView(self.vectors, rows)
+
+    def embed(self, texts: list[str], embedder, batch_size: int = BATCH_SIZE) -> np.ndarray | RowView:
+        """取得文字的向量，只為缺少的內容呼叫 embedder"""
+        self.update(texts, embedder, batch_size)
+        return self.get(texts)
+
+
+def embed_corpus(
+    corpus: list[dict], embedder, dtype: str = "float32", prune: bool = False
+) -> tuple[list[str], np.ndarray | RowView, int]:
+    """
+    取得 corpus 所有文檔的向量
+
+    同一個 embedder 的向量儲存由所有 corpus 共用 (例如 corpus.json 與 corpus_raw.json)，
+    預設不清除其他 corpus 的列，交替評測不同 corpus 時不會重新 embedding；
+    prune=True 時只保留此 corpus 用到的列 (embedding_store.py --prune)。
+
+    Returns:
+        (doc_ids, vectors, 本次 embedding 的文字數)
+    """
+    store = EmbeddingStore.open(embedder.name, embedder.dim, dtype)
+    texts = contents_of(corpus)
+    embedded = store.update(texts, embedder, keep={fingerprint(t) for t in texts} if prune else None)
+    return doc_ids_of(corpus), store.get(texts), embedded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="corpus 向量儲存")
+    parser.add_argument("--embedder", choices=list(EMBEDDERS), default="openai")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--corpus", type=Path, default=PROCESSED_DIR / "corpus.json")
+    parser.add_argument("--prune", action="store_true",
+                        help="清除此 corpus 未使用的列 (其他 corpus 之後需重新 embedding)")
+    args = parser.parse_args()
+
+    embedder = EMBEDDERS[args.embedder]()
+    start = time.perf_counter()
+    doc_ids, vectors, embedded = embed_corpus(load_corpus(args.corpus), embedder, args.dtype, prune=args.prune)
+    print(f"{embedder.name}: {len(doc_ids)} 篇文檔，本次 embedding {embedded} 篇，"
+          f"矩陣 {vectors.shape} ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+檢索延遲基準測試
+以同一組 queries.json 逐題呼叫檢索器 (warmup 後重複多輪)，將延遲與檢索品質一起記錄：
+
+- 延遲：每次呼叫以 perf_counter_ns 計時，回報 p50 / p95 / p99 / 平均 / 最大值與吞吐量 (每秒查詢數)，
+  並依 source_dataset 分組
+- 品質：以最後一輪的檢索結果計算 Hit Rate / Partial Hit Rate / MRR (retrieval_eval.py)
+- 結果存為 data/processed/latency/<名稱>.json；以 --baseline 指定先前的結果時，
+  p99 超過基準的 --max-p99-ratio 倍即回報 [FAIL] (品質提升但延遲倍增也會被擋下)
+
+檢索器為 callable: retrieve(question: str, k: int) -> list[doc_id]，可用內建名稱
+(bm25、vector-local、vector-openai) 或 "模組:函式" 指定 (函式不需參數，回傳 retrieve)。
+
+使用方式:
+    uv run src/latency_bench.py bm25 --trials 5
+    uv run src/latency_bench.py vector-local --k 5 10 --warmup 2
+    uv run src/latency_bench.py my_module:make_retriever --name my-system --baseline data/processed/latency/bm25.json
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+from retrieval_eval import RetrievalEvaluator
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+LATENCY_DIR = PROCESSED_DIR / "latency"
+
+PERCENTILES = [50, 95, 99]
+WARMUP_ROUNDS = 1
+TRIALS = 5
+MAX_P99_RATIO = 1.5  # p99 超過基準的倍數即視為退步
+
+# 設定標準輸出編碼為 utf-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def load_json(filepath: Path):
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(data, filepath: Path) -> None:
+    """儲存 JSON 檔案"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+Retriever = Callable[[str, int], list[str]]
+
+
+def bm25_retriever(corpus_path: Path) -> Retriever:
+    from bm25 import BM25Index
+
+    index = BM25Index.open(corpus_path)
+
+    def retrieve(question: str, k: int) -> list[str]:
+        return [doc_id for doc_id, _ in index.search(question, k)]
+    return retrieve
+
+
+def vector_retriever(corpus_path: Path, embedder_name: str) -> Retriever:
+    """精確向量檢索 (每次呼叫都會 embedding 查詢，延遲包含 embedding 時間)"""
+    from compiled_corpus import load_corpus
+    from embedding_store import EMBEDDERS, embed_corpus
+    from vector_search import exact_search, normalize_rows
+
+    embedder = EMBEDDERS[embedder_name]()
+    doc_ids, doc_vectors, _ = embed_corpus(load_corpus(corpus_path), embedder)
+    doc_ids = np.array(doc_ids)
+    doc_vectors = normalize_rows(doc_vectors)
+
+    def retrieve(question: str, k: int) -> list[str]:
+        _, rows = exact_search(normalize_rows(embedder.embed([question])), doc_vectors, k)
+        return doc_ids[rows[0]].tolist()
+    return retrieve
+
+
+RETRIEVERS = {
+    "bm25": bm25_retriever,
+    "vector-local": lambda corpus_path: vector_retriever(corpus_path, "local"),
+    "vector-openai": lambda corpus_path: vector_retriever(corpus_path, "openai"),
+}
+
+
+def load_retriever(spec: str, corpus_path: Path) -> Retriever:
+    """依內建名稱或 "模組:函式" 建立檢索器"""
+    if spec in RETRIEVERS:
+        return RETRIEVERS[spec](corpus_path)
+    if ":" not in spec:
+        raise ValueError(f"未知的檢索器: {spec} (可用: {', '.join(RETRIEVERS)} 或 模組:函式)")
+    module_name, func_name = spec.split(":", 1)
+    return getattr(importlib.import_module(module_name), func_name)()
+
+
+def latency_summary(latencies_ms: np.ndarray) -> dict:
+    """延遲分布摘要 (毫秒)"""
+    if latencies_ms.size == 0:
+        return {"count": 0}
+    values = np.percentile(latencies_ms, PERCENTILES)
+    return {
+        "count": int(latencies_ms.size),
+        **{f"p{p}": float(v) for p, v in zip(PERCENTILES, values)},
+        "mean": float(latencies_ms.mean()),
+        "max": float(latencies_ms.max()),
+    }
+
+
+def benchmark(
+    retrieve: Retriever, queries: list[dict], k: int, warmup: int = WARMUP_ROUNDS, trials: int = TRIALS
+) -> tuple[np.ndarray, list[list[str]], float]:
+    """
+    逐題呼叫檢索器：先跑 warmup 輪 (不計時)，再跑 trials 輪
+
+    Returns:
+        (latencies, retrieved, elapsed): (trials, 題數) 的延遲矩陣 (毫秒)、最後一輪的檢索結果、計時輪的總耗時 (秒)
+    """
+    questions = [q["question"] for q in queries]
+    for _ in range(warmup):
+        for question in questions:
+            retrieve(question, k)
+
+    latencies = np.empty((trials, len(questions)), dtype=np.float64)
+    retrieved: list[list[str]] = []
+    start = time.perf_counter()
+    for trial in range(trials):
+        retrieved = []
+        for i, question in enumerate(questions):
+            t0 = time.perf_counter_ns()
+            result = retrieve(question, k)
+            latencies[trial, i] = (time.perf_counter_ns() - t0) / 1e6
+            retrieved.append(result)
+    return latencies, retrieved, time.perf_counter() - start
+
+
+def run_benchmark(
+    name: str,
+    retrieve: Retriever,
+    queries: list[dict],
+    ks: list[int],
+    warmup: int = WARMUP_ROUNDS,
+    trials: int = TRIALS,
+) -> dict:
+    """執行基準測試並彙整延遲與品質指標"""
+    latencies, retrieved, elapsed = benchmark(retrieve, queries, max(ks), warmup, trials)
+    by_source = defaultdict(list)
+    for i, q in enumerate(queries):
+        by_source[q.get("source_dataset", "")].append(i)
+
+    evaluator = RetrievalEvaluator(queries)
+    quality = evaluator.evaluate(retrieved, ks)
+    return {
+        "name": name,
+        "settings": {"k": max(ks), "warmup": warmup, "trials": trials, "queries": len(queries)},
+        "environment": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "latency_ms": {
+            "overall": latency_summary(latencies.ravel()),
+            "by_source": {source: latency_summary(latencies[:, rows].ravel()) for source, rows in by_source.items()},
+        },
+        "throughput_qps": latencies.size / elapsed if elapsed > 0 else 0.0,
+        "quality": {
+            str(k): {"overall": r["overall"], "by_source": r["by_source"]} for k, r in quality.items()
+        },
+    }
+
+
+def compare_to_baseline(result: dict, baseline: dict, max_p99_ratio: float = MAX_P99_RATIO) -> bool:
+    """與基準結果比較延遲與品質，p99 退步超過門檻時回傳 False"""
+    current, base = result["latency_ms"]["overall"], baseline["latency_ms"]["overall"]
+    print(f"\n與基準 {baseline['name']} 比較:")
+    for key in [f"p{p}" for p in PERCENTILES]:
+        print(f"  {key}: {base[key]:.3f} -> {current[key]:.3f} ms ({current[key] / max(base[key], 1e-9):.2f}x)")
+    for k, r in result["quality"].items():
+        if k in baseline["quality"]:
+            before, after = baseline["quality"][k]["overall"], r["overall"]
+            print(f"  Top-{k} Hit Rate: {before['hit_rate']:.2%} -> {after['hit_rate']:.2%}，"
+                  f"MRR: {before['mrr']:.4f} -> {after['mrr']:.4f}")
+
+    ratio = current["p99"] / max(base["p99"], 1e-9)
+    if ratio > max_p99_ratio:
+        print(f"[FAIL] p99 延遲為基準的 {ratio:.2f} 倍 (門檻 {max_p99_ratio}x)")
+        return False
+    print(f"[PASS] p99 延遲在基準的 {max_p99_ratio}x 以內")
+    return True
+
+
+def print_result(result: dict) -> None:
+    settings = result["settings"]
+    print(f"\n⏱️ {result['name']}: {settings['queries']} 題 × {settings['trials']} 輪 (warmup {settings['warmup']} 輪)，"
+          f"吞吐量 {result['throughput_qps']:.1f} 查詢/秒")
+    print(f"{'分組':<12} {'p50':>9} {'p95':>9} {'p99':>9} {'mean':>9} {'max':>9}  (ms)")
+    sections = [("全部", result["latency_ms"]["overall"])] + list(result["latency_ms"]["by_source"].items())
+    for group, s in sections:
+        print(f"{group:<12} {s['p50']:>9.3f} {s['p95']:>9.3f} {s['p99']:>9.3f} {s['mean']:>9.3f} {s['max']:>9.3f}")
+    for k, r in result["quality"].items():
+        print(f"\n📊 Top-{k}")
+        for group, m in [("全部", r["overall"])] + list(r["by_source"].items()):
+            print(f"  【{group}】Hit Rate: {m['hit_rate']:.2%}，MRR: {m['mrr']:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="檢索延遲基準測試")
+    parser.add_argument("retriever", help=f"內建檢索器 ({', '.join(RETRIEVERS)}) 或 模組:函式")
+    parser.add_argument("--name", default=None, help="結果名稱 (預設為檢索器名稱)")
+    parser.add_argument("--corpus", type=Path, default=PROCESSED_DIR / "corpus.json")
+    parser.add_argument("--queries", type=Path, default=PROCESSED_DIR / "queries.json")
+    parser.add_argument("--k", type=int, nargs="+", default=[5])
+    parser.add_argument("--warmup", type=int, default=WARMUP_ROUNDS)
+    parser.add_argument("--trials", type=int, default=TRIALS)
+    parser.add_argument("--output", type=Path, default=None, help="預設 data/processed/latency/<名稱>.json")
+    parser.add_argument("--baseline", type=Path, default=None, help="先前的結果檔，用於比較延遲退步")
+    parser.add_argument("--max-p99-ratio", type=float, default=MAX_P99_RATIO)
+    args = parser.parse_args()
+
+    name = args.name or args.retriever.replace(":", "-")
+    retrieve = load_retriever(args.retriever, args.corpus)
+    result = run_benchmark(name, retrieve, load_json(args.queries), args.k, args.warmup, args.trials)
+    print_result(result)
+
+    output = args.output or LATENCY_DIR / f"{name}.json"
+    save_json(result, output)
+    print(f"\n已儲存: {output}")
+
+    if args.baseline and not compare_to_baseline(result, load_json(args.baseline), args.max_p99_ratio):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
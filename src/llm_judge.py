@@ -0,0 +1,283 @@
+"""
+LLM-as-a-Judge 評分 (非同步 + 磁碟快取)
+依 usage_guide.md 3.2 節的 Pass / Fail 判斷，並行評分所有模型回答：
+
+- 以 asyncio 並行送出請求，並以 token bucket 限制每分鐘請求數、以 semaphore 限制同時請求數
+- 評分結果以 (question_id, gold_answer, 模型回答, 評分 prompt, 評分模型) 的雜湊為鍵，
+  逐筆附加寫入 data/processed/judge_cache.jsonl；回答未變動的題目不會重新評分，中斷後也不會遺失已完成的結果
+- local 評分器以正規化字串比對判斷，供離線測試使用
+
+使用方式:
+    uv run src/llm_judge.py answers.json                  # answers.json: {question_id: 模型回答}
+    uv run src/llm_judge.py answers.json --judge local
+    uv run src/llm_judge.py answers.json --rpm 300 --concurrency 10 --output verdicts.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+CACHE_PATH = PROCESSED_DIR / "judge_cache.jsonl"
+
+JUDGE_MODEL = "gpt-4o-mini"
+MAX_CONCURRENCY = 20      # 同時進行的請求數
+REQUESTS_PER_MINUTE = 500
+MAX_RETRIES = 3           # 最大重試次數
+
+JUDGE_PROMPT = """請判斷「模型回答」是否與「標準答案」語意一致。
+
+問題：{question}
+標準答案：{gold_answer}
+模型回答：{model_answer}
+
+如果語意一致請回答 "Pass"，否則回答 "Fail"。"""
+
+NORMALIZE_PATTERN = re.compile("[\\s\\W_]+")
+
+# 設定標準輸出編碼為 utf-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def load_json(filepath: Path):
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(data, filepath: Path) -> None:
+    """儲存 JSON 檔案"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+class LocalJudge:
+    """
+    離線評分器：正規化後 (去除空白與標點、轉小寫) 一方包含另一方即為 Pass
+
+    只用於測試評分流程，不代表語意判斷的品質。
+    """
+
+    model = "local"
+    rate_limited = False  # 不呼叫任何 API，不需經過 rpm 限制
+
+    async def judge(self, prompt: str, item: dict) -> str:
+        gold = NORMALIZE_PATTERN.sub("", item["gold_answer"].lower())
+        answer = NORMALIZE_PATTERN.sub("", item["model_answer"].lower())
+        passed = bool(gold) and bool(answer) and (gold in answer or answer in gold)
+        return "Pass" if passed else "Fail"
+
+
+class OpenAIJudge:
+    """以 OpenAI Chat Completions 評分 (失敗時以指數退避重試)"""
+
+    rate_limited = True
+
+    def __init__(self, model: str = JUDGE_MODEL):
+        from dotenv import load_dotenv
+        from openai import AsyncOpenAI
+
+        load_dotenv()
+        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.model = model
+
+    async def judge(self, prompt: str, item: dict) -> str:
+        for attempt in range(MAX_RETRIES):
+            try:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0,
+                    max_tokens=5,
+                )
+                return response.choices[0].message.content.strip()
+            except Exception:
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                await asyncio.sleep(2 ** attempt)  # 指數退避
+
+
+JUDGES = {
+    "openai": OpenAIJudge,
+    "local": LocalJudge,
+}
+
+
+class RateLimiter:
+    """token bucket：平均每分鐘最多 rpm 個請求，允許 burst 個請求的突發"""
+
+    def __init__(self, rpm: float, burst: int = 1):
+        self.interval = 60.0 / rpm
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) * self.interval)
+
+
+class VerdictCache:
+    """以 JSONL 逐筆附加寫入的評分快取"""
+
+    def __init__(self, path: Path = CACHE_PATH):
+        self.path = path
+        self.verdicts: dict[str, bool] = {}
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 中斷時寫到一半的最後一行
+                    self.verdicts[record["key"]] = record["passed"]
+
+    @staticmethod
+    def key(item: dict, prompt_template: str, model: str) -> str:
+        payload = json.dumps(
+            [item["question_id"], item["gold_answer"], item["model_answer"], prompt_template, model],
+            ensure_ascii=False,
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> bool | None:
+        return self.verdicts.get(key)
+
+    def put(self, key: str, passed: bool, raw: str) -> None:
+        self.verdicts[key] = passed
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "passed": passed, "raw": raw}, ensure_ascii=False) + "\n")
+
+
+def parse_verdict(text: str) -> bool:
+    """評分模型回覆中含 Pass (且不含 Fail) 即為通過"""
+    lowered = text.lower()
+    return "pass" in lowered and "fail" not in lowered
+
+
+async def judge_items(
+    items: list[dict],
+    judge,
+    cache: VerdictCache,
+    prompt_template: str = JUDGE_PROMPT,
+    max_concurrency: int = MAX_CONCURRENCY,
+    rpm: float = REQUESTS_PER_MINUTE,
+) -> tuple[list[bool | None], int]:
+    """
+    並行評分 (快取命中者不送出請求)
+
+    Args:
+        items: [{question_id, question, gold_answer, model_answer}, ...]
+
+    Returns:
+        (verdicts, judged): 依 items 順序的 Pass / Fail (失敗為 None)，以及實際送出評分的數量
+
+    judge.rate_limited 為 False (例如 LocalJudge) 時不經過 rpm 限制；未定義時視為需要限制
+    """
+    verdicts: list[bool | None] = [None] * len(items)
+    keys = [VerdictCache.key(item, prompt_template, judge.model) for item in items]
+    # 相同內容只評分一次
+    pending: dict[str, list[int]] = defaultdict(list)
+    for i, key in enumerate(keys):
+        cached = cache.get(key)
+        if cached is None:
+            pending[key].append(i)
+        else:
+            verdicts[i] = cached
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = RateLimiter(rpm, burst=max_concurrency)
+
+    async def run(key: str, indices: list[int]) -> None:
+        item = items[indices[0]]
+        async with semaphore:
+            if getattr(judge, "rate_limited", True):
+                await limiter.acquire()
+            try:
+                raw = await judge.judge(prompt_template.format(**item), item)
+            except Exception as e:
+                print(f"  [Error] {item['question_id']} 評分失敗: {str(e)[:100]}")
+                return
+        passed = parse_verdict(raw)
+        cache.put(key, passed, raw)
+        for i in indices:
+            verdicts[i] = passed
+
+    await asyncio.gather(*(run(key, indices) for key, indices in pending.items()))
+    return verdicts, len(pending)
+
+
+def build_items(queries: list[dict], answers: dict[str, str]) -> list[dict]:
+    """將模型回答與題目、標準答案合併 (沒有回答的題目略過)"""
+    return [
+        {
+            "question_id": q["question_id"],
+            "question": q["question"],
+            "gold_answer": q["gold_answer"],
+            "model_answer": answers[q["question_id"]],
+            "source_dataset": q.get("source_dataset", ""),
+        }
+        for q in queries
+        if q["question_id"] in answers
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM-as-a-Judge 評分")
+    parser.add_argument("answers", type=Path, help="模型回答 JSON: {question_id: 回答}")
+    parser.add_argument("--queries", type=Path, default=PROCESSED_DIR / "queries.json")
+    parser.add_argument("--judge", choices=list(JUDGES), default="openai")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument("--rpm", type=float, default=REQUESTS_PER_MINUTE)
+    parser.add_argument("--cache", type=Path, default=CACHE_PATH)
+    parser.add_argument("--output", type=Path, default=None, help="將每題評分結果輸出為 JSON")
+    args = parser.parse_args()
+
+    items = build_items(load_json(args.queries), load_json(args.answers))
+    judge = JUDGES[args.judge]()
+    start = time.perf_counter()
+    verdicts, judged = asyncio.run(judge_items(
+        items, judge, VerdictCache(args.cache), max_concurrency=args.concurrency, rpm=args.rpm
+    ))
+    print(f"評分 {len(items)} 題，實際送出 {judged} 筆 (其餘命中快取)，{time.perf_counter() - start:.2f}s")
+
+    stats = defaultdict(lambda: [0, 0])
+    for item, passed in zip(items, verdicts):
+        if passed is None:
+            continue
+        for group in ("全部", item["source_dataset"]):
+            stats[group][0] += passed
+            stats[group][1] += 1
+    for group, (passed, total) in stats.items():
+        print(f"【{group}】通過率: {passed / total:.2%} ({passed}/{total})")
+    failed = sum(1 for v in verdicts if v is None)
+    if failed:
+        print(f"⚠️ {failed} 題評分失敗，重新執行即可只重試這些題目")
+
+    if args.output:
+        save_json({item["question_id"]: passed for item, passed in zip(items, verdicts)}, args.output)
+        print(f"已儲存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
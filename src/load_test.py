@@ -0,0 +1,288 @@
+"""
+開放迴路 (open-loop) 負載測試
+依目標 QPS 預先排定每個請求的送出時間 (固定間隔或 Poisson 到達)，不論前一個請求是否完成都照表送出，
+藉此觀察排隊效應 (closed-loop 的 latency_bench.py 會隱藏這部分)：
+
+- 目標可為 HTTP 端點 (POST {"question", "k"}，回傳 {"doc_ids": [...]}) 或 latency_bench.py 的檢索器
+- 同時進行的請求數以 --concurrency 限制，超出的請求在佇列中等待
+- 延遲分兩種記錄：service (實際開始 -> 完成) 與 corrected (排定時間 -> 完成，修正 coordinated omission)；
+  回報兩者的 p50 / p95 / p99、錯誤數與實際達成的 QPS
+- 以每題最後一次成功的結果計算負載下的 Hit Rate / MRR (失敗的題目視為未找到)；只計算該等級實際送出的題目，
+  送出數少於題數時提醒涵蓋率不足
+- 測試前先以 closed-loop 逐題呼叫一次作為參考結果，每個等級與參考結果在相同題目上的 Hit Rate 比較
+- --qps 可給多個值逐級加壓，輸出一張表，找出 Hit Rate 或延遲開始退化的 QPS
+
+serve 子命令啟動本地 stub 端點 (包裝內建檢索器，可加上模擬的服務時間)，供測試使用。
+
+使用方式:
+    uv run src/load_test.py serve --retriever bm25 --port 8765 --delay-ms 5
+    uv run src/load_test.py run http://127.0.0.1:8765/retrieve --qps 10 50 100 200 --duration 10
+    uv run src/load_test.py run bm25 --qps 100 500 --arrival constant --concurrency 4
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+from latency_bench import RETRIEVERS, latency_summary, load_retriever
+from retrieval_eval import RetrievalEvaluator
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+LOAD_DIR = PROCESSED_DIR / "load"
+
+DEFAULT_K = 5
+DURATION = 10.0        # 每個 QPS 等級的測試秒數
+MAX_CONCURRENCY = 16
+REQUEST_TIMEOUT = 30   # HTTP 請求逾時秒數
+SEED = 42
+
+# 設定標準輸出編碼為 utf-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def load_json(filepath: Path):
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(data, filepath: Path) -> None:
+    """儲存 JSON 檔案"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def http_retriever(url: str, timeout: float = REQUEST_TIMEOUT):
+    """將 HTTP 端點包裝為 retrieve(question, k) -> list[doc_id]"""
+    def retrieve(question: str, k: int) -> list[str]:
+        payload = json.dumps({"question": question, "k": k}, ensure_ascii=False).encode("utf-8")
+        request = urllib.request.Request(url, data=payload, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())["doc_ids"]
+    return retrieve
+
+
+def arrival_times(qps: float, duration: float, arrival: str, rng: np.random.Generator) -> np.ndarray:
+    """排定的送出時間 (相對於開始的秒數)"""
+    if arrival == "constant":
+        return np.arange(0, duration, 1.0 / qps)
+    gaps = rng.exponential(1.0 / qps, size=int(qps * duration * 1.5) + 16)
+    times = np.cumsum(gaps) - gaps[0]
+    return times[times < duration]
+
+
+def reference_results(retrieve, queries: list[dict], k: int = DEFAULT_K) -> list[list[str]]:
+    """closed-loop 逐題呼叫一次的檢索結果 (負載下 Hit Rate 的比較基準，失敗的題目為空結果)"""
+    retrieved = []
+    for query in queries:
+        try:
+            retrieved.append(retrieve(query["question"], k))
+        except Exception:
+            retrieved.append([])
+    return retrieved
+
+
+def run_load(
+    retrieve,
+    queries: list[dict],
+    qps: float,
+    duration: float = DURATION,
+    arrival: str = "poisson",
+    concurrency: int = MAX_CONCURRENCY,
+    k: int = DEFAULT_K,
+    seed: int = SEED,
+    reference: list[list[str]] | None = None,
+) -> dict:
+    """
+    以單一 QPS 等級執行開放迴路負載
+
+    請求 i 送出 queries[i % 題數]，品質只以實際送出的題目計算；
+    reference 為 reference_results() 的結果時，一併計算相同題目上的參考 Hit Rate / MRR。
+
+    Returns:
+        {"qps", "sent", "errors", "achieved_qps", "service_ms", "corrected_ms", "quality", "error_samples"}
+    """
+    schedule = arrival_times(qps, duration, arrival, np.random.default_rng(seed))
+    n = len(schedule)
+    scheduled = np.empty(n)
+    started = np.full(n, np.nan)
+    finished = np.full(n, np.nan)
+    failed = np.zeros(n, dtype=bool)
+    results: dict[int, list[str]] = {}
+    error_samples: list[str] = []
+    lock = threading.Lock()
+
+    def call(i: int) -> None:
+        started[i] = time.perf_counter()
+        query = queries[i % len(queries)]
+        try:
+            doc_ids = retrieve(query["question"], k)
+        except Exception as e:
+            failed[i] = True
+            with lock:
+                if len(error_samples) < 5:
+                    error_samples.append(f"{type(e).__name__}: {str(e)[:100]}")
+        else:
+            with lock:
+                results[i % len(queries)] = doc_ids
+        finished[i] = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        origin = time.perf_counter()
+        for i, offset in enumerate(schedule):
+            scheduled[i] = origin + offset
+            delay = scheduled[i] - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            # 照排定時間送出，不等待先前的請求完成
+            executor.submit(call, i)
+    wall = np.nanmax(finished) - origin if n else 0.0
+
+    ok = ~failed & ~np.isnan(finished)
+    covered = min(n, len(queries))
+    evaluator = RetrievalEvaluator(queries[:covered])
+    quality = evaluator.evaluate([results.get(i, []) for i in range(covered)], [k])[k]["overall"]
+    summary = {"hit_rate": quality["hit_rate"], "mrr": quality["mrr"], "answered": len(results), "covered": covered}
+    if reference is not None:
+        closed_loop = evaluator.evaluate(reference[:covered], [k])[k]["overall"]
+        summary["reference_hit_rate"] = closed_loop["hit_rate"]
+        summary["reference_mrr"] = closed_loop["mrr"]
+    return {
+        "qps": qps,
+        "sent": n,
+        "errors": int(failed.sum()),
+        "achieved_qps": float(ok.sum() / wall) if wall > 0 else 0.0,
+        "service_ms": latency_summary((finished - started)[ok] * 1000),
+        "corrected_ms": latency_summary((finished - scheduled)[ok] * 1000),
+        "quality": summary,
+        "error_samples": error_samples,
+    }
+
+
+def print_levels(levels: list[dict], slo_ms: float | None, n_queries: int) -> None:
+    print(f"\n{'QPS':>7} {'達成':>8} {'錯誤':>5} {'svc p50':>9} {'svc p99':>9} "
+          f"{'cor p50':>9} {'cor p95':>9} {'cor p99':>9} {'Hit':>8} {'MRR':>7}")
+    for level in levels:
+        svc, cor, q = level["service_ms"], level["corrected_ms"], level["quality"]
+        if cor["count"] == 0:
+            print(f"{level['qps']:>7.1f} {'-':>8} {level['errors']:>5}  全部失敗")
+            continue
+        flags = []
+        if slo_ms is not None and cor["p99"] > slo_ms:
+            flags.append(f"p99 > {slo_ms:g} ms")
+        if "reference_hit_rate" in q and q["hit_rate"] < q["reference_hit_rate"]:
+            flags.append(f"Hit Rate 低於 closed-loop ({q['reference_hit_rate']:.2%})")
+        if q["covered"] < n_queries:
+            flags.append(f"只送出 {q['covered']}/{n_queries} 題")
+        if level["errors"]:
+            flags.append("有錯誤")
+        print(f"{level['qps']:>7.1f} {level['achieved_qps']:>8.1f} {level['errors']:>5} {svc['p50']:>9.2f} {svc['p99']:>9.2f} "
+              f"{cor['p50']:>9.2f} {cor['p95']:>9.2f} {cor['p99']:>9.2f} {q['hit_rate']:>8.2%} {q['mrr']:>7.4f}"
+              + (f"  ⚠️ {'，'.join(flags)}" if flags else ""))
+    print("(延遲單位 ms；svc = 服務時間，cor = 自排定送出時間起算；Hit / MRR 只計算實際送出的題目)")
+
+
+def serve(retrieve, host: str, port: int, delay_ms: float = 0.0) -> None:
+    """啟動 stub 端點: POST /retrieve {"question", "k"} -> {"doc_ids": [...]}"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                if delay_ms:
+                    time.sleep(delay_ms / 1000)  # 模擬下游服務時間 (例如模型推論)
+                payload = json.dumps({"doc_ids": retrieve(body["question"], int(body.get("k", DEFAULT_K)))})
+                status = 200
+            except Exception as e:
+                payload, status = json.dumps({"error": str(e)}), 500
+            data = payload.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"stub 端點: http://{host}:{port}/retrieve (Ctrl+C 結束)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="開放迴路負載測試")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="啟動本地 stub 端點")
+    p_serve.add_argument("--retriever", default="bm25", help=f"內建檢索器 ({', '.join(RETRIEVERS)}) 或 模組:函式")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8765)
+    p_serve.add_argument("--delay-ms", type=float, default=0.0, help="每個請求額外的模擬服務時間")
+
+    p_run = sub.add_parser("run", help="執行負載測試")
+    p_run.add_argument("target", help="HTTP 端點 URL，或內建檢索器 / 模組:函式")
+    p_run.add_argument("--qps", type=float, nargs="+", default=[10.0])
+    p_run.add_argument("--duration", type=float, default=DURATION, help="每個 QPS 等級的秒數")
+    p_run.add_argument("--arrival", choices=["poisson", "constant"], default="poisson")
+    p_run.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    p_run.add_argument("--k", type=int, default=DEFAULT_K)
+    p_run.add_argument("--slo-ms", type=float, default=None, help="corrected p99 的延遲目標")
+    p_run.add_argument("--queries", type=Path, default=PROCESSED_DIR / "queries.json")
+    p_run.add_argument("--name", default=None)
+    p_run.add_argument("--output", type=Path, default=None, help="預設 data/processed/load/<名稱>.json")
+
+    for p in (p_serve, p_run):
+        p.add_argument("--corpus", type=Path, default=PROCESSED_DIR / "corpus.json")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(load_retriever(args.retriever, args.corpus), args.host, args.port, args.delay_ms)
+        return
+
+    is_http = args.target.startswith(("http://", "https://"))
+    retrieve = http_retriever(args.target) if is_http else load_retriever(args.target, args.corpus)
+    queries = load_json(args.queries)
+    print(f"closed-loop 參考結果 ({len(queries)} 題)...")
+    reference = reference_results(retrieve, queries, args.k)
+    levels = []
+    for qps in args.qps:
+        print(f"QPS {qps:g} ({args.arrival})，{args.duration:g} 秒，concurrency {args.concurrency}...")
+        level = run_load(retrieve, queries, qps, args.duration, args.arrival, args.concurrency, args.k, reference=reference)
+        if level["sent"] < len(queries):
+            print(f"  ⚠️ 只送出 {level['sent']} 個請求 (少於 {len(queries)} 題)，品質只計算已送出的題目；"
+                  f"可提高 --qps 或 --duration")
+        for sample in level["error_samples"]:
+            print(f"  [Error] {sample}")
+        levels.append(level)
+    print_levels(levels, args.slo_ms, len(queries))
+
+    name = args.name or ("http" if is_http else args.target.replace(":", "-"))
+    output = args.output or LOAD_DIR / f"{name}.json"
+    save_json({
+        "name": name,
+        "target": args.target,
+        "settings": {"arrival": args.arrival, "duration": args.duration, "concurrency": args.concurrency, "k": args.k},
+        "levels": levels,
+    }, output)
+    print(f"\n已儲存: {output}")
+
+
+if __name__ == "__main__":
+    main()
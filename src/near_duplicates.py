@@ -0,0 +1,274 @@
+"""
+近似重複文檔偵測腳本 (MinHash + LSH)
+remove_duplicates.py 與 verify_data.py 只能抓出完全相同的 doc_id；
+同一段 Wikipedia 段落可能同時來自 HotpotQA 與 2Wiki，或 DRCD 中幾乎相同的段落，
+以不同 doc_id 進入文檔庫而影響檢索指標。
+
+做法：
+1. 以字元 n-gram (shingle) 表示每篇文檔 (去除空白、轉小寫)
+2. 以 multiply-shift 雜湊族計算 MinHash 簽章 (NumPy 向量化)
+3. LSH banding：簽章切成多個 band，同一 band 完全相同者才成為候選對 (次平方時間)
+4. 以簽章估計的 Jaccard 相似度過濾候選對，再以 union-find 合併成重複群組
+
+使用方式:
+    uv run src/near_duplicates.py                 # 檢查翻譯後的 corpus.json
+    uv run src/near_duplicates.py --variant raw   # 檢查原文 corpus_raw.json
+    uv run src/near_duplicates.py --variant both  # 兩者皆檢查，合併群組
+    uv run src/near_duplicates.py --corpus data/processed/corpus_compiled   # 指定 corpus (JSON 或編譯後的目錄)
+
+輸出：
+- data/processed/near_duplicates.json: 重複群組，含建議保留 (keep) 與移除 (remove) 的 doc_id
+"""
+
+import argparse
+import json
+from pathlib import Path
+from collections import defaultdict
+
+import numpy as np
+
+from compiled_corpus import load_corpus
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+OUTPUT_PATH = PROCESSED_DIR / "near_duplicates.json"
+
+# MinHash / LSH 設定
+SHINGLE_SIZE = 5        # 字元 n-gram 長度
+NUM_PERM = 128          # MinHash 簽章長度
+NUM_BANDS = 16          # LSH band 數 (每個 band NUM_PERM // NUM_BANDS 列，門檻約 0.7)
+THRESHOLD = 0.8         # 估計 Jaccard 相似度門檻
+SEED = 42
+
+VARIANT_FILES = {
+    "processed": "corpus.json",
+    "raw": "corpus_raw.json",
+}
+
+# 字串多項式雜湊的底數 (奇數)
+_SHINGLE_BASE = np.uint64(1000003)
+
+
+def load_json(filepath: Path) -> list[dict]:
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(data, filepath: Path) -> None:
+    """儲存 JSON 檔案"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def normalize(text: str) -> str:
+    """正規化文字：轉小寫並移除所有空白"""
+    return "".join(text.lower().split())
+
+
+def shingle_hashes(text: str, k: int = SHINGLE_SIZE) -> np.ndarray:
+    """
+    計算文字所有字元 k-gram 的 32-bit 雜湊值 (去重)
+
+    以 code point 陣列做向量化的多項式雜湊，避免逐一建立子字串。
+    正規化後為空字串時沒有任何 shingle (回傳空陣列)。
+    """
+    codes = np.frombuffer(normalize(text).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if len(codes) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    if len(codes) < k:
+        k = len(codes)
+
+    window_count = len(codes) - k + 1
+    hashes = np.zeros(window_count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for j in range(k):
+            hashes = hashes * _SHINGLE_BASE + codes[j:j + window_count]
+    return np.unique(hashes >> np.uint64(32))
+
+
+class MinHasher:
+    """以 multiply-shift 雜湊族 h(x) = ((a*x + b) mod 2^64) >> 32 計算 MinHash 簽章"""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = SEED):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        # a 必須為奇數
+        self.a = (rng.integers(0, 2**63, size=num_perm, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+        self.b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles: np.ndarray) -> np.ndarray:
+        """計算單篇文檔的簽章 (num_perm,) uint32"""
+        with np.errstate(over="ignore"):
+            permuted = (self.a[:, None] * shingles[None, :] + self.b[:, None]) >> np.uint64(32)
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def signatures(self, texts: list[str], k: int = SHINGLE_SIZE) -> np.ndarray:
+        """計算所有文檔的簽章矩陣 (n_docs, num_perm)"""
+        matrix = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        for i, text in enumerate(texts):
+            matrix[i] = self.signature(shingle_hashes(text, k))
+        return matrix
+
+
+def lsh_candidate_pairs(signatures: np.ndarray, num_bands: int = NUM_BANDS) -> set[tuple[int, int]]:
+    """
+    LSH banding：同一 band 簽章完全相同的文檔成為候選對
+
+    每個 band 以 bucket 分組，僅在 bucket 內配對，整體為次平方時間。
+    """
+    n_docs, num_perm = signatures.shape
+    rows = num_perm // num_bands
+    pairs: set[tuple[int, int]] = set()
+    for band in range(num_bands):
+        band_view = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        buckets: dict[bytes, list[int]] = defaultdict(list)
+        for i in range(n_docs):
+            buckets[band_view[i].tobytes()].append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+def estimate_similarities(signatures: np.ndarray, pairs: list[tuple[int, int]]) -> np.ndarray:
+    """以簽章一致比例估計候選對的 Jaccard 相似度"""
+    if not pairs:
+        return np.zeros(0)
+    idx = np.asarray(pairs, dtype=np.int64)
+    return (signatures[idx[:, 0]] == signatures[idx[:, 1]]).mean(axis=1)
+
+
+def cluster_pairs(n_docs: int, pairs: list[tuple[int, int]]) -> list[list[int]]:
+    """以 union-find 將相似對合併為群組"""
+    parent = list(range(n_docs))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for x, y in pairs:
+        root_x, root_y = find(x), find(y)
+        if root_x != root_y:
+            parent[max(root_x, root_y)] = min(root_x, root_y)
+
+    groups: dict[int, list[int]] = defaultdict(list)
+    for i in range(n_docs):
+        groups[find(i)].append(i)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def find_near_duplicates(
+    corpus: list[dict],
+    threshold: float = THRESHOLD,
+    num_perm: int = NUM_PERM,
+    num_bands: int = NUM_BANDS,
+    shingle_size: int = SHINGLE_SIZE,
+) -> list[tuple[str, str, float]]:
+    """
+    找出 corpus 中估計相似度 >= threshold 的文檔對
+
+    沒有任何 shingle 的文檔 (空白內容) 略過，否則它們的簽章完全相同，會全部被歸為同一群。
+
+    Returns:
+        [(doc_id_a, doc_id_b, similarity), ...]
+    """
+    texts = [doc.get("content", "") for doc in corpus]
+    rows = [i for i, text in enumerate(texts) if normalize(text)]
+    hasher = MinHasher(num_perm)
+    signatures = hasher.signatures([texts[i] for i in rows], shingle_size)
+    candidates = sorted(lsh_candidate_pairs(signatures, num_bands))
+    similarities = estimate_similarities(signatures, candidates)
+    return [
+        (corpus[rows[i]]["doc_id"], corpus[rows[j]]["doc_id"], float(sim))
+        for (i, j), sim in zip(candidates, similarities)
+        if sim >= threshold and corpus[rows[i]]["doc_id"] != corpus[rows[j]]["doc_id"]
+    ]
+
+
+def build_clusters(docs_by_id: dict[str, dict], pairs: list[tuple[str, str, float]]) -> list[dict]:
+    """
+    將相似對整理成重複群組並決定保留策略
+
+    保留策略：Gold 文檔一律保留 (被 queries 引用)；
+    群組內若沒有 Gold 文檔，保留第一篇，其餘建議移除。
+
+    min_best_similarity：每篇成員與其最相似文檔的相似度，取群組中的最小值
+    (群組經 union-find 串接而成，並非任兩篇成員的相似度都達到此值)。
+    """
+    doc_ids = list(dict.fromkeys(did for i, j, _ in pairs for did in (i, j)))
+    position = {did: n for n, did in enumerate(doc_ids)}
+    best_similarity: dict[str, float] = defaultdict(float)
+    for i, j, sim in pairs:
+        best_similarity[i] = max(best_similarity[i], sim)
+        best_similarity[j] = max(best_similarity[j], sim)
+
+    clusters = []
+    index_pairs = [(position[i], position[j]) for i, j, _ in pairs]
+    for members in cluster_pairs(len(doc_ids), index_pairs):
+        docs = [docs_by_id[doc_ids[n]] for n in members]
+        keep = [d["doc_id"] for d in docs if d.get("is_gold")] or [docs[0]["doc_id"]]
+        clusters.append({
+            "doc_ids": [d["doc_id"] for d in docs],
+            "sources": [d.get("original_source") for d in docs],
+            "keep": keep,
+            "remove": [d["doc_id"] for d in docs if d["doc_id"] not in keep],
+            "min_best_similarity": round(min(best_similarity[d["doc_id"]] for d in docs), 4),
+        })
+    return clusters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MinHash-LSH 近似重複文檔偵測")
+    parser.add_argument("--variant", choices=["processed", "raw", "both"], default="processed")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--corpus", type=Path, default=None, help="改為檢查此 corpus (JSON 或編譯後的目錄，忽略 --variant)")
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("近似重複文檔偵測 (MinHash + LSH)")
+    print("=" * 60)
+
+    # 兩種變體的相似對以 doc_id 聯集，任一變體判定相似即歸為同群
+    if args.corpus:
+        paths = {str(args.corpus): args.corpus}
+    else:
+        variants = ["processed", "raw"] if args.variant == "both" else [args.variant]
+        paths = {variant: PROCESSED_DIR / VARIANT_FILES[variant] for variant in variants}
+    docs_by_id: dict[str, dict] = {}
+    all_pairs = []
+    for variant, path in paths.items():
+        corpus = list(load_corpus(path))
+        pairs = find_near_duplicates(corpus, threshold=args.threshold)
+        for doc in corpus:
+            docs_by_id.setdefault(doc["doc_id"], doc)
+        all_pairs.extend(pairs)
+        print(f"\n[{variant}] {len(corpus)} 篇文檔，{len(pairs)} 組相似對")
+
+    clusters = build_clusters(docs_by_id, all_pairs)
+    for cluster in clusters:
+        print(f"  - {cluster['doc_ids']} (sources={cluster['sources']}, 各成員最佳相似度>={cluster['min_best_similarity']})")
+    save_json({
+        "variant": str(args.corpus) if args.corpus else args.variant,
+        "threshold": args.threshold,
+        "num_perm": NUM_PERM,
+        "num_bands": NUM_BANDS,
+        "shingle_size": SHINGLE_SIZE,
+        "clusters": clusters,
+    }, args.output)
+
+    removable = sum(len(c["remove"]) for c in clusters)
+    print(f"\n共 {len(clusters)} 個重複群組，建議移除 {removable} 篇文檔")
+    print(f"已儲存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,18 @@
 輸出：
 - data/processed/queries_raw.json: 50 筆 QA 對
 - data/processed/corpus_raw.json: 500 篇文檔
+
+巢狀分級 (--tiers)：一次採樣產生 micro / small / large 三個分級，較小的分級必為較大分級的子集
+(各來源取採樣順序的前 N 題，文檔為這些題目的黃金文檔、困難負樣本與隨機負樣本池的前綴)。
+queries_raw.json / corpus_raw.json 改為最大分級的共用資料 (翻譯、embedding、索引都只需做一次)，
+各分級以 data/processed/tiers/<分級>.json 清單列出成員 question_id 與 doc_id。
+
+使用方式:
+    uv run src/process_data.py
+    uv run src/process_data.py --tiers
 """
 
+import argparse
 import json
 import uuid
 import random
@@ -30,6 +40,14 @@ SAMPLING_CONFIG = {
 
 TOTAL_CORPUS_SIZE = 600
 
+# 巢狀分級 (count 為每個來源的題數)，由小到大排列
+TIERS = {
+    "micro": {"count": 5, "corpus_size": 150},
+    "small": {"count": 20, "corpus_size": 600},
+    "large": {"count": 100, "corpus_size": 3000},
+}
+TIERS_DIR = PROCESSED_DIR / "tiers"
+
 
 def generate_doc_id(source: str, original_id: str) -> str:
     """生成唯一的文檔 ID"""
@@ -186,7 +204,7 @@ def process_squad(data: list[dict], count: int) -> tuple[list[dict], list[dict],
     return queries, gold_docs, used_contexts
 
 
-def process_hotpotqa(data: list[dict], count: int) -> tuple[list[dict], list[dict], list[dict], set[str]]:
+def process_hotpotqa(data: list[dict], count: int) -> tuple[list[dict], list[dict], list[dict], set[str], dict[str, list[str]]]:
     """
     處理 HotpotQA 資料集
     結構: [{id, question, answer, supporting_facts: {title, sent_id}, 
@@ -197,11 +215,13 @@ def process_hotpotqa(data: list[dict], count: int) -> tuple[list[dict], list[dic
         gold_docs: 黃金文檔列表
         hard_negatives: 困難負樣本列表
         used_contexts: 已使用的 context 集合
+        query_docs: 每題 question_id -> 該題的黃金文檔與困難負樣本 doc_id (供巢狀分級使用)
     """
     queries = []
     gold_docs = []
     hard_negatives = []
     used_contexts: set[str] = set()
+    query_docs: dict[str, list[str]] = {}
     
     # 隨機打亂
     data_copy = data.copy()
@@ -225,6 +245,7 @@ def process_hotpotqa(data: list[dict], count: int) -> tuple[list[dict], list[dic
         
         # 建立 title -> doc 的映射
         gold_doc_ids = []
+        question_doc_ids = []
         question_used_contexts = []
         
         for i, title in enumerate(titles):
@@ -259,6 +280,7 @@ def process_hotpotqa(data: list[dict], count: int) -> tuple[list[dict], list[dic
             else:
                 hard_negatives.append(doc)
             
+            question_doc_ids.append(doc_id)
             question_used_contexts.append(content)
         
         # 只有當有黃金文檔時才添加問題
@@ -272,12 +294,13 @@ def process_hotpotqa(data: list[dict], count: int) -> tuple[list[dict], list[dic
                 "question_type": "multi-hop",
             })
             used_contexts.update(question_used_contexts)
+            query_docs[question_id] = question_doc_ids
     
     print(f"[HotpotQA] 提取 {len(queries)} 題 QA, {len(gold_docs)} 篇黃金文檔, {len(hard_negatives)} 篇困難負樣本")
-    return queries, gold_docs, hard_negatives, used_contexts
+    return queries, gold_docs, hard_negatives, used_contexts, query_docs
 
 
-def process_2wiki(data: list[dict], count: int) -> tuple[list[dict], list[dict], list[dict], set[str]]:
+def process_2wiki(data: list[dict], count: int) -> tuple[list[dict], list[dict], list[dict], set[str], dict[str, list[str]]]:
     """
     處理 2WikiMultiHopQA 資料集
     結構類似 HotpotQA
@@ -286,6 +309,7 @@ def process_2wiki(data: list[dict], count: int) -> tuple[list[dict], list[dict],
     gold_docs = []
     hard_negatives = []
     used_contexts: set[str] = set()
+    query_docs: dict[str, list[str]] = {}
     
     # 隨機打亂
     data_copy = data.copy()
@@ -309,6 +333,7 @@ def process_2wiki(data: list[dict], count: int) -> tuple[list[dict], list[dict],
         
         # 建立 title -> doc 的映射
         gold_doc_ids = []
+        question_doc_ids = []
         question_used_contexts = []
         
         for i, title in enumerate(titles):
@@ -342,6 +367,7 @@ def process_2wiki(data: list[dict], count: int) -> tuple[list[dict], list[dict],
             else:
                 hard_negatives.append(doc)
             
+            question_doc_ids.append(doc_id)
             question_used_contexts.append(content)
         
         # 只有當有黃金文檔時才添加問題
@@ -355,9 +381,10 @@ def process_2wiki(data: list[dict], count: int) -> tuple[list[dict], list[dict],
                 "question_type": "multi-hop",
             })
             used_contexts.update(question_used_contexts)
+            query_docs[question_id] = question_doc_ids
     
     print(f"[2Wiki] 提取 {len(queries)} 題 QA, {len(gold_docs)} 篇黃金文檔, {len(hard_negatives)} 篇困難負樣本")
-    return queries, gold_docs, hard_negatives, used_contexts
+    return queries, gold_docs, hard_negatives, used_contexts, query_docs
 
 
 def collect_random_negatives(
@@ -434,7 +461,72 @@ def collect_random_negatives_drcd_only(
     return random_negatives[:target_count]
 
 
+def build_tiers(
+    all_queries: list[dict],
+    query_docs: dict[str, list[str]],
+    random_negatives: list[dict],
+    tiers: dict[str, dict] = TIERS,
+) -> dict[str, dict]:
+    """
+    組出巢狀分級的成員
+
+    每個來源取採樣順序的前 count 題；文檔為這些題目的黃金文檔與困難負樣本，
+    再以隨機負樣本池的前綴補足 corpus_size (前綴長度不小於較小分級，確保子集關係)。
+
+    Returns:
+        {分級: {"question_ids": [...], "doc_ids": set(...)}}
+    """
+    by_source: dict[str, list[str]] = {}
+    for q in all_queries:
+        by_source.setdefault(q["source_dataset"], []).append(q["question_id"])
+
+    members = {}
+    n_random = 0
+    for name, config in tiers.items():
+        question_ids = [qid for qids in by_source.values() for qid in qids[:config["count"]]]
+        doc_ids = {doc_id for qid in question_ids for doc_id in query_docs[qid]}
+        n_random = max(n_random, config["corpus_size"] - len(doc_ids))
+        if n_random > len(random_negatives):
+            print(f"  ⚠️ [{name}] 隨機負樣本不足: 需要 {n_random} 篇，只有 {len(random_negatives)} 篇")
+        doc_ids.update(doc["doc_id"] for doc in random_negatives[:n_random])
+        members[name] = {"question_ids": question_ids, "doc_ids": doc_ids}
+    return members
+
+
+def save_tier_manifests(
+    members: dict[str, dict], all_queries: list[dict], all_corpus: list[dict], tiers: dict[str, dict] = TIERS
+) -> None:
+    """輸出各分級清單 (成員依共用檔案中的順序排列)"""
+    names = list(tiers)
+    for i, name in enumerate(names):
+        question_ids = set(members[name]["question_ids"])
+        doc_ids = members[name]["doc_ids"]
+        manifest = {
+            "tier": name,
+            "parent": names[i + 1] if i + 1 < len(names) else None,
+            "count_per_source": tiers[name]["count"],
+            "corpus_size": tiers[name]["corpus_size"],
+            "shared": {"queries": "queries.json", "corpus": "corpus.json", "raw_queries": "queries_raw.json",
+                       "raw_corpus": "corpus_raw.json"},
+            "question_ids": [q["question_id"] for q in all_queries if q["question_id"] in question_ids],
+            "doc_ids": [doc["doc_id"] for doc in all_corpus if doc["doc_id"] in doc_ids],
+        }
+        save_json(manifest, TIERS_DIR / f"{name}.json")
+        print(f"  - [{name}] {len(manifest['question_ids'])} 題，{len(manifest['doc_ids'])} 篇文檔: "
+              f"{TIERS_DIR / f'{name}.json'}")
+
+
 def main():
+    parser = argparse.ArgumentParser(description="資料提取與處理")
+    parser.add_argument("--tiers", action="store_true", help="一次產生巢狀分級 (micro / small / large)")
+    args = parser.parse_args()
+
+    # 分級模式以最大分級的題數採樣，較小分級取其前綴
+    counts = {
+        source: max(tier["count"] for tier in TIERS.values()) if args.tiers else config["count"]
+        for source, config in SAMPLING_CONFIG.items()
+    }
+
     print("=" * 60)
     print("開始資料提取與處理")
     print("=" * 60)
@@ -452,17 +544,17 @@ def main():
     # 處理各資料集
     print("\n[2/4] 處理 DRCD...")
     drcd_queries, drcd_gold_docs, drcd_used = process_drcd(
-        drcd_data, SAMPLING_CONFIG["drcd"]["count"]
+        drcd_data, counts["drcd"]
     )
     
     print("\n[3/4] 處理 HotpotQA...")
-    hotpot_queries, hotpot_gold_docs, hotpot_hard_negs, hotpot_used = process_hotpotqa(
-        hotpotqa_data, SAMPLING_CONFIG["hotpotqa"]["count"]
+    hotpot_queries, hotpot_gold_docs, hotpot_hard_negs, hotpot_used, hotpot_docs = process_hotpotqa(
+        hotpotqa_data, counts["hotpotqa"]
     )
     
     print("\n[4/4] 處理 2WikiMultiHopQA...")
-    wiki2_queries, wiki2_gold_docs, wiki2_hard_negs, wiki2_used = process_2wiki(
-        wiki2_data, SAMPLING_CONFIG["2wiki"]["count"]
+    wiki2_queries, wiki2_gold_docs, wiki2_hard_negs, wiki2_used, wiki2_docs = process_2wiki(
+        wiki2_data, counts["2wiki"]
     )
     
     # 合併所有 queries
@@ -477,7 +569,15 @@ def main():
     
     # 計算需要多少隨機負樣本
     current_corpus_size = len(all_gold_docs) + len(all_hard_negatives)
-    needed_random_negs = TOTAL_CORPUS_SIZE - current_corpus_size
+    total_corpus_size = TOTAL_CORPUS_SIZE
+    if args.tiers:
+        # 分級只納入被採用題目的文檔 (沒有黃金文檔而被略過的題目，其困難負樣本不計入)
+        query_docs = {q["question_id"]: q["gold_doc_ids"] for q in drcd_queries}
+        query_docs.update(hotpot_docs)
+        query_docs.update(wiki2_docs)
+        current_corpus_size = len({doc_id for doc_ids in query_docs.values() for doc_id in doc_ids})
+        total_corpus_size = max(tier["corpus_size"] for tier in TIERS.values())
+    needed_random_negs = total_corpus_size - current_corpus_size
     
     print(f"\n[組裝文檔池]")
     print(f"  - 黃金文檔: {len(all_gold_docs)} 篇")
@@ -499,6 +599,13 @@ def main():
     # 打亂文檔順序
     random.shuffle(all_corpus)
     
+    if args.tiers:
+        members = build_tiers(all_queries, query_docs, random_negatives)
+        # 共用檔案為最大分級 (不屬於任何題目的困難負樣本不納入)
+        largest = members[list(TIERS)[-1]]
+        all_queries = [q for q in all_queries if q["question_id"] in set(largest["question_ids"])]
+        all_corpus = [doc for doc in all_corpus if doc["doc_id"] in largest["doc_ids"]]
+    
     # 輸出統計
     print(f"\n{'=' * 60}")
     print("最終統計")
@@ -519,6 +626,13 @@ def main():
     save_json(all_corpus, PROCESSED_DIR / "corpus_raw.json")
     print(f"  - 已儲存: {PROCESSED_DIR / 'queries_raw.json'}")
     print(f"  - 已儲存: {PROCESSED_DIR / 'corpus_raw.json'}")
+    if args.tiers:
+        save_tier_manifests(members, all_queries, all_corpus)
+    elif TIERS_DIR.exists():
+        # 舊的分級清單對應的是上一次的採樣結果
+        for path in TIERS_DIR.glob("*.json"):
+            path.unlink()
+        print(f"  - 已移除舊的分級清單: {TIERS_DIR}")
     
     print(f"\n{'=' * 60}")
     print("處理完成！")
@@ -0,0 +1,225 @@
+"""
+檢索評測模組 (NumPy 向量化)
+計算 usage_guide.md 定義的檢索指標，並依資料來源與題型分組：
+- Hit Rate (單一)：至少找到 1 篇黃金文檔的題目比例
+- Partial Hit Rate：找到的黃金文檔數 / 黃金文檔總數
+- MRR：每題所有黃金文檔排名倒數的平均 (未找到者計 0)，再對題目取平均
+- Strict Recall：找到所有黃金文檔的題目比例 (多跳題即 strict multi-hop recall)
+
+做法：檢索結果 (題數 × k 的 doc_id 矩陣) 只做一次 doc_id → 整數對應，
+算出每題每篇黃金文檔第一次出現的排名 (題數 × 黃金文檔數)，
+之後任何 k 的所有指標與分組統計都只是陣列比較與 bincount。
+
+使用方式:
+    uv run src/retrieval_eval.py run.json                 # run.json: {question_id: [doc_id, ...]}
+    uv run src/retrieval_eval.py run.json --k 1 3 5 10 --output metrics.json
+
+程式中使用:
+    from retrieval_eval import RetrievalEvaluator
+    evaluator = RetrievalEvaluator(queries)
+    results = evaluator.evaluate(retrieved_doc_ids, ks=[5])   # retrieved_doc_ids 依 queries 順序
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+
+DEFAULT_KS = [5]
+
+# 設定標準輸出編碼為 utf-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def load_json(filepath: Path):
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(data, filepath: Path) -> None:
+    """儲存 JSON 檔案"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def pad_ragged(rows: list[list[str]], width: int | None = None) -> np.ndarray:
+    """將長度不一的 doc_id 列表補齊為 (題數, width) 的字串矩陣 (空字串補位)"""
+    width = width if width is not None else max((len(r) for r in rows), default=0)
+    matrix = np.full((len(rows), max(width, 1)), "", dtype=object)
+    for i, row in enumerate(rows):
+        row = list(row)[:width]
+        matrix[i, :len(row)] = row
+    return matrix
+
+
+class RetrievalEvaluator:
+    """
+    以 queries 的 gold_doc_ids 建立評測器，可重複評測多組檢索結果
+
+    Attributes:
+        gold: (題數, 最大黃金文檔數) 的黃金文檔整數代碼，-1 為補位
+        gold_count: 每題黃金文檔數
+        groups: {"source": (代碼陣列, 名稱列表), "type": (...)}
+    """
+
+    def __init__(self, queries: list[dict]):
+        self.question_ids = [q["question_id"] for q in queries]
+        gold_lists = [list(dict.fromkeys(q["gold_doc_ids"])) for q in queries]
+
+        # 只需要為黃金文檔編碼：其他 doc_id 不可能命中，一律對應為 -1
+        self.gold_doc_ids = np.array(sorted({d for g in gold_lists for d in g}), dtype=str)
+        self.gold = self.encode(gold_lists)
+        self.gold_count = (self.gold >= 0).sum(axis=1)
+
+        self.groups = {}
+        for name, field in (("source", "source_dataset"), ("type", "question_type")):
+            labels = sorted({q.get(field, "") for q in queries})
+            codes = np.array([labels.index(q.get(field, "")) for q in queries], dtype=np.int64)
+            self.groups[name] = (codes, labels)
+
+    def encode(self, doc_ids) -> np.ndarray:
+        """將 doc_id 矩陣對應為黃金文檔整數代碼 (非黃金文檔為 -1)，以排序後二分搜尋向量化"""
+        matrix = doc_ids if isinstance(doc_ids, np.ndarray) else pad_ragged(doc_ids)
+        keys = matrix.astype(str)
+        if len(self.gold_doc_ids) == 0:
+            return np.full(keys.shape, -1, dtype=np.int64)
+        positions = np.searchsorted(self.gold_doc_ids, keys)
+        positions = np.minimum(positions, len(self.gold_doc_ids) - 1)
+        matched = self.gold_doc_ids[positions] == keys
+        return np.where(matched, positions, -1)
+
+    def gold_ranks(self, retrieved) -> np.ndarray:
+        """
+        每題每篇黃金文檔在檢索結果中第一次出現的排名 (1-based)
+
+        Returns:
+            (題數, 最大黃金文檔數) float 陣列，未找到或補位為 inf
+        """
+        return self.ranks_from_codes(self.encode(retrieved))
+
+    def ranks_from_codes(self, codes: np.ndarray) -> np.ndarray:
+        """同 gold_ranks，但輸入為已對應好的黃金文檔整數代碼矩陣 (-1 為非黃金文檔)"""
+        if codes.shape[0] != self.gold.shape[0]:
+            raise ValueError(f"檢索結果有 {codes.shape[0]} 題，但 queries 有 {self.gold.shape[0]} 題")
+        # (題數, k, 黃金文檔數)：第 r 名是否為第 g 篇黃金文檔
+        matches = (codes[:, :, None] == self.gold[:, None, :]) & (self.gold[:, None, :] >= 0)
+        found = matches.any(axis=1)
+        first_rank = matches.argmax(axis=1) + 1
+        return np.where(found, first_rank, np.inf)
+
+    def per_question(self, ranks: np.ndarray, k: int) -> dict[str, np.ndarray]:
+        """由黃金文檔排名計算每題的指標 (在 top-k 內)"""
+        within = ranks <= k
+        found = within.sum(axis=1)
+        gold_count = np.maximum(self.gold_count, 1)
+        reciprocal = np.where(within, 1.0 / ranks, 0.0).sum(axis=1) / gold_count
+        return {
+            "found": found,
+            "hit": (found > 0).astype(np.float64),
+            "rr": reciprocal,
+            "strict": ((found == self.gold_count) & (self.gold_count > 0)).astype(np.float64),
+        }
+
+    def aggregate(self, per_q: dict[str, np.ndarray], codes: np.ndarray, n_groups: int) -> list[dict]:
+        """以 bincount 將每題指標彙總到各組"""
+        count = np.bincount(codes, minlength=n_groups)
+        found = np.bincount(codes, weights=per_q["found"], minlength=n_groups)
+        gold = np.bincount(codes, weights=self.gold_count, minlength=n_groups)
+        hit = np.bincount(codes, weights=per_q["hit"], minlength=n_groups)
+        rr = np.bincount(codes, weights=per_q["rr"], minlength=n_groups)
+        strict = np.bincount(codes, weights=per_q["strict"], minlength=n_groups)
+        safe_count = np.maximum(count, 1)
+        return [
+            {
+                "count": int(count[g]),
+                "hit_rate": float(hit[g] / safe_count[g]),
+                "partial_hit_rate": float(found[g] / gold[g]) if gold[g] else 0.0,
+                "mrr": float(rr[g] / safe_count[g]),
+                "strict_recall": float(strict[g] / safe_count[g]),
+                "found": int(found[g]),
+                "gold": int(gold[g]),
+            }
+            for g in range(n_groups)
+        ]
+
+    def evaluate(self, retrieved, ks: list[int] = DEFAULT_KS) -> dict[int, dict]:
+        """
+        評測一組檢索結果
+
+        Args:
+            retrieved: 依 queries 順序的檢索結果 (doc_id 列表的列表或字串矩陣)
+            ks: 要計算的 top-k 截斷
+
+        Returns:
+            {k: {"overall": 指標, "by_source": {來源: 指標}, "by_type": {題型: 指標}, "strict_multihop_recall": float}}
+        """
+        return self.evaluate_ranks(self.gold_ranks(retrieved), ks)
+
+    def evaluate_ranks(self, ranks: np.ndarray, ks: list[int] = DEFAULT_KS) -> dict[int, dict]:
+        """由 gold_ranks 的結果計算所有指標 (格式同 evaluate)"""
+        all_codes = np.zeros(len(self.question_ids), dtype=np.int64)
+        results = {}
+        for k in ks:
+            per_q = self.per_question(ranks, k)
+            by_group = {}
+            for name, (codes, labels) in self.groups.items():
+                by_group[name] = dict(zip(labels, self.aggregate(per_q, codes, len(labels))))
+            multihop = by_group["type"].get("multi-hop")
+            results[k] = {
+                "overall": self.aggregate(per_q, all_codes, 1)[0],
+                "by_source": by_group["source"],
+                "by_type": by_group["type"],
+                "strict_multihop_recall": multihop["strict_recall"] if multihop else None,
+            }
+        return results
+
+
+def align_run(run: dict[str, list[str]], question_ids: list[str]) -> list[list[str]]:
+    """將 {question_id: [doc_id, ...]} 依 queries 順序排列 (缺少的題目視為沒有檢索結果)"""
+    return [run.get(qid, []) for qid in question_ids]
+
+
+def print_report(results: dict[int, dict]) -> None:
+    """依 usage_guide.md 的格式輸出各來源指標"""
+    for k, result in results.items():
+        print(f"\n📊 Top-{k}")
+        sections = [("全部", result["overall"])] + list(result["by_source"].items())
+        for name, m in sections:
+            print(f"【{name}】")
+            print(f"問題數:           {m['count']}")
+            print(f"Hit Rate (單一):  {m['hit_rate']:.2%}")
+            print(f"Partial Hit Rate: {m['partial_hit_rate']:.2%} ({m['found']}/{m['gold']})")
+            print(f"MRR:              {m['mrr']:.4f}")
+            print(f"Strict Recall:    {m['strict_recall']:.2%}")
+        if result["strict_multihop_recall"] is not None:
+            print(f"Strict Multi-hop Recall: {result['strict_multihop_recall']:.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="檢索評測 (Hit Rate / Partial Hit Rate / MRR)")
+    parser.add_argument("run", type=Path, help="檢索結果 JSON: {question_id: [doc_id, ...]}")
+    parser.add_argument("--queries", type=Path, default=PROCESSED_DIR / "queries.json")
+    parser.add_argument("--k", type=int, nargs="+", default=DEFAULT_KS)
+    parser.add_argument("--output", type=Path, default=None, help="將指標輸出為 JSON")
+    args = parser.parse_args()
+
+    queries = load_json(args.queries)
+    evaluator = RetrievalEvaluator(queries)
+    results = evaluator.evaluate(align_run(load_json(args.run), evaluator.question_ids), args.k)
+    print_report(results)
+    if args.output:
+        save_json({str(k): v for k, v in results.items()}, args.output)
+        print(f"\n已儲存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
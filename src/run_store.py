@@ -0,0 +1,354 @@
+"""
+檢索結果 (run) 儲存
+每次調整指標都要重新呼叫檢索系統。本模組將檢索結果以精簡格式保存一次，之後離線重新評分：
+
+- data/processed/runs/<name>.npz: 每題排序後的文檔位置 (int32，-1 補位) 與分數 (float32)、
+  question_id，以及系統設定與 corpus 版本 (meta)
+- data/processed/runs/corpora/<version>.npz: 該 corpus 版本的 doc_id 與 original_source
+  (文檔位置即其索引；corpus 版本為所有 doc_id 與內容指紋的雜湊)
+
+載入後可：
+- 以任何 k、任何題目子集重新評分 (例如只看 drcd)，也可把文檔限制在 corpus 子集 (排名自動前移)
+- 以 process_data.py --tiers 的分級清單評分：在共用的最大分級上跑一次檢索，各分級只限制題目與文檔
+- 以 reciprocal rank fusion (RRF) 融合多個 run
+- 文檔位置對應到黃金文檔代碼只需做一次，比較數十個 run 只是陣列索引與比較
+
+使用方式:
+    uv run src/run_store.py import bm25 data/processed/bm25_run.json --config '{"retriever": "bm25"}'
+    uv run src/run_store.py list
+    uv run src/run_store.py score bm25 vector --k 1 5 10 --source drcd
+    uv run src/run_store.py score bm25 --tier micro
+    uv run src/run_store.py fuse bm25 vector --name hybrid
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from candidate_index import fingerprint
+from compiled_corpus import CompiledCorpus, load_corpus
+from retrieval_eval import RetrievalEvaluator
+from tier_manifests import missing_members
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+RUNS_DIR = PROCESSED_DIR / "runs"
+CORPORA_DIR = RUNS_DIR / "corpora"
+
+RRF_K = 60  # reciprocal rank fusion 的平滑常數
+
+# 設定標準輸出編碼為 utf-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def load_json(filepath: Path):
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def corpus_version(corpus: list[dict]) -> str:
+    """corpus 版本：依序所有 doc_id 與內容指紋的雜湊"""
+    if isinstance(corpus, CompiledCorpus):
+        return corpus.version  # 編譯時已算好
+    digest = hashlib.sha1()
+    for doc in corpus:
+        digest.update(f"{doc['doc_id']}:{fingerprint(doc['content'])}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class CorpusTable:
+    """某個 corpus 版本的文檔位置表"""
+
+    def __init__(self, version: str, doc_ids: np.ndarray, sources: np.ndarray):
+        self.version = version
+        self.doc_ids = doc_ids
+        self.sources = sources
+        self._position: dict[str, int] | None = None
+
+    @classmethod
+    def from_corpus(cls, corpus: list[dict]) -> "CorpusTable":
+        if isinstance(corpus, CompiledCorpus):
+            table = cls(corpus.version, np.asarray(corpus.doc_ids), corpus.sources)
+            table.save()
+            return table
+        table = cls(
+            corpus_version(corpus),
+            np.array([doc["doc_id"] for doc in corpus], dtype=str),
+            np.array([doc.get("original_source", "") for doc in corpus], dtype=str),
+        )
+        table.save()
+        return table
+
+    @classmethod
+    def load(cls, version: str) -> "CorpusTable":
+        data = np.load(CORPORA_DIR / f"{version}.npz")
+        return cls(version, data["doc_ids"], data["sources"])
+
+    def save(self) -> None:
+        path = CORPORA_DIR / f"{self.version}.npz"
+        if not path.exists():
+            CORPORA_DIR.mkdir(parents=True, exist_ok=True)
+            np.savez(path, doc_ids=self.doc_ids, sources=self.sources)
+
+    def positions(self, doc_ids) -> np.ndarray:
+        """doc_id 矩陣 -> 文檔位置矩陣 (不在 corpus 中者為 -1)"""
+        if self._position is None:
+            self._position = {d: i for i, d in enumerate(self.doc_ids.tolist())}
+        return np.array(
+            [[self._position.get(d, -1) for d in row] for row in doc_ids], dtype=np.int32
+        ).reshape(len(doc_ids), -1)
+
+
+class Run:
+    """
+    一次檢索的結果
+
+    Attributes:
+        rows: (題數, k) 的文檔位置，-1 為補位
+        scores: (題數, k) 的檢索分數 (沒有分數時以排名倒數代替)
+        question_ids: 每列對應的 question_id
+        meta: {"name", "config", "corpus_version", "k"}
+    """
+
+    def __init__(self, rows: np.ndarray, scores: np.ndarray, question_ids: np.ndarray, meta: dict):
+        self.rows = rows
+        self.scores = scores
+        self.question_ids = question_ids
+        self.meta = meta
+
+    @property
+    def name(self) -> str:
+        return self.meta["name"]
+
+    @classmethod
+    def from_doc_ids(
+        cls,
+        name: str,
+        question_ids: list[str],
+        doc_ids: list[list[str]],
+        table: CorpusTable,
+        scores: list[list[float]] | np.ndarray | None = None,
+        config: dict | None = None,
+    ) -> "Run":
+        """由 doc_id 列表建立 run (只在寫入時做一次字串對應)"""
+        width = max((len(row) for row in doc_ids), default=0)
+        padded = [list(row) + [""] * (width - len(row)) for row in doc_ids]
+        rows = table.positions(padded) if width else np.zeros((len(doc_ids), 0), dtype=np.int32)
+        if scores is None:
+            score_matrix = np.broadcast_to(1.0 / np.arange(1, width + 1, dtype=np.float32), rows.shape).copy()
+        else:
+            score_matrix = np.zeros(rows.shape, dtype=np.float32)
+            for i, row in enumerate(scores):
+                score_matrix[i, :len(row)] = row
+        score_matrix[rows < 0] = 0
+        meta = {"name": name, "config": config or {}, "corpus_version": table.version, "k": width}
+        return cls(rows, score_matrix, np.array(question_ids, dtype=str), meta)
+
+    def save(self, runs_dir: Path = RUNS_DIR) -> Path:
+        runs_dir.mkdir(parents=True, exist_ok=True)
+        path = runs_dir / f"{self.name}.npz"
+        np.savez(path, rows=self.rows, scores=self.scores, question_ids=self.question_ids,
+                 meta=np.array(json.dumps(self.meta, ensure_ascii=False)))
+        return path
+
+    @classmethod
+    def load(cls, name: str, runs_dir: Path = RUNS_DIR) -> "Run":
+        data = np.load(runs_dir / f"{name}.npz")
+        return cls(data["rows"], data["scores"], data["question_ids"], json.loads(str(data["meta"])))
+
+    def restrict(self, allowed: np.ndarray) -> "Run":
+        """
+        將文檔限制在 corpus 子集 (allowed 為依文檔位置的布林遮罩)
+
+        被排除的文檔移除後，其餘文檔依原順序往前遞補 (等同只在子集上檢索)。
+        """
+        keep = (self.rows >= 0) & allowed[np.maximum(self.rows, 0)]
+        order = np.argsort(~keep, axis=1, kind="stable")
+        rows = np.where(np.take_along_axis(keep, order, axis=1), np.take_along_axis(self.rows, order, axis=1), -1)
+        scores = np.where(rows >= 0, np.take_along_axis(self.scores, order, axis=1), 0)
+        return Run(rows, scores, self.question_ids, dict(self.meta))
+
+
+def fuse(runs: list[Run], name: str, k: int | None = None, rrf_k: int = RRF_K) -> Run:
+    """
+    以 reciprocal rank fusion 融合多個 run (必須是同一個 corpus 版本)
+
+    所有 run 的 (題目, 文檔) 攤平成一維鍵，以 np.unique + bincount 累加 RRF 分數，
+    再以 lexsort 依 (題目, -分數) 排序取每題前 k 名。
+    """
+    versions = {run.meta["corpus_version"] for run in runs}
+    if len(versions) != 1:
+        raise ValueError(f"無法融合不同 corpus 版本的 run: {sorted(versions)}")
+    question_ids = runs[0].question_ids
+    k = k or max(run.rows.shape[1] for run in runs)
+    n_docs = int(max(run.rows.max(initial=-1) for run in runs)) + 1
+
+    q_parts, doc_parts, weight_parts = [], [], []
+    for run in runs:
+        q_index = {qid: i for i, qid in enumerate(question_ids.tolist())}
+        run_q = np.array([q_index.get(qid, -1) for qid in run.question_ids.tolist()])
+        ranks = np.arange(1, run.rows.shape[1] + 1)
+        valid = (run.rows >= 0) & (run_q[:, None] >= 0)
+        q_parts.append(np.broadcast_to(run_q[:, None], run.rows.shape)[valid])
+        doc_parts.append(run.rows[valid].astype(np.int64))
+        weight_parts.append(np.broadcast_to(1.0 / (rrf_k + ranks), run.rows.shape)[valid])
+
+    keys = np.concatenate(q_parts) * max(n_docs, 1) + np.concatenate(doc_parts)
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    fused_scores = np.bincount(inverse, weights=np.concatenate(weight_parts))
+    q_of = unique_keys // max(n_docs, 1)
+    doc_of = unique_keys % max(n_docs, 1)
+
+    order = np.lexsort((-fused_scores, q_of))
+    q_sorted = q_of[order]
+    starts = np.searchsorted(q_sorted, np.arange(len(question_ids)))
+    rank_in_q = np.arange(len(order)) - starts[q_sorted]
+    take = rank_in_q < k
+
+    rows = np.full((len(question_ids), k), -1, dtype=np.int32)
+    scores = np.zeros((len(question_ids), k), dtype=np.float32)
+    rows[q_sorted[take], rank_in_q[take]] = doc_of[order][take]
+    scores[q_sorted[take], rank_in_q[take]] = fused_scores[order][take]
+    meta = {
+        "name": name,
+        "config": {"fusion": "rrf", "rrf_k": rrf_k, "runs": [run.name for run in runs]},
+        "corpus_version": runs[0].meta["corpus_version"],
+        "k": k,
+    }
+    return Run(rows, scores, question_ids, meta)
+
+
+def check_corpus_version(run: Run, table: CorpusTable) -> None:
+    """run 的文檔位置只對產生它的 corpus 版本有意義，版本不同時拒絕評分"""
+    if run.meta["corpus_version"] != table.version:
+        raise ValueError(f"run {run.name} 的 corpus 版本 {run.meta['corpus_version']} 與 {table.version} 不同")
+
+
+class RunScorer:
+    """
+    以同一組 queries 與 corpus 版本評分多個 run
+
+    文檔位置 -> 黃金文檔代碼的對應表只建立一次，之後每個 run 的評分只是陣列索引。
+    """
+
+    def __init__(self, queries: list[dict], table: CorpusTable):
+        self.queries = queries
+        self.table = table
+        self.evaluator = RetrievalEvaluator(queries)
+        self.code_of_position = np.append(self.evaluator.encode(self.table.doc_ids[None, :])[0], -1)
+        self.query_index = {qid: i for i, qid in enumerate(self.evaluator.question_ids)}
+
+    def codes(self, run: Run) -> np.ndarray:
+        """run 依 queries 順序排列的黃金文檔代碼矩陣 (缺少的題目整列為 -1)"""
+        check_corpus_version(run, self.table)
+        codes = np.full((len(self.queries), run.rows.shape[1]), -1, dtype=np.int64)
+        run_rows = [(self.query_index[qid], i) for i, qid in enumerate(run.question_ids.tolist()) if qid in self.query_index]
+        if run_rows:
+            target, source = np.array(run_rows).T
+            # 補位的 -1 對應到 code_of_position 的最後一格 (-1)
+            codes[target] = self.code_of_position[run.rows[source]]
+        return codes
+
+    def score(self, run: Run, ks: list[int]) -> dict[int, dict]:
+        return self.evaluator.evaluate_ranks(self.evaluator.ranks_from_codes(self.codes(run)), ks)
+
+
+def list_runs(runs_dir: Path = RUNS_DIR) -> list[str]:
+    return sorted(path.stem for path in runs_dir.glob("*.npz"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="檢索結果 (run) 儲存、重新評分與融合")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_import = sub.add_parser("import", help="由 {question_id: [doc_id, ...]} JSON 匯入 run")
+    p_import.add_argument("name")
+    p_import.add_argument("run_json", type=Path)
+    p_import.add_argument("--config", type=json.loads, default={}, help="系統設定 (JSON)")
+
+    sub.add_parser("list", help="列出所有 run")
+
+    p_score = sub.add_parser("score", help="重新評分 (預設全部 run)")
+    p_score.add_argument("names", nargs="*")
+    p_score.add_argument("--k", type=int, nargs="+", default=[5])
+    p_score.add_argument("--source", default=None, help="只評分此資料來源的題目，文檔也限制在此來源")
+    p_score.add_argument("--tier", default=None, help="只評分此分級的題目，文檔也限制在此分級")
+
+    p_fuse = sub.add_parser("fuse", help="以 RRF 融合多個 run")
+    p_fuse.add_argument("names", nargs="+")
+    p_fuse.add_argument("--name", required=True)
+    p_fuse.add_argument("--k", type=int, default=None)
+
+    for p in (p_import, p_score):
+        p.add_argument("--corpus", type=Path, default=PROCESSED_DIR / "corpus.json")
+        p.add_argument("--queries", type=Path, default=PROCESSED_DIR / "queries.json")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for name in list_runs():
+            run = Run.load(name)
+            print(f"  {name}: {len(run.question_ids)} 題，k={run.meta['k']}，corpus={run.meta['corpus_version']}，"
+                  f"config={json.dumps(run.meta['config'], ensure_ascii=False)}")
+        return
+
+    if args.command == "fuse":
+        fused = fuse([Run.load(name) for name in args.names], args.name, args.k)
+        print(f"已儲存: {fused.save()}")
+        return
+
+    table = CorpusTable.from_corpus(load_corpus(args.corpus))
+    queries = load_json(args.queries)
+
+    if args.command == "import":
+        data = load_json(args.run_json)
+        run = Run.from_doc_ids(args.name, list(data), list(data.values()), table, config=args.config)
+        print(f"已儲存: {run.save()} (corpus 版本 {table.version})")
+        return
+
+    question_ids = {q["question_id"] for q in queries}
+    if args.source:
+        queries = [q for q in queries if q["source_dataset"] == args.source]
+    runs = [Run.load(name) for name in (args.names or list_runs())]
+    # 先確認版本再限制文檔 (舊版本 run 的列號可能超出目前 corpus 的範圍)
+    for run in runs:
+        check_corpus_version(run, table)
+    if args.source:
+        allowed = table.sources == args.source
+        runs = [run.restrict(allowed) for run in runs]
+    if args.tier:
+        manifest = load_json(PROCESSED_DIR / "tiers" / f"{args.tier}.json")
+        missing_questions, missing_docs = missing_members(
+            manifest, question_ids, set(table.doc_ids.tolist())
+        )
+        if missing_questions or missing_docs:
+            print(f"⚠️ 分級 {args.tier} 的清單已過期: {len(missing_questions)} 題、{len(missing_docs)} 篇文檔不在共用檔案中，"
+                  f"請重新執行 process_data.py --tiers")
+        members = set(manifest["question_ids"])
+        queries = [q for q in queries if q["question_id"] in members]
+        allowed = np.isin(table.doc_ids, manifest["doc_ids"])
+        runs = [run.restrict(allowed) for run in runs]
+
+    start = time.perf_counter()
+    scorer = RunScorer(queries, table)
+    results = {run.name: scorer.score(run, args.k) for run in runs}
+    elapsed = time.perf_counter() - start
+
+    print(f"評分 {len(runs)} 個 run × {len(queries)} 題 × k={args.k}: {elapsed * 1000:.1f} ms\n")
+    print(f"{'run':<24} {'k':>3} {'Hit':>8} {'Partial':>8} {'MRR':>8} {'Strict':>8}")
+    for name, result in results.items():
+        for k, r in result.items():
+            m = r["overall"]
+            print(f"{name:<24} {k:>3} {m['hit_rate']:>8.2%} {m['partial_hit_rate']:>8.2%} "
+                  f"{m['mrr']:>8.4f} {m['strict_recall']:>8.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+檢索 / 評分指標的統計檢定 (NumPy 向量化)
+題庫只有 60 題，各來源的指標在不同執行間會浮動數個百分點。本模組提供：
+
+- bootstrap 信賴區間：一次產生 (重抽次數, 題數) 的索引矩陣，所有重抽同時計算；
+  可依 source_dataset 或 question_type 分層重抽 (各層維持原本的題數)
+- 成對置換檢定 (paired permutation test)：兩個系統在同一題上的結果隨機交換 (符號翻轉)，
+  以 (重抽次數, 題數) 的 ±1 矩陣一次計算所有置換下的差異
+
+支援的指標 (皆表示為「每題分子總和 / 每題分母總和」)：
+- hit_rate / mrr / pass_rate：分母為 1 (題目平均)
+- partial_hit_rate：分子為找到的黃金文檔數、分母為黃金文檔數 (micro 平均)
+
+使用方式:
+    uv run src/significance.py run_a.json run_b.json --k 5
+    uv run src/significance.py run_a.json run_b.json --stratify type --resamples 20000
+    uv run src/significance.py run_a.json run_b.json --verdicts-a va.json --verdicts-b vb.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from retrieval_eval import RetrievalEvaluator, align_run
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+
+N_RESAMPLES = 10000
+ALPHA = 0.05
+SEED = 42
+STRATA_FIELDS = {
+    "source": "source_dataset",
+    "type": "question_type",
+}
+
+# 設定標準輸出編碼為 utf-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def load_json(filepath: Path):
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def strata_codes(queries: list[dict], stratify: str | None) -> np.ndarray:
+    """每題的分層代碼 (不分層時全為 0)"""
+    if stratify is None:
+        return np.zeros(len(queries), dtype=np.int64)
+    labels = [q.get(STRATA_FIELDS[stratify], "") for q in queries]
+    _, codes = np.unique(labels, return_inverse=True)
+    return codes
+
+
+def bootstrap_indices(strata: np.ndarray, n_resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    產生 (重抽次數, 題數) 的分層 bootstrap 索引矩陣
+
+    每一層在自己的題目中有放回地抽出與原本相同的題數。
+    """
+    indices = np.empty((n_resamples, len(strata)), dtype=np.int64)
+    column = 0
+    for code in np.unique(strata):
+        members = np.flatnonzero(strata == code)
+        indices[:, column:column + len(members)] = members[rng.integers(0, len(members), (n_resamples, len(members)))]
+        column += len(members)
+    return indices
+
+
+def ratio(numer: np.ndarray, denom: np.ndarray) -> np.ndarray:
+    """沿最後一軸計算 sum(numer) / sum(denom)"""
+    total = denom.sum(axis=-1)
+    return np.where(total > 0, numer.sum(axis=-1) / np.maximum(total, 1e-12), 0.0)
+
+
+def bootstrap_ci(
+    numer: np.ndarray,
+    denom: np.ndarray | None = None,
+    strata: np.ndarray | None = None,
+    n_resamples: int = N_RESAMPLES,
+    alpha: float = ALPHA,
+    seed: int = SEED,
+) -> dict:
+    """
+    指標的 percentile bootstrap 信賴區間
+
+    Returns:
+        {"estimate", "low", "high", "std"}
+    """
+    numer = np.asarray(numer, dtype=np.float64)
+    denom = np.ones_like(numer) if denom is None else np.asarray(denom, dtype=np.float64)
+    strata = np.zeros(len(numer), dtype=np.int64) if strata is None else strata
+    indices = bootstrap_indices(strata, n_resamples, np.random.default_rng(seed))
+    samples = ratio(numer[indices], denom[indices])
+    low, high = np.quantile(samples, [alpha / 2, 1 - alpha / 2])
+    return {
+        "estimate": float(ratio(numer, denom)),
+        "low": float(low),
+        "high": float(high),
+        "std": float(samples.std(ddof=1)),
+    }
+
+
+def paired_test(
+    numer_a: np.ndarray,
+    numer_b: np.ndarray,
+    denom: np.ndarray | None = None,
+    strata: np.ndarray | None = None,
+    n_resamples: int = N_RESAMPLES,
+    alpha: float = ALPHA,
+    seed: int = SEED,
+) -> dict:
+    """
+    兩系統在同一組題目上的成對比較 (A - B)
+
+    - p_value: 成對置換檢定 (每題隨機交換 A / B，雙尾)
+    - low / high: 差異的 (分層) 成對 bootstrap 信賴區間
+
+    兩系統的分母必須相同 (同一組題目與黃金文檔)。
+    """
+    numer_a = np.asarray(numer_a, dtype=np.float64)
+    numer_b = np.asarray(numer_b, dtype=np.float64)
+    denom = np.ones_like(numer_a) if denom is None else np.asarray(denom, dtype=np.float64)
+    strata = np.zeros(len(numer_a), dtype=np.int64) if strata is None else strata
+    rng = np.random.default_rng(seed)
+    total = max(denom.sum(), 1e-12)
+
+    diff = numer_a - numer_b
+    observed = diff.sum() / total
+    # 交換 A / B 等同於將該題的差異取負號
+    signs = rng.integers(0, 2, (n_resamples, len(diff)), dtype=np.int8) * 2 - 1
+    permuted = (signs * diff).sum(axis=1) / total
+    p_value = (np.count_nonzero(np.abs(permuted) >= abs(observed) - 1e-12) + 1) / (n_resamples + 1)
+
+    indices = bootstrap_indices(strata, n_resamples, rng)
+    samples = ratio(diff[indices], denom[indices])
+    low, high = np.quantile(samples, [alpha / 2, 1 - alpha / 2])
+    return {
+        "difference": float(observed),
+        "low": float(low),
+        "high": float(high),
+        "p_value": float(p_value),
+    }
+
+
+def metric_arrays(evaluator: RetrievalEvaluator, retrieved, k: int) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """將檢索結果轉為各指標的 (每題分子, 每題分母)"""
+    per_q = evaluator.per_question(evaluator.gold_ranks(retrieved), k)
+    ones = np.ones(len(evaluator.question_ids))
+    return {
+        "hit_rate": (per_q["hit"], ones),
+        "partial_hit_rate": (per_q["found"].astype(np.float64), evaluator.gold_count.astype(np.float64)),
+        "mrr": (per_q["rr"], ones),
+    }
+
+
+def verdict_array(verdicts: dict[str, bool], question_ids: list[str]) -> np.ndarray:
+    """Judge 評分結果轉為每題 0 / 1 (未評分視為 Fail)"""
+    return np.array([1.0 if verdicts.get(qid) else 0.0 for qid in question_ids])
+
+
+def compare(
+    queries: list[dict],
+    run_a: dict[str, list[str]],
+    run_b: dict[str, list[str]],
+    k: int = 5,
+    verdicts_a: dict[str, bool] | None = None,
+    verdicts_b: dict[str, bool] | None = None,
+    stratify: str | None = "source",
+    n_resamples: int = N_RESAMPLES,
+) -> dict[str, dict]:
+    """
+    比較兩個系統的所有指標
+
+    Returns:
+        {指標: {"a": 信賴區間, "b": 信賴區間, "paired": 成對檢定}}
+    """
+    evaluator = RetrievalEvaluator(queries)
+    strata = strata_codes(queries, stratify)
+    arrays_a = metric_arrays(evaluator, align_run(run_a, evaluator.question_ids), k)
+    arrays_b = metric_arrays(evaluator, align_run(run_b, evaluator.question_ids), k)
+    if verdicts_a is not None and verdicts_b is not None:
+        ones = np.ones(len(queries))
+        arrays_a["pass_rate"] = (verdict_array(verdicts_a, evaluator.question_ids), ones)
+        arrays_b["pass_rate"] = (verdict_array(verdicts_b, evaluator.question_ids), ones)
+
+    results = {}
+    for name, (numer_a, denom) in arrays_a.items():
+        numer_b = arrays_b[name][0]
+        results[name] = {
+            "a": bootstrap_ci(numer_a, denom, strata, n_resamples),
+            "b": bootstrap_ci(numer_b, denom, strata, n_resamples),
+            "paired": paired_test(numer_a, numer_b, denom, strata, n_resamples),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="兩系統的 bootstrap 信賴區間與成對置換檢定")
+    parser.add_argument("run_a", type=Path, help="系統 A 的 run: {question_id: [doc_id, ...]}")
+    parser.add_argument("run_b", type=Path, help="系統 B 的 run")
+    parser.add_argument("--queries", type=Path, default=PROCESSED_DIR / "queries.json")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--verdicts-a", type=Path, default=None, help="系統 A 的 Judge 結果: {question_id: bool}")
+    parser.add_argument("--verdicts-b", type=Path, default=None)
+    parser.add_argument("--stratify", choices=[*STRATA_FIELDS, "none"], default="source")
+    parser.add_argument("--resamples", type=int, default=N_RESAMPLES)
+    args = parser.parse_args()
+    if (args.verdicts_a is None) != (args.verdicts_b is None):
+        parser.error("--verdicts-a 與 --verdicts-b 需同時指定")
+
+    queries = load_json(args.queries)
+    start = time.perf_counter()
+    results = compare(
+        queries,
+        load_json(args.run_a),
+        load_json(args.run_b),
+        args.k,
+        load_json(args.verdicts_a) if args.verdicts_a else None,
+        load_json(args.verdicts_b) if args.verdicts_b else None,
+        None if args.stratify == "none" else args.stratify,
+        args.resamples,
+    )
+    elapsed = time.perf_counter() - start
+
+    confidence = f"{1 - ALPHA:.0%}"
+    print(f"Top-{args.k}，{len(queries)} 題，{args.resamples} 次重抽 (分層: {args.stratify})，{elapsed * 1000:.0f} ms\n")
+    for name, r in results.items():
+        a, b, paired = r["a"], r["b"], r["paired"]
+        print(f"【{name}】")
+        print(f"  A: {a['estimate']:.4f} ({confidence} CI {a['low']:.4f} ~ {a['high']:.4f})")
+        print(f"  B: {b['estimate']:.4f} ({confidence} CI {b['low']:.4f} ~ {b['high']:.4f})")
+        mark = "顯著" if paired["p_value"] < ALPHA else "不顯著"
+        print(f"  A - B: {paired['difference']:+.4f} ({confidence} CI {paired['low']:+.4f} ~ {paired['high']:+.4f})，"
+              f"p = {paired['p_value']:.4f} ({mark})")
+
+
+if __name__ == "__main__":
+    main()
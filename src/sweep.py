@@ -0,0 +1,326 @@
+"""
+檢索設定掃描 (parallel configuration sweep)
+給定檢索設定的網格，展開所有組合並以 process pool 並行執行，最後輸出一張合併的指標表：
+
+- 共用產物只建立一次 (由主程序在派工前完成)：corpus 位置表、每組 (k1, b) 的 BM25 索引、
+  每個 embedder 依文檔順序正規化後的文檔 / 查詢向量矩陣 (.npy，worker 以 memory map 共用)、
+  IVF 索引，以及所有查詢切好的詞頻 (以 initializer 傳給每個 worker 一次)
+- 每組設定的結果以 run 存入 run store (data/processed/runs/sweep-<設定雜湊>.npz)；
+  同一 corpus 版本下已有結果的設定直接略過，只需評分
+- 混合檢索 (hybrid) 以 run_store.fuse 的 RRF 融合 BM25 與向量檢索結果
+
+網格 (JSON) 中每個鍵為候選值列表，只有與 retriever 相關的鍵會進入該設定：
+    {"retriever": ["bm25", "vector", "hybrid"], "k1": [0.9, 1.2], "b": [0.75],
+     "embedder": ["local"], "nprobe": [null, 8], "depth": [100], "rrf_k": [60]}
+
+使用方式:
+    uv run src/sweep.py                                   # 使用預設網格
+    uv run src/sweep.py --grid grid.json --workers 8 --k 1 5 10
+    uv run src/sweep.py --force                           # 忽略快取，全部重跑
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+from bm25 import BM25Index, tokenize
+from compiled_corpus import load_corpus
+from embedding_store import EMBEDDERS, EmbeddingStore, embed_corpus
+from run_store import RUNS_DIR, CorpusTable, Run, RunScorer, fuse
+from vector_search import IVFIndex, exact_search, normalize_rows
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+SWEEP_DIR = PROCESSED_DIR / "sweep"
+RESULTS_PATH = PROCESSED_DIR / "sweep_results.json"
+
+DEFAULT_GRID = {
+    "retriever": ["bm25", "vector", "hybrid"],
+    "k1": [0.9, 1.2, 1.5],
+    "b": [0.5, 0.75],
+    "embedder": ["openai"],
+    "nprobe": [None],
+    "depth": [100],
+    "rrf_k": [60],
+}
+# 各檢索方式會用到的設定鍵
+RETRIEVER_KEYS = {
+    "bm25": ["k1", "b", "depth"],
+    "vector": ["embedder", "nprobe", "depth"],
+    "hybrid": ["k1", "b", "embedder", "nprobe", "depth", "rrf_k"],
+}
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+# 設定標準輸出編碼為 utf-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def load_json(filepath: Path):
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(data, filepath: Path) -> None:
+    """儲存 JSON 檔案"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def expand_grid(grid: dict[str, list]) -> list[dict]:
+    """展開網格為設定列表 (每組只保留相關的鍵，重複的組合只保留一次)"""
+    grid = {**DEFAULT_GRID, **grid}
+    configs, seen = [], set()
+    for retriever in grid["retriever"]:
+        if retriever not in RETRIEVER_KEYS:
+            raise ValueError(f"未知的 retriever: {retriever}")
+        keys = RETRIEVER_KEYS[retriever]
+        for values in itertools.product(*(grid[key] for key in keys)):
+            config = {"retriever": retriever, **dict(zip(keys, values))}
+            key = config_key(config)
+            if key not in seen:
+                seen.add(key)
+                configs.append(config)
+    return configs
+
+
+def config_key(config: dict) -> str:
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def run_name(config: dict) -> str:
+    return f"sweep-{config_key(config)}"
+
+
+def describe(config: dict) -> str:
+    """設定的簡短描述 (用於表格)"""
+    parts = [config["retriever"]]
+    if "k1" in config:
+        parts.append(f"k1={config['k1']},b={config['b']}")
+    if "embedder" in config:
+        parts.append(config["embedder"] + (f",nprobe={config['nprobe']}" if config["nprobe"] else ""))
+    if "rrf_k" in config:
+        parts.append(f"rrf={config['rrf_k']}")
+    return " ".join(parts)
+
+
+def is_cached(config: dict, version: str) -> bool:
+    """run store 中已有同一 corpus 版本、同一設定的結果"""
+    path = RUNS_DIR / f"{run_name(config)}.npz"
+    if not path.exists():
+        return False
+    meta = Run.load(run_name(config)).meta
+    return meta["corpus_version"] == version and meta["config"] == config
+
+
+def bm25_dir(work_dir: Path, k1: float, b: float) -> Path:
+    return work_dir / f"bm25-k1_{k1}-b_{b}"
+
+
+def vector_dir(work_dir: Path, embedder: str) -> Path:
+    return work_dir / f"vectors-{embedder}"
+
+
+def prepare_artifacts(
+    configs: list[dict], corpus_path: Path, corpus: list[dict], queries: list[dict], work_dir: Path
+) -> None:
+    """
+    建立所有待執行設定需要的共用產物 (已存在且未過期者沿用)
+
+    - BM25 索引：每組 (k1, b) 一份 (BM25Index.open 會在語料或參數變動時重建)
+    - 向量：每個 embedder 一份依 corpus 順序、已正規化的 docs.npy / queries.npy
+    - IVF：任一設定使用 nprobe 時，為該 embedder 建立 ivf.npz
+    """
+    for k1, b in sorted({(c["k1"], c["b"]) for c in configs if "k1" in c}):
+        BM25Index.open(corpus_path, bm25_dir(work_dir, k1, b), k1, b)
+
+    for name in sorted({c["embedder"] for c in configs if "embedder" in c}):
+        embedder = EMBEDDERS[name]()
+        out_dir = vector_dir(work_dir, name)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        _, doc_vectors, embedded = embed_corpus(corpus, embedder)
+        query_store = EmbeddingStore.open(f"{embedder.name}-queries", embedder.dim)
+        query_vectors = query_store.embed([q["question"] for q in queries], embedder)
+        np.save(out_dir / "docs.npy", normalize_rows(doc_vectors))
+        np.save(out_dir / "queries.npy", normalize_rows(query_vectors))
+        print(f"  向量 {name}: {len(doc_vectors)} 篇文檔 (本次 embedding {embedded} 篇)")
+        if any(c.get("embedder") == name and c.get("nprobe") for c in configs):
+            start = time.perf_counter()
+            index = IVFIndex.build(np.load(out_dir / "docs.npy", mmap_mode="r"))
+            index.save(out_dir / "ivf.npz")
+            print(f"  IVF {name}: nlist={index.nlist} ({time.perf_counter() - start:.2f}s)")
+
+
+# worker 端的共用狀態 (由 initializer 設定，產物在第一次使用時載入並留在該 process)
+_shared: dict = {}
+_artifacts: dict = {}
+
+
+def _init_worker(shared: dict) -> None:
+    _shared.update(shared)
+
+
+def _artifact(key: tuple, loader):
+    if key not in _artifacts:
+        _artifacts[key] = loader()
+    return _artifacts[key]
+
+
+def _make_run(config: dict, rows: np.ndarray, scores: np.ndarray) -> Run:
+    rows = rows.astype(np.int32)
+    scores = np.where(rows >= 0, scores, 0).astype(np.float32)
+    meta = {"name": run_name(config), "config": config, "corpus_version": _shared["version"], "k": rows.shape[1]}
+    return Run(rows, scores, _shared["question_ids"], meta)
+
+
+def _bm25_run(config: dict) -> Run:
+    work_dir = _shared["work_dir"]
+    index = _artifact(("bm25", config["k1"], config["b"]),
+                      lambda: BM25Index.load(bm25_dir(work_dir, config["k1"], config["b"])))
+    rows, scores = index.search_rows(_shared["query_terms"], config["depth"])
+    return _make_run(config, rows, scores)
+
+
+def _vector_run(config: dict) -> Run:
+    out_dir = vector_dir(_shared["work_dir"], config["embedder"])
+    docs = _artifact(("docs", config["embedder"]), lambda: np.load(out_dir / "docs.npy", mmap_mode="r"))
+    queries = _artifact(("queries", config["embedder"]), lambda: np.load(out_dir / "queries.npy"))
+    if config["nprobe"]:
+        index = _artifact(("ivf", config["embedder"]), lambda: IVFIndex.load(out_dir / "ivf.npz"))
+        scores, rows = index.search(queries, docs, config["depth"], config["nprobe"])
+    else:
+        scores, rows = exact_search(queries, docs, config["depth"])
+    return _make_run(config, rows, scores)
+
+
+def run_config(config: dict) -> tuple[str, float]:
+    """
+    在 worker 中執行一組設定並存入 run store
+
+    Returns:
+        (run 名稱, 執行秒數)
+    """
+    start = time.perf_counter()
+    if config["retriever"] == "bm25":
+        run = _bm25_run(config)
+    elif config["retriever"] == "vector":
+        run = _vector_run(config)
+    else:
+        bm25_config = {"retriever": "bm25", **{key: config[key] for key in RETRIEVER_KEYS["bm25"]}}
+        vector_config = {"retriever": "vector", **{key: config[key] for key in RETRIEVER_KEYS["vector"]}}
+        run = fuse([_bm25_run(bm25_config), _vector_run(vector_config)], run_name(config),
+                   config["depth"], config["rrf_k"])
+        run.meta["config"] = config
+    run.save()
+    return run.name, time.perf_counter() - start
+
+
+def sweep(
+    configs: list[dict],
+    corpus_path: Path,
+    queries: list[dict],
+    ks: list[int],
+    workers: int = MAX_WORKERS,
+    work_dir: Path = SWEEP_DIR,
+    force: bool = False,
+) -> list[dict]:
+    """
+    執行所有設定 (已有結果者略過) 並評分
+
+    Returns:
+        [{"name", "config", "cached", "seconds", "metrics": {k: overall 指標}}, ...]
+    """
+    corpus = load_corpus(corpus_path)
+    table = CorpusTable.from_corpus(corpus)
+    pending = [c for c in configs if force or not is_cached(c, table.version)]
+    print(f"共 {len(configs)} 組設定，{len(configs) - len(pending)} 組已有結果，{len(pending)} 組待執行")
+
+    seconds: dict[str, float] = {}
+    if pending:
+        start = time.perf_counter()
+        prepare_artifacts(pending, corpus_path, corpus, queries, work_dir)
+        print(f"共用產物就緒 ({time.perf_counter() - start:.2f}s)")
+        shared = {
+            "version": table.version,
+            "question_ids": np.array([q["question_id"] for q in queries], dtype=str),
+            "query_terms": [Counter(tokenize(q["question"])) for q in queries],
+            "work_dir": work_dir,
+        }
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared,)) as executor:
+            futures = {executor.submit(run_config, config): config for config in pending}
+            for future in as_completed(futures):
+                try:
+                    name, elapsed = future.result()
+                except Exception as e:
+                    print(f"  [FAIL] {describe(futures[future])}: {str(e)[:100]}")
+                    continue
+                seconds[name] = elapsed
+                print(f"  [PASS] {describe(futures[future])} ({elapsed:.2f}s)")
+        print(f"執行完成 ({time.perf_counter() - start:.2f}s，{workers} 個 worker)")
+
+    scorer = RunScorer(queries, table)
+    results = []
+    for config in configs:
+        name = run_name(config)
+        if name not in seconds and not is_cached(config, table.version):
+            continue  # 執行失敗
+        scores = scorer.score(Run.load(name), ks)
+        results.append({
+            "name": name,
+            "config": config,
+            "cached": name not in seconds,
+            "seconds": seconds.get(name),
+            "metrics": {k: r["overall"] for k, r in scores.items()},
+        })
+    return results
+
+
+def print_table(results: list[dict]) -> None:
+    """合併的指標表 (依第一個 k 的 MRR 由高到低)"""
+    if not results:
+        return
+    first_k = next(iter(results[0]["metrics"]))
+    ordered = sorted(results, key=lambda r: -r["metrics"][first_k]["mrr"])
+    print(f"\n{'設定':<44} {'k':>3} {'Hit':>8} {'Partial':>8} {'MRR':>8} {'Strict':>8}")
+    for r in ordered:
+        label = describe(r["config"]) + (" *" if r["cached"] else "")
+        for k, m in r["metrics"].items():
+            print(f"{label:<44} {k:>3} {m['hit_rate']:>8.2%} {m['partial_hit_rate']:>8.2%} "
+                  f"{m['mrr']:>8.4f} {m['strict_recall']:>8.2%}")
+            label = ""
+    print("(* 為沿用快取的結果)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="檢索設定掃描")
+    parser.add_argument("--grid", type=Path, default=None, help="網格 JSON (未指定的鍵使用預設值)")
+    parser.add_argument("--corpus", type=Path, default=PROCESSED_DIR / "corpus.json")
+    parser.add_argument("--queries", type=Path, default=PROCESSED_DIR / "queries.json")
+    parser.add_argument("--k", type=int, nargs="+", default=[5])
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--force", action="store_true", help="忽略已有的結果，全部重新執行")
+    parser.add_argument("--output", type=Path, default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    configs = expand_grid(load_json(args.grid) if args.grid else {})
+    results = sweep(configs, args.corpus, load_json(args.queries), args.k, args.workers, force=args.force)
+    print_table(results)
+    save_json(results, args.output)
+    print(f"\n已儲存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+分級清單維護
+process_data.py --tiers 產生的 data/processed/tiers/<分級>.json 以 question_id / doc_id 列出各分級的成員，
+共用檔案 (queries.json / corpus.json 等) 被編輯後清單必須同步，否則分級會指向已不存在的題目與文檔：
+- 抽換題目 (replace_question.py)：新題目取代舊題目在每個分級中的位置，新文檔加入舊題目所屬的分級
+- 刪除文檔：自所有分級移除
+- 補充文檔 (topup_corpus.py / add_documents.py)：只加入最大分級 (共用檔案即為最大分級)
+
+remove_duplicates.py 只合併同一 doc_id 的重複紀錄，不改變 doc_id 集合，清單不需更新。
+沒有分級清單時 (未使用 --tiers) 以下函式皆不做任何事。
+"""
+
+import json
+from pathlib import Path
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+TIERS_DIR = PROCESSED_DIR / "tiers"
+
+
+def load_manifests(tiers_dir: Path = TIERS_DIR) -> dict[str, dict]:
+    """載入分級清單 {分級: 清單} (沒有分級時為空)"""
+    if not tiers_dir.exists():
+        return {}
+    manifests = {}
+    for path in sorted(tiers_dir.glob("*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            manifests[path.stem] = json.load(f)
+    return manifests
+
+
+def save_manifests(manifests: dict[str, dict], tiers_dir: Path = TIERS_DIR) -> None:
+    """以暫存檔 + rename 寫回各分級清單"""
+    for name, manifest in manifests.items():
+        path = tiers_dir / f"{name}.json"
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(path)
+
+
+def update_tier_manifests(
+    replaced: dict[str, tuple[str, list[str]]] | None = None,
+    removed_doc_ids: set[str] | None = None,
+    added_doc_ids: list[str] | None = None,
+    tiers_dir: Path = TIERS_DIR,
+) -> None:
+    """
+    依共用檔案的編輯同步分級清單
+
+    Args:
+        replaced: {舊 question_id: (新 question_id, 新題目的 doc_id)}
+        removed_doc_ids: 自共用檔案刪除的文檔
+        added_doc_ids: 不屬於任何題目、補充到共用檔案的文檔 (只加入最大分級)
+    """
+    manifests = load_manifests(tiers_dir)
+    if not manifests:
+        return
+    replaced = replaced or {}
+    removed_doc_ids = removed_doc_ids or set()
+    for manifest in manifests.values():
+        question_ids, doc_ids = manifest["question_ids"], manifest["doc_ids"]
+        new_doc_ids: list[str] = []
+        for i, qid in enumerate(question_ids):
+            if qid in replaced:
+                question_ids[i], docs = replaced[qid]
+                new_doc_ids.extend(docs)
+        if manifest.get("parent") is None:
+            new_doc_ids.extend(added_doc_ids or [])
+        kept = [did for did in doc_ids if did not in removed_doc_ids]
+        members = set(kept)
+        # 新文檔附加在最後 (與儲存層 add_documents 的順序一致)
+        kept.extend(did for did in dict.fromkeys(new_doc_ids) if did not in members)
+        manifest["doc_ids"] = kept
+    save_manifests(manifests, tiers_dir)
+    print(f"  [tiers] 已同步分級清單: {', '.join(manifests)}")
+
+
+def missing_members(manifest: dict, question_ids: set[str], doc_ids: set[str]) -> tuple[list[str], list[str]]:
+    """分級清單中不存在於共用檔案的 (題目, 文檔)；非空表示清單已過期"""
+    return (
+        [qid for qid in manifest["question_ids"] if qid not in question_ids],
+        [did for did in manifest["doc_ids"] if did not in doc_ids],
+    )
@@ -0,0 +1,172 @@
+"""
+文檔庫補充腳本
+將 corpus 補充到指定的文檔數量，新文檔依指定比例取自各資料集的候選題索引 (candidate_index.py)，
+以段落指紋排除已使用的段落，並在同一步驟中並行翻譯。
+
+成本只與新增的文檔數成正比：
+- 已使用段落以資料集儲存層 (dataset_store.py) 的指紋索引取得，候選題索引只同步差異
+- 新文檔由候選題索引 O(1) 抽出，不需重新掃描原始資料
+- 每批翻譯完成後立即提交到儲存層，中斷後重新執行只會補充剩下的數量
+- 有分級清單 (process_data.py --tiers) 時，新文檔只加入最大分級 (即共用檔案)
+
+使用方式:
+    uv run src/topup_corpus.py --target 600
+    uv run src/topup_corpus.py --target 60000 --mix hotpotqa=2,2wiki=2,squad=1
+    uv run src/topup_corpus.py --target 1000 --no-translate   # 只補充原文，之後再執行 translate_new.py
+"""
+
+import argparse
+import random
+import sys
+
+from candidate_index import RAW_DIR, RAW_FILES, CandidateIndex
+from dataset_store import DatasetStore
+from tier_manifests import update_tier_manifests
+
+DEFAULT_TARGET = 600
+DEFAULT_MIX = {"hotpotqa": 1, "2wiki": 1}
+BATCH_SIZE = 500  # 每批翻譯並提交的文檔數
+
+# 設定標準輸出編碼為 utf-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """解析來源比例，例如 "hotpotqa=2,2wiki=1" (未指定權重者為 1)"""
+    mix = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        source, _, weight = part.partition("=")
+        source = source.strip()
+        if source not in RAW_FILES:
+            raise argparse.ArgumentTypeError(f"不支援的資料集: {source}")
+        mix[source] = float(weight) if weight else 1.0
+    if not mix or sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("來源比例不可為空")
+    return mix
+
+
+def allocate(total: int, mix: dict[str, float]) -> dict[str, int]:
+    """依權重分配各來源數量 (最大餘數法，總和恰為 total)"""
+    weight_sum = sum(mix.values())
+    exact = {source: total * weight / weight_sum for source, weight in mix.items()}
+    counts = {source: int(value) for source, value in exact.items()}
+    remainder = total - sum(counts.values())
+    for source in sorted(exact, key=lambda s: exact[s] - counts[s], reverse=True)[:remainder]:
+        counts[source] += 1
+    return counts
+
+
+def draw_new_documents(
+    indexes: dict[str, CandidateIndex], counts: dict[str, int], rng: random.Random
+) -> list[dict]:
+    """
+    依分配數量從各來源抽取新段落
+
+    某來源可用段落不足時，不足的數量依序改由其他來源補足。
+    """
+    docs_raw = []
+    shortfall = 0
+    for source, count in counts.items():
+        drawn = indexes[source].draw_documents(count, rng)
+        docs_raw.extend(drawn)
+        shortfall += count - len(drawn)
+        print(f"  - {source}: {len(drawn)} 篇" + (f" (不足 {count - len(drawn)} 篇)" if len(drawn) < count else ""))
+    for source, index in indexes.items():
+        if shortfall <= 0:
+            break
+        drawn = index.draw_documents(shortfall, rng)
+        if drawn:
+            docs_raw.extend(drawn)
+            shortfall -= len(drawn)
+            print(f"  - {source}: 額外補充 {len(drawn)} 篇")
+    return docs_raw
+
+
+def top_up(
+    target: int,
+    mix: dict[str, float] = DEFAULT_MIX,
+    translate: bool = True,
+    seed: int | None = None,
+) -> int:
+    """
+    將 corpus 補充到 target 篇
+
+    Returns:
+        實際新增的文檔數
+    """
+    store = DatasetStore.open()
+    current = store.count_documents()
+    needed = target - current
+    print(f"目前 corpus 數量: {current}，目標: {target}")
+    if needed <= 0:
+        print("已達目標數量，不需補充")
+        store.close()
+        return 0
+
+    missing = [source for source in mix if not (RAW_DIR / RAW_FILES[source]).exists()]
+    if missing:
+        print(f"錯誤: 找不到原始資料 {', '.join(missing)}，請先執行 data_download.py")
+        store.close()
+        sys.exit(1)
+
+    # 開啟候選題索引並同步已使用的段落指紋
+    print(f"\n[1/3] 開啟候選題索引: {', '.join(mix)}...")
+    used_fingerprints, used_question_ids = store.used_fingerprints(), store.used_question_ids()
+    indexes = {}
+    for source in mix:
+        indexes[source] = CandidateIndex.open(source)
+        indexes[source].sync(used_fingerprints, used_question_ids)
+
+    print(f"\n[2/3] 抽取 {needed} 篇新文檔...")
+    docs_raw = draw_new_documents(indexes, allocate(needed, mix), random.Random(seed))
+
+    # 分批翻譯並提交 (DRCD 原生中文不翻譯)
+    if translate:
+        # translate_data 載入時即建立 OpenAI client，--no-translate 時不需要 openai 與 API Key
+        from translate_data import MAX_WORKERS, translate_batch_parallel
+        print(f"\n[3/3] 並行翻譯並寫入 {len(docs_raw)} 篇文檔 (並行數: {MAX_WORKERS})...")
+    else:
+        print(f"\n[3/3] 寫入 {len(docs_raw)} 篇文檔...")
+    for start in range(0, len(docs_raw), BATCH_SIZE):
+        batch_raw = docs_raw[start:start + BATCH_SIZE]
+        batch = translate_batch_parallel(batch_raw, ["content"], "翻譯新增文檔") if translate else batch_raw
+        with store.transaction():
+            store.add_documents(batch, batch_raw)
+
+    store.export_json()
+    # 補充的文檔不屬於任何題目，只加入最大分級 (共用檔案)
+    update_tier_manifests(added_doc_ids=[doc["doc_id"] for doc in docs_raw])
+
+    # 以補充後的資料同步候選題索引
+    used_fingerprints, used_question_ids = store.used_fingerprints(), store.used_question_ids()
+    for index in indexes.values():
+        index.sync(used_fingerprints, used_question_ids)
+        index.save()
+
+    print(f"\n更新後 corpus 數量: {store.count_documents()}")
+    if not translate and docs_raw:
+        print("⚠️ 新增的文檔尚未翻譯，請執行 translate_new.py 進行翻譯")
+    store.close()
+    return len(docs_raw)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文檔庫補充工具")
+    parser.add_argument("--target", type=int, default=DEFAULT_TARGET, help="目標文檔數量")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="來源比例，例如 hotpotqa=2,2wiki=1")
+    parser.add_argument("--no-translate", action="store_true", help="只補充原文，不翻譯")
+    parser.add_argument("--seed", type=int, default=None, help="隨機種子")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("文檔庫補充工具")
+    print("=" * 60)
+    top_up(args.target, args.mix, translate=not args.no_translate, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,8 @@ from dotenv import load_dotenv
 from openai import OpenAI
 from tqdm import tqdm
 
+from translation_quality import scan_translation_quality
+
 # 載入環境變數
 load_dotenv()
 
@@ -172,6 +174,20 @@ def main():
     
     print(f"  - 已儲存: {PROCESSED_DIR / 'queries.json'}")
     print(f"  - 已儲存: {PROCESSED_DIR / 'corpus.json'}")
+    
+    # 翻譯品質掃描 (殘留英文、截斷、提示詞殘留、失敗回傳原文)
+    print("\n[翻譯品質掃描]")
+    flagged = scan_translation_quality(translated_corpus, corpus_raw)
+    flagged += scan_translation_quality(
+        translated_queries, queries_raw, "question_id", "question", "source_dataset"
+    )
+    if not flagged:
+        print("  [PASS] 未發現異常")
+    else:
+        print(f"  [WARN] {len(flagged)} 筆翻譯疑似異常 (詳見 uv run src/translation_quality.py)")
+        for item in flagged[:10]:
+            item_id = item.get("doc_id") or item.get("question_id")
+            print(f"    - {item_id}: {', '.join(item['reasons'])}")
     print("\n完成！")
 
 
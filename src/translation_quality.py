@@ -0,0 +1,334 @@
+"""
+翻譯品質掃描腳本
+verify_data.py 只檢查「是否包含中文」，無法發現翻譯到一半的文檔。
+本腳本以 NumPy 向量化方式一次計算整個 corpus 的逐篇特徵並依門檻標記異常：
+
+- latin_ratio: 拉丁字母佔 (拉丁 + 中文) 字元的比例 (殘留英文段落)
+- longest_latin_run: 最長連續英文片段長度
+  專有名詞的原文標註不計入以上兩項：譯名（原文）的括號內英文，以及實際輸出常見的
+  原文（譯名）形式中緊接在中文括號前的英文名，例如 "Smeep Kang（斯米普·康）"
+- length_ratio: 翻譯後 / 原文字數比 (max_tokens 截斷時偏低)
+- truncated: 原文以句末標點結尾，譯文卻沒有
+- repeated_ngram_ratio: 重複字元 n-gram 佔比 (模型重複輸出)
+- identical_to_raw: 譯文與原文完全相同 (translate_text 失敗時回傳原文)
+- prompt_leak: 出現「以下是翻譯」等提示詞殘留
+
+所有文檔串接為單一 code point 陣列，以 np.add.reduceat 依文檔邊界彙總，
+不逐字元跑 Python 迴圈，可在每個翻譯批次後執行。
+
+使用方式:
+    uv run src/translation_quality.py
+    uv run src/translation_quality.py --target queries
+    uv run python -m doctest src/translation_quality.py   # 以實際 corpus 句子檢查原文標註的排除
+
+輸出：
+- data/processed/translation_quality.json: 被標記文檔的特徵與原因
+"""
+
+import argparse
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+OUTPUT_PATH = PROCESSED_DIR / "translation_quality.json"
+
+# 掃描目標: (翻譯後檔案, 原文檔案, 鍵欄位, 文字欄位, 來源欄位)
+TARGETS = {
+    "corpus": ("corpus.json", "corpus_raw.json", "doc_id", "content", "original_source"),
+    "queries": ("queries.json", "queries_raw.json", "question_id", "question", "source_dataset"),
+}
+
+# 不需翻譯的來源
+UNTRANSLATED_SOURCES = {"drcd"}
+
+# 門檻設定
+MAX_LATIN_RATIO = 0.5          # 拉丁字母比例上限
+MIN_LATIN_CHARS = 50           # 拉丁字母數低於此值不判定比例 (短的消歧義頁常以英文名為主)
+MAX_LATIN_RUN = 60             # 最長連續英文片段上限 (字元)
+MAX_ANNOTATED_NAME = 40        # 中文括號註解前視為原文標註的英文名長度上限 (字元)
+MIN_LENGTH_RATIO = 0.2         # 翻譯後 / 原文字數比下限
+MAX_LENGTH_RATIO = 1.5         # 翻譯後 / 原文字數比上限
+NGRAM_SIZE = 8                 # 重複 n-gram 的長度
+MAX_REPEATED_NGRAM_RATIO = 0.2 # 重複 n-gram 佔比上限
+
+SENTENCE_END = "。！？!?.」』\"'）)"
+PROMPT_LEAK_PATTERN = re.compile(r"以下是.{0,6}翻譯|翻譯如下|譯文[:：]|翻譯結果|Translation[:：]|Here is the translation", re.IGNORECASE)
+
+_NGRAM_BASE = np.uint64(1000003)
+
+
+def load_json(filepath: Path) -> list[dict]:
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(data, filepath: Path) -> None:
+    """儲存 JSON 檔案"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def concat_codepoints(texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    將所有文字串接為單一 code point 陣列
+
+    Returns:
+        codes: (總字元數,) uint32
+        offsets: (n_docs + 1,) int64，第 i 篇為 codes[offsets[i]:offsets[i + 1]]
+    """
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+    return codes, offsets
+
+
+def segment_sum(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """依文檔邊界加總 (空文檔為 0)"""
+    padded = np.append(values.astype(np.int64), 0)
+    sums = np.add.reduceat(padded, offsets[:-1])
+    sums[offsets[:-1] == offsets[1:]] = 0
+    return sums
+
+
+def longest_runs(mask: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """計算每篇文檔中 mask 為 True 的最長連續長度"""
+    n_docs = len(offsets) - 1
+    result = np.zeros(n_docs, dtype=np.int64)
+    if len(mask) == 0:
+        return result
+
+    # 連續段的起點：本身為 True 且前一字元為 False 或位於文檔開頭
+    boundary = np.zeros(len(mask), dtype=bool)
+    boundary[offsets[:-1][offsets[:-1] < len(mask)]] = True
+    is_start = mask & boundary
+    is_start[1:] |= mask[1:] & ~mask[:-1]
+
+    run_ids = np.cumsum(is_start) - 1
+    run_lengths = np.bincount(run_ids[mask], minlength=int(is_start.sum()))
+    run_docs = np.searchsorted(offsets, np.flatnonzero(is_start), side="right") - 1
+    np.maximum.at(result, run_docs, run_lengths)
+    return result
+
+
+def repeated_ngram_ratio(codes: np.ndarray, offsets: np.ndarray, n: int = NGRAM_SIZE) -> np.ndarray:
+    """
+    計算每篇文檔中重複出現的字元 n-gram 佔比
+
+    以多項式雜湊計算所有位置的 n-gram，去除跨文檔的視窗後，
+    依 (文檔, 雜湊) 排序並比較相鄰元素即可得到重複數。
+    """
+    n_docs = len(offsets) - 1
+    result = np.zeros(n_docs)
+    window_count = len(codes) - n + 1
+    if window_count <= 0:
+        return result
+
+    hashes = np.zeros(window_count, dtype=np.uint64)
+    wide = codes.astype(np.uint64)
+    with np.errstate(over="ignore"):
+        for j in range(n):
+            hashes = hashes * _NGRAM_BASE + wide[j:j + window_count]
+
+    positions = np.arange(window_count)
+    docs = np.searchsorted(offsets, positions, side="right") - 1
+    valid = positions + n <= offsets[docs + 1]
+    hashes, docs = hashes[valid], docs[valid]
+
+    order = np.lexsort((hashes, docs))
+    hashes, docs = hashes[order], docs[order]
+    repeated = np.zeros(len(hashes), dtype=bool)
+    repeated[1:] = (hashes[1:] == hashes[:-1]) & (docs[1:] == docs[:-1])
+
+    totals = np.bincount(docs, minlength=n_docs)
+    repeats = np.bincount(docs, weights=repeated, minlength=n_docs)
+    np.divide(repeats, totals, out=result, where=totals > 0)
+    return result
+
+
+def parenthesis_mask(codes: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    標記位於括號內的字元 (全形與半形)
+
+    翻譯要求以 譯名（原文） 標註專有名詞，括號內的英文屬於正常現象，計算殘留英文時排除
+    (實際輸出也常為 原文（譯名），見 annotated_name_mask)。
+    括號深度以累加和計算，並扣除每篇文檔起點的累加值，避免跨文檔延續。
+    """
+    opens = np.isin(codes, np.array([ord("("), ord("（")], dtype=np.uint32))
+    closes = np.isin(codes, np.array([ord(")"), ord("）")], dtype=np.uint32))
+    steps = opens.astype(np.int64) - closes.astype(np.int64)
+    depth = np.cumsum(steps)
+    if len(codes) == 0:
+        return np.zeros(0, dtype=bool)
+    starts = np.minimum(offsets[:-1], len(codes) - 1)
+    base = depth[starts] - steps[starts]
+    docs = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    return (depth - base[docs] > 0) | closes
+
+
+def annotated_name_mask(codes: np.ndarray, offsets: np.ndarray, latin: np.ndarray) -> np.ndarray:
+    """
+    標記緊接在中文括號註解前的英文名 (原文（譯名） 形式，例如 "Smeep Kang（斯米普·康）")
+
+    英文名為字母、數字、空白與 -.' 組成的連續片段，只取括號前 MAX_ANNOTATED_NAME 個字元
+    (避免整句殘留英文被排除)；以反向累積最小值找出每個字元之後第一個非英文名字元，
+    該字元為左括號、其後為中文且位於同一篇文檔時標記。
+
+    >>> text = "由Smeep Kang（斯米普·康）執導，Pali Bhupinder Singh（帕利·布平德·辛格）編劇"
+    >>> features = compute_features([text], [""])
+    >>> int(features["latin_count"][0]), int(features["longest_latin_run"][0])
+    (0, 0)
+    >>> text = "The rest of this paragraph was never translated by the model, Smeep Kang（斯米普·康）"
+    >>> int(compute_features([text], [""])["longest_latin_run"][0])
+    61
+    """
+    if len(codes) == 0:
+        return np.zeros(0, dtype=bool)
+    name = latin | np.isin(codes, np.frombuffer(" 0123456789-.'".encode("utf-32-le"), dtype=np.uint32))
+    positions = np.arange(len(codes))
+    next_other = np.minimum.accumulate(np.where(name, len(codes), positions)[::-1])[::-1]
+    padded = np.append(codes, np.uint32(0))
+    opens_cjk = np.isin(padded, np.array([ord("("), ord("（")], dtype=np.uint32))
+    opens_cjk[:-1] &= (padded[1:] >= 0x4E00) & (padded[1:] <= 0x9FFF)
+    opens_cjk[-1] = False
+    doc_ends = np.repeat(offsets[1:], np.diff(offsets))
+    return name & opens_cjk[next_other] & (next_other < doc_ends) & (next_other - positions <= MAX_ANNOTATED_NAME)
+
+
+def last_visible_chars(texts: list[str]) -> np.ndarray:
+    """每篇文字最後一個非空白字元 (空字串為空白)"""
+    return np.array([t.rstrip()[-1:] or " " for t in texts], dtype="<U1")
+
+
+def compute_features(texts: list[str], raw_texts: list[str]) -> dict[str, np.ndarray]:
+    """計算所有文檔的品質特徵 (每個特徵為長度 n_docs 的陣列)"""
+    codes, offsets = concat_codepoints(texts)
+    lengths = np.diff(offsets)
+    raw_lengths = np.fromiter((len(t) for t in raw_texts), dtype=np.int64, count=len(raw_texts))
+
+    upper = (codes >= ord("A")) & (codes <= ord("Z"))
+    lower = (codes >= ord("a")) & (codes <= ord("z"))
+    latin = upper | lower
+    cjk = (codes >= 0x4E00) & (codes <= 0x9FFF)
+    # 英文片段：字母、數字、空白與常見英文標點
+    latin_span = latin | np.isin(codes, np.frombuffer(" 0123456789,.'-".encode("utf-32-le"), dtype=np.uint32))
+    # 專有名詞的原文標註 (括號內，或緊接在中文括號註解前) 不算殘留英文
+    outside = ~(parenthesis_mask(codes, offsets) | annotated_name_mask(codes, offsets, latin))
+
+    latin_count = segment_sum(latin & outside, offsets)
+    cjk_count = segment_sum(cjk, offsets)
+    letters = latin_count + cjk_count
+    latin_ratio = np.divide(latin_count, letters, out=np.zeros(len(texts)), where=letters > 0)
+
+    length_ratio = np.divide(lengths, raw_lengths, out=np.zeros(len(texts)), where=raw_lengths > 0)
+
+    terminals = np.array(list(SENTENCE_END), dtype="<U1")
+    truncated = np.isin(last_visible_chars(raw_texts), terminals) & ~np.isin(last_visible_chars(texts), terminals)
+
+    return {
+        "length": lengths,
+        "raw_length": raw_lengths,
+        "latin_count": latin_count,
+        "latin_ratio": latin_ratio,
+        "cjk_ratio": np.divide(cjk_count, lengths, out=np.zeros(len(texts)), where=lengths > 0),
+        "longest_latin_run": longest_runs(latin_span & outside, offsets),
+        "length_ratio": length_ratio,
+        "truncated": truncated,
+        "repeated_ngram_ratio": repeated_ngram_ratio(codes, offsets),
+        "identical_to_raw": np.array(texts, dtype=object) == np.array(raw_texts, dtype=object),
+        "prompt_leak": np.array([bool(PROMPT_LEAK_PATTERN.search(t)) for t in texts], dtype=bool),
+    }
+
+
+def flag_outliers(features: dict[str, np.ndarray], needs_translation: np.ndarray) -> dict[str, np.ndarray]:
+    """依門檻產生各項異常的布林遮罩 (僅針對需翻譯的文檔)"""
+    checks = {
+        "latin_ratio": (features["latin_ratio"] > MAX_LATIN_RATIO) & (features["latin_count"] >= MIN_LATIN_CHARS),
+        "latin_run": features["longest_latin_run"] > MAX_LATIN_RUN,
+        "length_ratio": (features["length_ratio"] < MIN_LENGTH_RATIO) | (features["length_ratio"] > MAX_LENGTH_RATIO),
+        "truncated": features["truncated"],
+        "repeated_ngrams": features["repeated_ngram_ratio"] > MAX_REPEATED_NGRAM_RATIO,
+        "identical_to_raw": features["identical_to_raw"] & (features["raw_length"] > 0),
+        "prompt_leak": features["prompt_leak"],
+    }
+    return {name: mask & needs_translation for name, mask in checks.items()}
+
+
+def scan_translation_quality(
+    records: list[dict],
+    raw_records: list[dict],
+    key: str = "doc_id",
+    field: str = "content",
+    source_field: str = "original_source",
+) -> list[dict]:
+    """
+    掃描翻譯品質，回傳被標記的紀錄
+
+    原文以 key 欄位對齊 (不依賴位置)，找不到原文者以空字串代替。
+
+    Returns:
+        [{key, source, reasons: [...], features: {...}}, ...]
+    """
+    raw_by_key = {r.get(key): r.get(field, "") or "" for r in raw_records}
+    texts = [r.get(field, "") or "" for r in records]
+    raw_texts = [raw_by_key.get(r.get(key), "") for r in records]
+    needs_translation = np.array([r.get(source_field) not in UNTRANSLATED_SOURCES for r in records], dtype=bool)
+
+    features = compute_features(texts, raw_texts)
+    flags = flag_outliers(features, needs_translation)
+
+    flag_matrix = np.column_stack(list(flags.values())) if records else np.zeros((0, len(flags)), dtype=bool)
+    flag_names = list(flags)
+    flagged = []
+    for i in np.flatnonzero(flag_matrix.any(axis=1)):
+        flagged.append({
+            key: records[i].get(key),
+            "source": records[i].get(source_field),
+            "reasons": [flag_names[j] for j in np.flatnonzero(flag_matrix[i])],
+            "features": {name: values[i].item() for name, values in features.items()},
+        })
+    return flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="翻譯品質掃描")
+    parser.add_argument("--target", choices=list(TARGETS), default="corpus")
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    processed_file, raw_file, key, field, source_field = TARGETS[args.target]
+
+    print("=" * 60)
+    print(f"翻譯品質掃描 ({args.target})")
+    print("=" * 60)
+
+    records = load_json(PROCESSED_DIR / processed_file)
+    raw_records = load_json(PROCESSED_DIR / raw_file)
+    flagged = scan_translation_quality(records, raw_records, key, field, source_field)
+
+    reason_counts: dict[str, int] = {}
+    for item in flagged:
+        for reason in item["reasons"]:
+            reason_counts[reason] = reason_counts.get(reason, 0) + 1
+
+    print(f"\n掃描 {len(records)} 筆，標記 {len(flagged)} 筆")
+    for reason, count in sorted(reason_counts.items(), key=lambda x: -x[1]):
+        print(f"  - {reason}: {count}")
+    for item in flagged[:20]:
+        print(f"  [WARN] {item[key]} ({item['source']}): {', '.join(item['reasons'])}")
+    if len(flagged) > 20:
+        print(f"  ... 其餘 {len(flagged) - 20} 筆省略")
+
+    save_json({"target": args.target, "flagged": flagged, "summary": reason_counts}, args.output)
+    print(f"\n已儲存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
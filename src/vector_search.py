@@ -0,0 +1,252 @@
+"""
+向量檢索 (精確 + IVF 近似)
+以 embedding_store.py 的向量矩陣為所有 queries 一次取出 top-k：
+
+- 精確檢索：queries × 文檔的分塊矩陣乘法 (內積 / cosine)，每塊以 argpartition 取 top-k 再合併，
+  記憶體用量與文檔數無關，可直接對 memory-mapped 矩陣操作
+- IVF 近似檢索：以 k-means 將文檔分成 nlist 群 (倒排列表以 CSR 陣列儲存)，
+  查詢時只掃描與查詢最相近的 nprobe 群；並回報相對精確檢索的 recall@k
+
+使用方式:
+    uv run src/vector_search.py --embedder local --k 5
+    uv run src/vector_search.py --embedder openai --k 10 --ivf --nprobe 16
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from compiled_corpus import load_corpus
+from embedding_store import EMBEDDERS, EmbeddingStore, embed_corpus
+
+# 路徑設定
+BASE_DIR = Path(__file__).parent.parent
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+RUN_PATH = PROCESSED_DIR / "vector_run.json"
+
+BLOCK_SIZE = 65536     # 精確檢索每次計算的文檔數
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 65536  # k-means 訓練取樣數
+DEFAULT_NPROBE = 8
+SEED = 42
+
+# 設定標準輸出編碼為 utf-8
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def load_json(filepath: Path):
+    """載入 JSON 檔案"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(data, filepath: Path) -> None:
+    """儲存 JSON 檔案"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2 正規化 (內積即 cosine 相似度)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def merge_top_k(
+    best_scores: np.ndarray, best_rows: np.ndarray, scores: np.ndarray, rows: np.ndarray, k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """將目前的 top-k 與新一批分數合併，保留每列前 k 名 (未排序)"""
+    all_scores = np.concatenate([best_scores, scores], axis=1)
+    all_rows = np.concatenate([best_rows, rows], axis=1)
+    if all_scores.shape[1] <= k:
+        return all_scores, all_rows
+    top = np.argpartition(-all_scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(all_scores, top, axis=1), np.take_along_axis(all_rows, top, axis=1)
+
+
+def sort_top_k(scores: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """依分數由高到低排序 top-k"""
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(rows, order, axis=1)
+
+
+def exact_search(
+    queries: np.ndarray, docs: np.ndarray, k: int, block_size: int = BLOCK_SIZE
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    精確 top-k 內積檢索 (分塊矩陣乘法 + argpartition)
+
+    docs 可為 memory-mapped 矩陣或 embedding_store.RowView，每次只讀取一塊並轉為 float32
+
+    Returns:
+        (scores, rows): (查詢數, k)，依分數由高到低
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    k = min(k, len(docs))
+    best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+    best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(docs), block_size):
+        block = np.asarray(docs[start:start + block_size], dtype=np.float32)
+        scores = queries @ block.T
+        if scores.shape[1] > k:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            scores = np.take_along_axis(scores, top, axis=1)
+        else:
+            top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        best_scores, best_rows = merge_top_k(best_scores, best_rows, scores, top + start, k)
+    return sort_top_k(best_scores, best_rows)
+
+
+class IVFIndex:
+    """
+    倒排檔 (IVF) 近似檢索索引
+
+    Attributes:
+        centroids: (nlist, 維度) 的群中心
+        list_offsets: 第 c 群的文檔位於 list_rows[list_offsets[c]:list_offsets[c + 1]]
+        list_rows: 依群排序的文檔列號
+    """
+
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray, list_rows: np.ndarray):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, docs: np.ndarray, nlist: int | None = None, iterations: int = KMEANS_ITERATIONS, seed: int = SEED) -> "IVFIndex":
+        """以 spherical k-means (內積指派) 分群並建立倒排列表"""
+        n_docs = len(docs)
+        nlist = nlist or max(1, int(4 * np.sqrt(n_docs)))
+        nlist = min(nlist, n_docs)
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(n_docs, size=min(n_docs, max(KMEANS_SAMPLE, nlist)), replace=False))
+        sample = normalize_rows(docs[sample_rows])
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)]
+
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=nlist)
+            # 空群保留原本的中心
+            centroids = np.where(counts[:, None] > 0, normalize_rows(sums), centroids)
+
+        assign = np.concatenate([
+            np.argmax(np.asarray(docs[start:start + BLOCK_SIZE], dtype=np.float32) @ centroids.T, axis=1)
+            for start in range(0, n_docs, BLOCK_SIZE)
+        ])
+        list_rows = np.argsort(assign, kind="stable")
+        list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=nlist), out=list_offsets[1:])
+        return cls(centroids.astype(np.float32), list_offsets, list_rows.astype(np.int64))
+
+    def save(self, filepath: Path) -> None:
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(filepath, centroids=self.centroids, list_offsets=self.list_offsets, list_rows=self.list_rows)
+
+    @classmethod
+    def load(cls, filepath: Path) -> "IVFIndex":
+        data = np.load(filepath)
+        return cls(data["centroids"], data["list_offsets"], data["list_rows"])
+
+    def search(
+        self, queries: np.ndarray, docs: np.ndarray, k: int, nprobe: int = DEFAULT_NPROBE
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        近似 top-k：每個查詢只計算最相近 nprobe 群內的文檔
+
+        Returns:
+            (scores, rows): (查詢數, k)，候選不足 k 篇時以 -inf / -1 補位
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        nprobe = min(nprobe, self.nlist)
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        result_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        result_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        for i, query in enumerate(queries):
+            candidates = np.concatenate([
+                self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probes[i]
+            ])
+            if len(candidates) == 0:
+                continue
+            candidates.sort()  # 依列號遞增讀取 memory-mapped 矩陣
+            scores = np.asarray(docs[candidates], dtype=np.float32) @ query
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k] if len(scores) > k else np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind="stable")]
+            result_scores[i, :len(top)] = scores[top]
+            result_rows[i, :len(top)] = candidates[top]
+        return result_scores, result_rows
+
+
+def recall_at_k(approx_rows: np.ndarray, exact_rows: np.ndarray) -> float:
+    """近似結果相對精確結果的 recall@k (兩者取相同的 k)"""
+    hits = (approx_rows[:, :, None] == exact_rows[:, None, :]).any(axis=2)
+    return float(hits.sum() / exact_rows.size) if exact_rows.size else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量檢索 (精確 + IVF 近似)")
+    parser.add_argument("--embedder", choices=list(EMBEDDERS), default="openai")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--corpus", type=Path, default=PROCESSED_DIR / "corpus.json")
+    parser.add_argument("--queries", type=Path, default=PROCESSED_DIR / "queries.json")
+    parser.add_argument("--k", type=int, nargs="+", default=[5])
+    parser.add_argument("--ivf", action="store_true", help="同時建立 IVF 索引並回報 recall")
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE)
+    parser.add_argument("--output", type=Path, default=RUN_PATH, help="精確檢索的 run 檔")
+    parser.add_argument("--run-name", default=None, help="存入 run store 的名稱 (預設 vector-<embedder>)")
+    args = parser.parse_args()
+
+    from retrieval_eval import RetrievalEvaluator, print_report
+    from run_store import CorpusTable, Run
+
+    embedder = EMBEDDERS[args.embedder]()
+    corpus = load_corpus(args.corpus)
+    queries = load_json(args.queries)
+    doc_ids, doc_vectors, embedded = embed_corpus(corpus, embedder, args.dtype)
+    doc_ids = np.array(doc_ids)
+    query_store = EmbeddingStore.open(f"{embedder.name}-queries", embedder.dim, args.dtype)
+    query_vectors = normalize_rows(query_store.embed([q["question"] for q in queries], embedder))
+    print(f"文檔 {len(doc_ids)} 篇 (本次 embedding {embedded} 篇)，查詢 {len(queries)} 題")
+
+    k = max(args.k)
+    start = time.perf_counter()
+    exact_scores, exact_rows = exact_search(query_vectors, doc_vectors, k)
+    elapsed = time.perf_counter() - start
+    print(f"\n[精確檢索] {elapsed * 1000:.1f} ms ({elapsed * 1000 / len(queries):.3f} ms/查詢)")
+
+    run = doc_ids[exact_rows]
+    save_json({q["question_id"]: row for q, row in zip(queries, run.tolist())}, args.output)
+    print_report(RetrievalEvaluator(queries).evaluate(run, args.k))
+    print(f"\n已儲存 run: {args.output}")
+    stored = Run.from_doc_ids(
+        args.run_name or f"vector-{args.embedder}", [q["question_id"] for q in queries], run.tolist(),
+        CorpusTable.from_corpus(corpus), exact_scores,
+        config={"retriever": "vector", "embedder": embedder.name, "dtype": args.dtype},
+    )
+    print(f"已儲存至 run store: {stored.save()}")
+
+    if args.ivf:
+        start = time.perf_counter()
+        index = IVFIndex.build(doc_vectors, args.nlist)
+        print(f"\n[IVF] 建立索引: nlist={index.nlist} ({time.perf_counter() - start:.2f}s)")
+        start = time.perf_counter()
+        _, approx_rows = index.search(query_vectors, doc_vectors, k, args.nprobe)
+        elapsed = time.perf_counter() - start
+        print(f"[IVF] nprobe={args.nprobe}: {elapsed * 1000:.1f} ms ({elapsed * 1000 / len(queries):.3f} ms/查詢)，"
+              f"recall@{k} = {recall_at_k(approx_rows, exact_rows):.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,19 +4,46 @@
 
 驗證項目：
 1. 檔案存在性
-2. 資料數量 (60 QA, 600 Docs)
+2. 資料數量 (60 QA, 600 Docs；有 process_data.py --tiers 的分級清單時，以最大分級的數量為準)
 3. 欄位完整性與型別
 4. 資料一致性 (Gold Doc IDs 存在於 Corpus)
 5. 語言檢查 (簡單檢查是否包含中文字元)
+6. Raw/Processed 對齊稽核 (以 doc_id 為鍵的 hash join)
+7. 分級清單 (data/processed/tiers/*.json)：成員皆存在於共用檔案、為上一級的子集、題目的黃金文檔皆在分級內
+
+增量驗證：
+    data/processed/.verify_cache.json 只記錄各檔案的簽章 (大小與修改時間) 與上次的驗證結果；
+    四個檔案與分級清單皆未變更時直接沿用上次的結果，不讀取逐筆快取也不解析任何 JSON。
+    有檔案變更時才載入 data/processed/.verify_cache_records.json 中逐筆紀錄的檢查結果 (以內容摘要為鍵)，
+    僅新增或變更的紀錄會重新檢查；數量、分佈、重複與 Gold 覆蓋率由快取中維護的彙總值更新，
+    未變更的檔案不必解析。
+
+驗證報告：
+    每項檢查的狀態、數量、有問題的 ID (最多 10 筆) 與耗時輸出至 data/processed/verify_report.json；
+    任一檢查 FAIL 時以 exit code 1 結束，供排程工作判斷。
+
+使用方式:
+    uv run src/verify_data.py              # 增量驗證
+    uv run src/verify_data.py --no-cache   # 忽略快取，完整重新驗證
+    uv run src/verify_data.py --strict     # WARN 也視為失敗
+    uv run src/verify_data.py --report out.json
 """
 
+import argparse
+import hashlib
 import json
+import sys
+import time
 from pathlib import Path
 from collections import Counter
 
 # 路徑設定
 BASE_DIR = Path(__file__).parent.parent
 PROCESSED_DIR = BASE_DIR / "data" / "processed"
+CACHE_PATH = PROCESSED_DIR / ".verify_cache.json"
+RECORD_CACHE_PATH = PROCESSED_DIR / ".verify_cache_records.json"
+REPORT_PATH = PROCESSED_DIR / "verify_report.json"
+TIERS_DIR = PROCESSED_DIR / "tiers"
 
 # 預期值配置
 EXPECTED_QUERIES = 60
@@ -27,11 +54,55 @@ EXPECTED_DISTRIBUTION = {
     "2wiki": 20
 }
 
+# 欄位與型別規格
+QUERY_FIELDS = {
+    "question_id": str,
+    "question": str,
+    "gold_answer": str,
+    "gold_doc_ids": list,
+    "source_dataset": str,
+    "question_type": str,
+}
+CORPUS_FIELDS = {
+    "doc_id": str,
+    "content": str,
+    "original_source": str,
+    "original_id": str,
+    "is_gold": bool,
+}
+
+# 對齊稽核配置
+ALIGNED_FIELDS = ("original_source", "original_id", "is_gold")
+MIN_LENGTH_RATIO = 0.2   # 翻譯後 / 原文字數比下限 (過低疑似截斷)
+MAX_LENGTH_RATIO = 1.5   # 翻譯後 / 原文字數比上限 (過高疑似混入說明文字)
+MAX_REPORTED_IDS = 10    # 每項問題最多列出的 ID 數
+
+CACHE_VERSION = 2  # 檢查邏輯或快取格式變更時遞增，使舊快取失效
+
 def load_json(filepath: Path) -> list[dict]:
     """載入 JSON 檔案"""
     with open(filepath, "r", encoding="utf-8") as f:
         return json.load(f)
 
+def load_tier_manifests() -> dict[str, dict]:
+    """載入分級清單 {分級: 清單} (沒有分級時為空)"""
+    if not TIERS_DIR.exists():
+        return {}
+    return {path.stem: load_json(path) for path in sorted(TIERS_DIR.glob("*.json"))}
+
+def expected_counts(manifests: dict[str, dict]) -> tuple[int, int, dict[str, int]]:
+    """
+    預期的題數、文檔數與來源分佈
+
+    有分級清單時，共用檔案為最大分級 (parent 為 None)，以其清單為準
+    """
+    roots = [m for m in manifests.values() if m.get("parent") is None]
+    if not roots:
+        return EXPECTED_QUERIES, EXPECTED_CORPUS, EXPECTED_DISTRIBUTION
+    root = roots[0]
+    distribution = {source: root["count_per_source"] for source in EXPECTED_DISTRIBUTION}
+    return len(root["question_ids"]), len(root["doc_ids"]), distribution
+
 def contains_chinese(text: str) -> bool:
     """檢查文字是否包含中文字元"""
     for char in text:
@@ -39,11 +110,368 @@ def contains_chinese(text: str) -> bool:
             return True
     return False
 
+def file_signature(filepath: Path) -> str:
+    """檔案的大小與修改時間 (只需 stat，不讀取內容)"""
+    stat = filepath.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def input_signatures(files: dict[str, Path]) -> dict[str, str]:
+    """所有驗證輸入 (四個檔案與分級清單) 的簽章，不存在者為空字串"""
+    paths = dict(files)
+    if TIERS_DIR.exists():
+        paths.update({f"tiers/{path.name}": path for path in sorted(TIERS_DIR.glob("*.json"))})
+    return {name: file_signature(path) if path.exists() else "" for name, path in paths.items()}
+
+def file_digest(filepath: Path) -> str:
+    """計算檔案內容摘要"""
+    return hashlib.sha1(filepath.read_bytes()).hexdigest()
+
+def record_digest(record: dict) -> str:
+    """計算單筆紀錄的內容摘要 (與欄位順序無關)"""
+    canonical = json.dumps(record, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+def check_fields(record: dict, spec: dict[str, type]) -> list[str]:
+    """檢查欄位是否存在且型別正確"""
+    issues = []
+    for field, expected_type in spec.items():
+        if field not in record:
+            issues.append(f"missing:{field}")
+        elif not isinstance(record[field], expected_type):
+            issues.append(f"type:{field}")
+    return issues
+
+def check_query_record(query: dict, translated: bool) -> dict:
+    """單筆問題的檢查 (結果可快取)"""
+    issues = check_fields(query, QUERY_FIELDS)
+    source = query.get("source_dataset")
+    if translated and source != "drcd" and not contains_chinese(str(query.get("question", ""))):
+        issues.append("untranslated")
+    gold_doc_ids = query.get("gold_doc_ids")
+    return {
+        "id": query.get("question_id"),
+        "source": source,
+        "refs": gold_doc_ids if isinstance(gold_doc_ids, list) else [],
+        "issues": issues,
+    }
+
+def check_corpus_record(doc: dict, translated: bool) -> dict:
+    """單筆文檔的檢查 (結果可快取)"""
+    issues = check_fields(doc, CORPUS_FIELDS)
+    source = doc.get("original_source")
+    if translated and source != "drcd" and not contains_chinese(str(doc.get("content", ""))):
+        issues.append("untranslated")
+    return {
+        "id": doc.get("doc_id"),
+        "source": source,
+        "refs": [],
+        "issues": issues,
+    }
+
+RECORD_CHECKERS = {
+    "queries": lambda r: check_query_record(r, translated=True),
+    "corpus": lambda r: check_corpus_record(r, translated=True),
+    "queries_raw": lambda r: check_query_record(r, translated=False),
+    "corpus_raw": lambda r: check_corpus_record(r, translated=False),
+}
+
+def new_record_state() -> dict:
+    """建立空的增量驗證狀態"""
+    return {
+        "signature": None,   # 檔案大小與修改時間
+        "file_digest": None,
+        "digests": {},     # digest -> 出現次數
+        "entries": {},     # digest -> 檢查結果
+        "total": 0,
+        "ids": {},         # id -> 出現次數
+        "duplicates": [],  # 出現超過一次的 id
+        "sources": {},     # 來源 -> 數量
+        "refs": {},        # 被引用的 gold doc id -> 次數
+        "issues": {},      # 問題代碼 -> 數量
+        "flagged": {},     # 有問題的 digest -> 出現次數
+    }
+
+def apply_record_delta(state: dict, entry: dict, digest: str, delta: int) -> None:
+    """
+    將單筆紀錄的檢查結果加入 (delta > 0) 或移出 (delta < 0) 彙總值
+    (state["ids"] 需為 Counter、state["duplicates"] 需為 set)
+    """
+    ids = state["ids"]
+    duplicates = state["duplicates"]
+
+    state["total"] += delta
+    rid = entry["id"]
+    ids[rid] += delta
+    if ids[rid] > 1:
+        duplicates.add(rid)
+    else:
+        duplicates.discard(rid)
+        if ids[rid] <= 0:
+            del ids[rid]
+
+    for key, values in (("sources", [entry["source"]]), ("refs", entry["refs"]), ("issues", entry["issues"])):
+        counter = state[key]
+        for value in values:
+            counter[value] = counter.get(value, 0) + delta
+            if counter[value] <= 0:
+                del counter[value]
+
+    if entry["issues"]:
+        flagged = state["flagged"]
+        flagged[digest] = flagged.get(digest, 0) + delta
+        if flagged[digest] <= 0:
+            del flagged[digest]
+
+def update_record_state(state: dict, records: list[dict], checker) -> int:
+    """
+    以新資料更新增量驗證狀態
+
+    只對新出現的 digest 執行單筆檢查，消失的 digest 由彙總值扣除。
+
+    Returns:
+        實際重新檢查的紀錄數
+    """
+    by_digest: dict[str, dict] = {}
+    new_counts: Counter = Counter()
+    for record in records:
+        digest = record_digest(record)
+        new_counts[digest] += 1
+        by_digest.setdefault(digest, record)
+
+    old_counts = Counter(state["digests"])
+    entries = state["entries"]
+    state["ids"] = Counter(state["ids"])
+    state["duplicates"] = set(state["duplicates"])
+
+    for digest, n in (old_counts - new_counts).items():
+        apply_record_delta(state, entries[digest], digest, -n)
+
+    checked = 0
+    for digest, n in (new_counts - old_counts).items():
+        if digest not in entries:
+            entries[digest] = checker(by_digest[digest])
+            checked += 1
+        apply_record_delta(state, entries[digest], digest, n)
+
+    for digest in list(entries):
+        if digest not in new_counts:
+            del entries[digest]
+
+    state["digests"] = dict(new_counts)
+    state["ids"] = dict(state["ids"])
+    state["duplicates"] = sorted(state["duplicates"], key=str)
+    return checked
+
+def load_cache(path: Path = CACHE_PATH) -> dict:
+    """載入驗證快取，版本不符或損毀時視為空快取"""
+    if not path.exists():
+        return {}
+    try:
+        cache = load_json(path)
+    except Exception:
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache
+
+def save_cache(cache: dict, path: Path = CACHE_PATH) -> None:
+    """儲存驗證快取"""
+    cache["version"] = CACHE_VERSION
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+
+def save_report(report: dict, filepath: Path) -> None:
+    """儲存 JSON 驗證報告"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+def audit_corpus_alignment(corpus: list[dict], corpus_raw: list[dict]) -> dict:
+    """
+    以 doc_id 為鍵對齊 Processed 與 Raw Corpus (線性時間 hash join)
+
+    Returns:
+        only_processed: 只存在於 Processed 的 doc_id
+        only_raw: 只存在於 Raw 的 doc_id
+        duplicates: 任一側重複出現的 doc_id
+        order_drift: 同位置 doc_id 不同的索引數量 (translate_new.py 等依位置對齊的腳本會出錯)
+        field_mismatches: {欄位: [doc_id, ...]}
+        length_ratio_outliers: [(doc_id, ratio), ...] 非 DRCD 文檔的翻譯/原文字數比異常
+    """
+    raw_index: dict[str, dict] = {}
+    duplicates: set[str] = set()
+    for doc in corpus_raw:
+        did = doc.get("doc_id")
+        if did in raw_index:
+            duplicates.add(did)
+        raw_index[did] = doc
+
+    seen: set[str] = set()
+    only_processed = []
+    field_mismatches: dict[str, list[str]] = {field: [] for field in ALIGNED_FIELDS}
+    length_ratio_outliers = []
+    for doc in corpus:
+        did = doc.get("doc_id")
+        if did in seen:
+            duplicates.add(did)
+            continue
+        seen.add(did)
+
+        raw_doc = raw_index.get(did)
+        if raw_doc is None:
+            only_processed.append(did)
+            continue
+
+        for field in ALIGNED_FIELDS:
+            if doc.get(field) != raw_doc.get(field):
+                field_mismatches[field].append(did)
+
+        # DRCD 不經翻譯，僅檢查翻譯過的文檔
+        if raw_doc.get("original_source") == "drcd":
+            continue
+        raw_len = len(raw_doc.get("content", ""))
+        ratio = len(doc.get("content", "")) / raw_len if raw_len else 0.0
+        if not MIN_LENGTH_RATIO <= ratio <= MAX_LENGTH_RATIO:
+            length_ratio_outliers.append((did, ratio))
+
+    only_raw = [did for did in raw_index if did not in seen]
+    order_drift = sum(
+        1 for doc, raw_doc in zip(corpus, corpus_raw)
+        if doc.get("doc_id") != raw_doc.get("doc_id")
+    )
+
+    return {
+        "only_processed": only_processed,
+        "only_raw": only_raw,
+        "duplicates": sorted(duplicates),
+        "order_drift": order_drift,
+        "field_mismatches": field_mismatches,
+        "length_ratio_outliers": length_ratio_outliers,
+    }
+
+class VerificationReport:
+    """
+    收集每項檢查的結果並輸出 [PASS]/[FAIL]/[WARN]
+
+    每項檢查記錄狀態、訊息、數量、有問題的 ID (最多 MAX_REPORTED_IDS 筆)
+    以及自上一項檢查結束起的耗時，最後可輸出為 JSON 報告。
+    """
+
+    def __init__(self):
+        self.sections: list[dict] = []
+        self.started_at = time.time()
+        self._mark = time.perf_counter()
+
+    def section(self, title: str) -> None:
+        """開始新的驗證區塊"""
+        print(f"\n[{title}]" if self.sections else f"[{title}]")
+        self.sections.append({"title": title, "checks": []})
+        self._mark = time.perf_counter()
+
+    def record(self, name: str, status: str, message: str, ids: list | None = None, count: int | None = None) -> None:
+        """記錄一項檢查結果"""
+        now = time.perf_counter()
+        elapsed_ms = (now - self._mark) * 1000
+        self._mark = now
+
+        print(f"  [{status}] {message}")
+        ids = ids or []
+        for did in ids[:MAX_REPORTED_IDS]:
+            print(f"    - {did}")
+        if len(ids) > MAX_REPORTED_IDS:
+            print(f"    ... 其餘 {len(ids) - MAX_REPORTED_IDS} 筆省略")
+
+        self.sections[-1]["checks"].append({
+            "name": name,
+            "status": status,
+            "message": message,
+            "count": count if count is not None else len(ids),
+            "ids": [str(did) for did in ids[:MAX_REPORTED_IDS]],
+            "ids_truncated": len(ids) > MAX_REPORTED_IDS,
+            "elapsed_ms": round(elapsed_ms, 3),
+        })
+
+    def replay(self, sections: list[dict]) -> None:
+        """重新輸出上次的驗證結果 (輸入皆未變更時使用)"""
+        for sec in sections:
+            self.section(sec["title"])
+            for check in sec["checks"]:
+                print(f"  [{check['status']}] {check['message']}")
+                for did in check["ids"]:
+                    print(f"    - {did}")
+                if check["ids_truncated"]:
+                    print(f"    ... 其餘 {check['count'] - MAX_REPORTED_IDS} 筆省略")
+                self.sections[-1]["checks"].append(dict(check, elapsed_ms=0.0))
+
+    def note(self, message: str) -> None:
+        """輸出不計入檢查結果的說明"""
+        print(f"  {message}")
+
+    def statuses(self) -> Counter:
+        """各狀態的檢查數量"""
+        return Counter(check["status"] for sec in self.sections for check in sec["checks"])
+
+    def to_dict(self, strict: bool = False) -> dict:
+        """輸出為可序列化的報告"""
+        statuses = self.statuses()
+        return {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "elapsed_ms": round((time.time() - self.started_at) * 1000, 3),
+            "passed": is_passing(statuses, strict),
+            "strict": strict,
+            "summary": {status: statuses.get(status, 0) for status in ("PASS", "WARN", "FAIL")},
+            "sections": self.sections,
+        }
+
+def is_passing(statuses: Counter, strict: bool = False) -> bool:
+    """有 FAIL (strict 模式下含 WARN) 即視為未通過"""
+    if statuses.get("FAIL", 0):
+        return False
+    return not (strict and statuses.get("WARN", 0))
+
+def record_field_check(report: VerificationReport, name: str, state: dict) -> None:
+    """記錄欄位完整性與型別檢查結果"""
+    bad_ids = [
+        f"{state['entries'][digest]['id']} ({', '.join(i for i in state['entries'][digest]['issues'] if i != 'untranslated')})"
+        for digest in state["flagged"]
+        if any(i != "untranslated" for i in state["entries"][digest]["issues"])
+    ]
+    if not bad_ids:
+        report.record(name, "PASS", "欄位完整且型別正確")
+    else:
+        report.record(name, "FAIL", f"{len(bad_ids)} 筆紀錄欄位缺漏或型別錯誤", bad_ids)
+
+def untranslated_ids(state: dict) -> list:
+    """列出被標記為未翻譯的紀錄 ID"""
+    return [
+        state["entries"][digest]["id"]
+        for digest in state["flagged"]
+        if "untranslated" in state["entries"][digest]["issues"]
+    ]
+
+def finish_report(report: VerificationReport, args: argparse.Namespace) -> int:
+    """輸出報告與摘要，回傳 exit code"""
+    result = report.to_dict(strict=args.strict)
+    save_report(result, args.report)
+
+    summary = result["summary"]
+    print(f"\n{'=' * 60}")
+    print(f"驗證完成: PASS {summary['PASS']} / WARN {summary['WARN']} / FAIL {summary['FAIL']}")
+    print(f"報告已儲存: {args.report}")
+    print("=" * 60)
+    return 0 if result["passed"] else 1
+
 def main():
+    parser = argparse.ArgumentParser(description="資料驗證")
+    parser.add_argument("--no-cache", action="store_true", help="忽略快取，完整重新驗證")
+    parser.add_argument("--report", type=Path, default=REPORT_PATH, help="JSON 報告輸出路徑")
+    parser.add_argument("--strict", action="store_true", help="WARN 也視為失敗")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("開始資料驗證")
     print("=" * 60)
-    
+
     # 檔案路徑定義
     files = {
         "queries": PROCESSED_DIR / "queries.json",
@@ -51,153 +479,279 @@ def main():
         "queries_raw": PROCESSED_DIR / "queries_raw.json",
         "corpus_raw": PROCESSED_DIR / "corpus_raw.json"
     }
-    
-    # 載入資料
+
+    cache = {} if args.no_cache else load_cache()
+    report = VerificationReport()
+    signatures = input_signatures(files)
+
+    # 四個檔案與分級清單皆未變更：沿用上次的結果，不載入逐筆快取、不解析任何 JSON
+    if cache.get("signatures") == signatures and "sections" in cache:
+        report.note("檔案與分級清單皆未變更，沿用上次的驗證結果 (--no-cache 強制完整驗證)")
+        report.replay(cache["sections"])
+        return finish_report(report, args)
+
+    records = {} if args.no_cache else load_cache(RECORD_CACHE_PATH)
+    manifests = load_tier_manifests()
+    expected_queries, expected_corpus, expected_distribution = expected_counts(manifests)
+
+    # 載入資料 (檔案未變更時直接沿用快取狀態，不解析 JSON)
     data = {}
-    print("[1. 檔案存在性檢查]")
+    states = {}
+    digests = {}
+    checked_total = 0
+    reused_total = 0
+    report.section("1. 檔案存在性檢查")
     for name, path in files.items():
         if path.exists():
-            print(f"  [PASS] {name} 存在")
+            state = records.get(name)
+            # 簽章相同時不必讀取檔案；只有修改時間變動 (內容相同) 時以檔案摘要確認
+            if state and state.get("signature") == signatures[name]:
+                digests[name] = state["file_digest"]
+            else:
+                digests[name] = file_digest(path)
+            if state and state["file_digest"] == digests[name]:
+                state["signature"] = signatures[name]
+                states[name] = state
+                reused_total += state["total"]
+                report.record(f"{name}.exists", "PASS", f"{name} 存在")
+                continue
             try:
                 data[name] = load_json(path)
             except Exception as e:
-                print(f"  [FAIL] {name} 讀取失敗: {e}")
+                report.record(f"{name}.exists", "FAIL", f"{name} 讀取失敗: {e}")
+                continue
+            state = state or new_record_state()
+            checked = update_record_state(state, data[name], RECORD_CHECKERS[name])
+            state["file_digest"] = digests[name]
+            state["signature"] = signatures[name]
+            states[name] = state
+            checked_total += checked
+            reused_total += state["total"] - checked
+            report.record(f"{name}.exists", "PASS", f"{name} 存在")
         else:
-            print(f"  [WARN] {name} 不存在 (部分驗證將跳過)")
-            
+            report.record(f"{name}.exists", "WARN", f"{name} 不存在 (部分驗證將跳過)")
+
+    report.note(f"增量驗證: 重新檢查 {checked_total} 筆，沿用快取 {reused_total} 筆")
+    if manifests:
+        report.note(f"分級清單: {', '.join(manifests)} (預期數量以最大分級為準)")
+
     # Processed Data 驗證
-    queries = data.get("queries")
-    corpus = data.get("corpus")
-    
+    queries = states.get("queries")
+    corpus = states.get("corpus")
+
     if queries:
-        print(f"\n[Processed Queries 驗證]")
+        report.section("Processed Queries 驗證")
         # 數量
-        if len(queries) == EXPECTED_QUERIES:
-            print(f"  [PASS] 數量正確: {len(queries)}")
+        if queries["total"] == expected_queries:
+            report.record("queries.count", "PASS", f"數量正確: {queries['total']}", count=queries["total"])
         else:
-            print(f"  [FAIL] 數量錯誤: {len(queries)} (預期 {EXPECTED_QUERIES})")
-            
+            report.record("queries.count", "FAIL", f"數量錯誤: {queries['total']} (預期 {expected_queries})", count=queries["total"])
+
         # 分佈
-        sources = Counter(q.get("source_dataset") for q in queries)
-        if sources == EXPECTED_DISTRIBUTION:
-            print(f"  [PASS] 來源分佈正確: {dict(sources)}")
+        sources = Counter(queries["sources"])
+        if sources == expected_distribution:
+            report.record("queries.distribution", "PASS", f"來源分佈正確: {dict(sources)}", count=len(sources))
         else:
-            print(f"  [FAIL] 來源分佈錯誤: {dict(sources)}")
-            
+            report.record("queries.distribution", "FAIL", f"來源分佈錯誤: {dict(sources)}", count=len(sources))
+
         # 重複性
-        q_ids = [q['question_id'] for q in queries]
-        dup_q_ids = [item for item, count in Counter(q_ids).items() if count > 1]
-        if not dup_q_ids:
-            print("  [PASS] 無重複 ID")
+        if not queries["duplicates"]:
+            report.record("queries.duplicates", "PASS", "無重複 ID")
         else:
-            print(f"  [FAIL] 發現 {len(dup_q_ids)} 個重複 ID")
-            
+            report.record("queries.duplicates", "FAIL", f"發現 {len(queries['duplicates'])} 個重複 ID", queries["duplicates"])
+
+        # 欄位
+        record_field_check(report, "queries.fields", queries)
+
         # 語言檢查 (非 DRCD)
-        q_errors = 0
-        non_drcd = [q for q in queries if q.get("source_dataset") != "drcd"]
-        for q in non_drcd:
-            if not contains_chinese(q.get("question", "")):
-                q_errors += 1
-        if q_errors == 0:
-            print(f"  [PASS] 非 DRCD 問題皆包含中文 ({len(non_drcd)} 題)")
+        q_errors = untranslated_ids(queries)
+        non_drcd = queries["total"] - queries["sources"].get("drcd", 0)
+        if not q_errors:
+            report.record("queries.language", "PASS", f"非 DRCD 問題皆包含中文 ({non_drcd} 題)")
         else:
-            print(f"  [WARN] {q_errors} 題可能未翻譯")
+            report.record("queries.language", "WARN", f"{queries['issues']['untranslated']} 題可能未翻譯", q_errors)
 
     if corpus:
-        print(f"\n[Processed Corpus 驗證]")
+        report.section("Processed Corpus 驗證")
         # 數量
-        if len(corpus) == EXPECTED_CORPUS:
-            print(f"  [PASS] 數量正確: {len(corpus)}")
+        if corpus["total"] == expected_corpus:
+            report.record("corpus.count", "PASS", f"數量正確: {corpus['total']}", count=corpus["total"])
         else:
-            print(f"  [FAIL] 數量錯誤: {len(corpus)} (預期 {EXPECTED_CORPUS})")
-            
+            report.record("corpus.count", "FAIL", f"數量錯誤: {corpus['total']} (預期 {expected_corpus})", count=corpus["total"])
+
         # 重複性檢查
-        doc_ids = [d['doc_id'] for d in corpus]
-        dup_doc_ids = [item for item, count in Counter(doc_ids).items() if count > 1]
-        if not dup_doc_ids:
-            print(f"  [PASS] 無重複 doc_id ({len(set(doc_ids))} unique)")
-        else:
-            print(f"  [FAIL] 發現 {len(dup_doc_ids)} 個重複 doc_id:")
-            for did in dup_doc_ids:
-                print(f"    - {did}")
-            
+        if not corpus["duplicates"]:
+            report.record("corpus.duplicates", "PASS", f"無重複 doc_id ({len(corpus['ids'])} unique)")
+        else:
+            report.record("corpus.duplicates", "FAIL", f"發現 {len(corpus['duplicates'])} 個重複 doc_id:", corpus["duplicates"])
+
+        # 欄位
+        record_field_check(report, "corpus.fields", corpus)
+
         # 語言檢查
-        c_errors = 0
-        non_drcd = [d for d in corpus if d.get("original_source") != "drcd"]
-        for c in non_drcd:
-            if not contains_chinese(c.get("content", "")):
-                c_errors += 1
-        if c_errors == 0:
-            print(f"  [PASS] 非 DRCD 文檔皆包含中文 ({len(non_drcd)} 篇)")
-        else:
-            print(f"  [WARN] {c_errors} 篇可能未翻譯")
-            
+        c_errors = untranslated_ids(corpus)
+        non_drcd = corpus["total"] - corpus["sources"].get("drcd", 0)
+        if not c_errors:
+            report.record("corpus.language", "PASS", f"非 DRCD 文檔皆包含中文 ({non_drcd} 篇)")
+        else:
+            report.record("corpus.language", "WARN", f"{corpus['issues']['untranslated']} 篇可能未翻譯", c_errors)
+
     # Processed 一致性 (需兩者都在)
     if queries and corpus:
-        print(f"\n[Processed 一致性驗證]")
-        corpus_ids = {d.get("doc_id") for d in corpus}
-        missing_docs = []
-        for q in queries:
-            for gid in q.get("gold_doc_ids", []):
-                if gid not in corpus_ids:
-                    missing_docs.append((q.get("question_id"), gid))
-        
+        report.section("Processed 一致性驗證")
+        missing_docs = [gid for gid in queries["refs"] if gid not in corpus["ids"]]
+
         if not missing_docs:
-            print("  [PASS] 所有 Gold Doc IDs 皆存在於 Corpus")
+            report.record("processed.gold_coverage", "PASS", "所有 Gold Doc IDs 皆存在於 Corpus")
         else:
-            print(f"  [FAIL] 發現 {len(missing_docs)} 個缺失文檔")
+            report.record("processed.gold_coverage", "FAIL", f"發現 {len(missing_docs)} 個缺失文檔", missing_docs)
 
     # Raw Data 驗證
-    queries_raw = data.get("queries_raw")
-    corpus_raw = data.get("corpus_raw")
-    
+    queries_raw = states.get("queries_raw")
+    corpus_raw = states.get("corpus_raw")
+
     if queries_raw:
-        print(f"\n[Raw Queries 驗證]")
-        if len(queries_raw) == EXPECTED_QUERIES:
-            print(f"  [PASS] 數量正確: {len(queries_raw)}")
+        report.section("Raw Queries 驗證")
+        if queries_raw["total"] == expected_queries:
+            report.record("queries_raw.count", "PASS", f"數量正確: {queries_raw['total']}", count=queries_raw["total"])
         else:
-            print(f"  [FAIL] 數量錯誤: {len(queries_raw)}")
-            
+            report.record("queries_raw.count", "FAIL", f"數量錯誤: {queries_raw['total']}", count=queries_raw["total"])
+
         # 重複性
-        q_raw_ids = [q['question_id'] for q in queries_raw]
-        dup_raw = [item for item, count in Counter(q_raw_ids).items() if count > 1]
-        if not dup_raw:
-            print("  [PASS] 無重複 ID")
+        if not queries_raw["duplicates"]:
+            report.record("queries_raw.duplicates", "PASS", "無重複 ID")
         else:
-            print(f"  [FAIL] 發現 {len(dup_raw)} 個重複 ID")
-            
+            report.record("queries_raw.duplicates", "FAIL", f"發現 {len(queries_raw['duplicates'])} 個重複 ID", queries_raw["duplicates"])
+
     if corpus_raw:
-        print(f"\n[Raw Corpus 驗證]")
-        if len(corpus_raw) == EXPECTED_CORPUS:
-            print(f"  [PASS] 數量正確: {len(corpus_raw)}")
+        report.section("Raw Corpus 驗證")
+        if corpus_raw["total"] == expected_corpus:
+            report.record("corpus_raw.count", "PASS", f"數量正確: {corpus_raw['total']}", count=corpus_raw["total"])
         else:
-            print(f"  [FAIL] 數量錯誤: {len(corpus_raw)}")
+            report.record("corpus_raw.count", "FAIL", f"數量錯誤: {corpus_raw['total']}", count=corpus_raw["total"])
 
     # Raw vs Processed 一致性
     if queries and queries_raw:
-        print(f"\n[Queries vs Raw 一致性]")
-        if len(queries) == len(queries_raw):
-            print("  [PASS] 數量一致")
-        else:
-            print(f"  [FAIL] 數量不一致 ({len(queries)} vs {len(queries_raw)})")
-            
-        q_ids = set(q['question_id'] for q in queries)
-        r_ids = set(q['question_id'] for q in queries_raw)
-        if q_ids == r_ids:
-            print("  [PASS] ID 集合一致")
-        else:
-            print("  [FAIL] ID 集合不一致")
-            
+        report.section("Queries vs Raw 一致性")
+        if queries["total"] == queries_raw["total"]:
+            report.record("queries_alignment.count", "PASS", "數量一致")
+        else:
+            report.record("queries_alignment.count", "FAIL", f"數量不一致 ({queries['total']} vs {queries_raw['total']})")
+
+        mismatched = sorted(queries["ids"].keys() ^ queries_raw["ids"].keys(), key=str)
+        if not mismatched:
+            report.record("queries_alignment.ids", "PASS", "ID 集合一致")
+        else:
+            report.record("queries_alignment.ids", "FAIL", "ID 集合不一致", mismatched)
+
     if corpus and corpus_raw:
-        print(f"\n[Corpus vs Raw 一致性]")
-        if len(corpus) == len(corpus_raw):
-            print("  [PASS] 數量一致")
+        report.section("Corpus vs Raw 一致性")
+        if corpus["total"] == corpus_raw["total"]:
+            report.record("corpus_alignment.count", "PASS", "數量一致")
         else:
-            print(f"  [FAIL] 數量不一致 ({len(corpus)} vs {len(corpus_raw)})")
+            report.record("corpus_alignment.count", "FAIL", f"數量不一致 ({corpus['total']} vs {corpus_raw['total']})")
 
-    print(f"\n{'=' * 60}")
-    print("驗證完成")
-    print("=" * 60)
+        # 對齊稽核需要完整內容，兩側檔案皆未變更時沿用快取結果
+        alignment_key = f"{digests['corpus']}:{digests['corpus_raw']}"
+        cached_alignment = records.get("alignment")
+        if cached_alignment and cached_alignment["key"] == alignment_key:
+            audit = cached_alignment["result"]
+        else:
+            for name in ("corpus", "corpus_raw"):
+                if name not in data:
+                    data[name] = load_json(files[name])
+            audit = audit_corpus_alignment(data["corpus"], data["corpus_raw"])
+            records["alignment"] = {"key": alignment_key, "result": audit}
+
+        if not audit["only_processed"] and not audit["only_raw"]:
+            report.record("corpus_alignment.ids", "PASS", "doc_id 集合一致")
+        else:
+            report.record(
+                "corpus_alignment.ids", "FAIL",
+                f"doc_id 集合不一致 (僅 Processed: {len(audit['only_processed'])}, 僅 Raw: {len(audit['only_raw'])})",
+                audit["only_processed"] + audit["only_raw"],
+            )
+
+        if not audit["duplicates"]:
+            report.record("corpus_alignment.duplicates", "PASS", "兩側皆無重複 doc_id")
+        else:
+            report.record("corpus_alignment.duplicates", "FAIL", f"發現 {len(audit['duplicates'])} 個重複 doc_id", audit["duplicates"])
+
+        if audit["order_drift"] == 0:
+            report.record("corpus_alignment.order", "PASS", "文檔順序一致")
+        else:
+            report.record(
+                "corpus_alignment.order", "WARN",
+                f"{audit['order_drift']} 個位置的 doc_id 不對齊 (依位置對齊的腳本將出錯)",
+                count=audit["order_drift"],
+            )
+
+        for field, mismatched in audit["field_mismatches"].items():
+            if not mismatched:
+                report.record(f"corpus_alignment.{field}", "PASS", f"{field} 一致")
+            else:
+                report.record(f"corpus_alignment.{field}", "FAIL", f"{len(mismatched)} 篇文檔的 {field} 不一致", mismatched)
+
+        outliers = audit["length_ratio_outliers"]
+        if not outliers:
+            report.record("corpus_alignment.length_ratio", "PASS", f"翻譯字數比皆在 {MIN_LENGTH_RATIO}~{MAX_LENGTH_RATIO} 之間")
+        else:
+            report.record(
+                "corpus_alignment.length_ratio", "WARN",
+                f"{len(outliers)} 篇文檔翻譯字數比異常 (疑似截斷或混入說明)",
+                [f"{did} (ratio={ratio:.2f})" for did, ratio in outliers],
+            )
+
+    # 分級清單
+    if manifests:
+        report.section("分級清單驗證")
+        query_state = states.get("queries_raw") or queries
+        corpus_state = states.get("corpus_raw") or corpus
+        gold_of = {}
+        if query_state:
+            gold_of = {entry["id"]: entry["refs"] for entry in query_state["entries"].values()}
+        for name, manifest in manifests.items():
+            question_ids, doc_ids = manifest["question_ids"], manifest["doc_ids"]
+            if query_state:
+                missing = [qid for qid in question_ids if qid not in query_state["ids"]]
+                if not missing:
+                    report.record(f"tiers.{name}.queries", "PASS", f"{name}: {len(question_ids)} 題皆存在於共用題庫")
+                else:
+                    report.record(f"tiers.{name}.queries", "FAIL", f"{name}: {len(missing)} 題不在共用題庫", missing)
+            if corpus_state:
+                missing = [did for did in doc_ids if did not in corpus_state["ids"]]
+                if not missing:
+                    report.record(f"tiers.{name}.corpus", "PASS", f"{name}: {len(doc_ids)} 篇皆存在於共用文檔庫")
+                else:
+                    report.record(f"tiers.{name}.corpus", "FAIL", f"{name}: {len(missing)} 篇不在共用文檔庫", missing)
+
+            parent = manifest.get("parent")
+            if parent is not None:
+                if parent not in manifests:
+                    report.record(f"tiers.{name}.parent", "FAIL", f"{name}: 找不到上一級清單 {parent}")
+                else:
+                    parent_questions = set(manifests[parent]["question_ids"])
+                    parent_docs = set(manifests[parent]["doc_ids"])
+                    outside = [qid for qid in question_ids if qid not in parent_questions]
+                    outside += [did for did in doc_ids if did not in parent_docs]
+                    if not outside:
+                        report.record(f"tiers.{name}.parent", "PASS", f"{name} 為 {parent} 的子集")
+                    else:
+                        report.record(f"tiers.{name}.parent", "FAIL", f"{name}: {len(outside)} 個成員不在 {parent} 中", outside)
+
+            tier_docs = set(doc_ids)
+            missing_gold = [gid for qid in question_ids for gid in gold_of.get(qid, []) if gid not in tier_docs]
+            if not missing_gold:
+                report.record(f"tiers.{name}.gold_coverage", "PASS", f"{name}: 黃金文檔皆在分級內")
+            else:
+                report.record(f"tiers.{name}.gold_coverage", "FAIL", f"{name}: {len(missing_gold)} 個黃金文檔不在分級內", missing_gold)
+
+    # 更新快取 (先寫逐筆快取，再寫記錄簽章的摘要檔；中途中斷時下次會走完整的增量驗證)
+    for name, state in states.items():
+        records[name] = state
+    save_cache(records, RECORD_CACHE_PATH)
+    save_cache({"signatures": signatures, "sections": report.sections})
+    return finish_report(report, args)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
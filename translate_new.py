@@ -1,7 +1,16 @@
 """
-翻譯 corpus.json 中新增的未翻譯文檔
+翻譯 corpus 中尚未翻譯的文檔 (修復翻譯失敗或新增的文檔)
+
+- 以資料集儲存層一次查出譯文仍為原文的文檔，並以 doc_id 取得原文
+- 以有上限的執行緒池並行翻譯，失敗時以指數退避重試
+- 每篇翻譯完成即提交，中斷後重新執行只會翻譯剩下的文檔
+
+使用方式:
+    uv run translate_new.py [並行數]
 """
-import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from openai import OpenAI
 from dotenv import load_dotenv
@@ -9,26 +18,17 @@ from dotenv import load_dotenv
 load_dotenv()
 
 BASE_DIR = Path(__file__).parent
-PROCESSED_DIR = BASE_DIR / "data" / "processed"
+
+sys.path.insert(0, str(BASE_DIR / "src"))
+from dataset_store import DatasetStore
 
 client = OpenAI()
 MODEL = "gpt-4.1"
-
-def load_json(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-def contains_chinese(text: str) -> bool:
-    for char in text:
-        if '\u4e00' <= char <= '\u9fff':
-            return True
-    return False
+MAX_WORKERS = 20  # 並行執行緒數
+MAX_RETRIES = 5   # 最大重試次數 (服務中斷後的大量修復需要較多次重試)
 
 def translate_text(text: str) -> str:
+    """翻譯單一文本，重試皆失敗時拋出最後一次的例外"""
     if not text or not text.strip():
         return text
 
@@ -38,42 +38,60 @@ def translate_text(text: str) -> str:
 2. 專有名詞保留英文，並在首次出現時加上中文翻譯
 3. 使用台灣常用的繁體中文用語
 4. 只輸出翻譯結果，不加任何說明"""
-    
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": text}
-        ],
-        temperature=0.3
-    )
-    return response.choices[0].message.content.strip()
+
+    for attempt in range(MAX_RETRIES):
+        try:
+            response = client.chat.completions.create(
+                model=MODEL,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": text}
+                ],
+                temperature=0.3
+            )
+            return response.choices[0].message.content.strip()
+        except Exception:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            time.sleep(2 ** attempt)  # 指數退避
 
 def main():
-    corpus = load_json(PROCESSED_DIR / "corpus.json")
-    corpus_raw = load_json(PROCESSED_DIR / "corpus_raw.json")
-    
-    # 找出需要翻譯的文檔 (非 DRCD 但不包含中文)
-    to_translate = []
-    for i, doc in enumerate(corpus):
-        if doc.get("original_source") != "drcd":
-            if not contains_chinese(doc.get("content", "")):
-                to_translate.append(i)
-    
-    print(f"需要翻譯的文檔數: {len(to_translate)}")
-    
-    for idx in to_translate:
-        doc = corpus[idx]
-        raw_content = corpus_raw[idx].get("content", "")
-        
-        print(f"翻譯 doc_id: {doc['doc_id'][:30]}...")
-        translated = translate_text(raw_content)
-        corpus[idx]["content"] = translated
-        print(f"  完成 ({len(translated)} 字)")
-    
-    # 保存
-    save_json(PROCESSED_DIR / "corpus.json", corpus)
-    print("\n已保存翻譯後的 corpus.json")
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else MAX_WORKERS
+    store = DatasetStore.open()
+
+    # 找出需要翻譯的文檔 (非 DRCD 且譯文仍為原文)，以 doc_id 取原文，不依賴兩個檔案的順序
+    to_translate = store.untranslated_documents()
+
+    print(f"需要翻譯的文檔數: {len(to_translate)} (並行數: {max_workers})")
+
+    done = 0
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_doc_id = {
+            executor.submit(translate_text, doc_raw["content"]): doc_raw["doc_id"]
+            for doc_raw in to_translate
+        }
+        # SQLite 連線只在主執行緒使用：翻譯完成一篇就提交一篇
+        for future in as_completed(future_to_doc_id):
+            doc_id = future_to_doc_id[future]
+            try:
+                translated = future.result()
+            except Exception as e:
+                failed.append(doc_id)
+                print(f"  [Error] {doc_id[:30]}... 翻譯失敗: {str(e)[:100]}")
+                continue
+            with store.transaction():
+                store.update_translation(doc_id, translated)
+            done += 1
+            if done % 100 == 0 or done == len(to_translate):
+                print(f"  已完成 {done}/{len(to_translate)}")
+
+    # 匯出
+    store.export_json()
+    store.close()
+    print(f"\n已保存翻譯後的 corpus.json (完成 {done} 篇，失敗 {len(failed)} 篇)")
+    if failed:
+        print("失敗的文檔保持未翻譯，重新執行本腳本即可重試")
 
 if __name__ == "__main__":
     main()